@@ -0,0 +1,208 @@
+import re
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+
+from page_classifier import ALL_SECTIONS
+from website_analyzer import NOT_SPECIFIED
+
+# Items whose normalized texts are at least this similar are considered the same
+FUZZY_MATCH_RATIO = 0.88
+
+# Distinct values kept for text fields, the most supported first
+MAX_TEXT_VALUES = 3
+
+
+def normalize_item(text: str) -> str:
+    """Lowercase text, drop punctuation and collapse whitespace before comparing items"""
+    return re.sub(r'\s+', ' ', re.sub(r'[^\w\s$%€£]', ' ', text.lower())).strip()
+
+
+def _is_placeholder(value: Any) -> bool:
+    """Whether a value carries no information ('Not specified', empty strings and lists)"""
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return normalize_item(value) in ('', normalize_item(NOT_SPECIFIED), 'n a', 'none', 'unknown')
+    if isinstance(value, (list, dict)):
+        return not value
+    return False
+
+
+def _item_text(item: Any) -> str:
+    """Text identifying an item: its name for dict items such as pricing tiers"""
+    if isinstance(item, dict):
+        return str(item.get('name', ''))
+    return str(item)
+
+
+def _same_item(a: str, b: str) -> bool:
+    """Case- and fuzzy-insensitive comparison of two normalized item texts"""
+    if a == b:
+        return True
+    return _similar(SequenceMatcher(None, b=b, autojunk=False), a)
+
+
+def _similar(matcher: SequenceMatcher, a: str) -> bool:
+    """Whether a is close to the text the matcher was built for, cheapest upper bounds first"""
+    matcher.set_seq1(a)
+    return (matcher.real_quick_ratio() >= FUZZY_MATCH_RATIO and matcher.quick_ratio() >= FUZZY_MATCH_RATIO
+            and matcher.ratio() >= FUZZY_MATCH_RATIO)
+
+
+def _blocks(key: str) -> Tuple[str, str]:
+    """Blocking keys of an item: near-duplicates almost always share their first or last characters"""
+    compact = key.replace(' ', '')
+    return '^' + compact[:3], compact[-3:] + '$'
+
+
+class _ItemGroups:
+    """Distinct items of one field, with the pages supporting each of them"""
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.items: List[List[Any]] = []
+        self.pages: List[List[str]] = []
+        self._index: Dict[str, int] = {}
+        self._blocks: Dict[str, List[int]] = {}
+
+    def add(self, item: Any, url: str):
+        key = normalize_item(_item_text(item))
+        if not key or key == normalize_item(NOT_SPECIFIED):
+            return
+        i = self._index.get(key)
+        if i is None:
+            # Only compare with the groups of the same blocks; the matcher caches its analysis of the new key
+            candidates = sorted(set().union(*(self._blocks.get(block, ()) for block in _blocks(key))))
+            matcher = SequenceMatcher(None, b=key, autojunk=False)
+            i = next((i for i in candidates if _similar(matcher, self.keys[i])), None)
+        if i is not None:
+            self._index[key] = i
+            self.items[i].append(item)
+            if url not in self.pages[i]:
+                self.pages[i].append(url)
+            return
+        self._index[key] = len(self.keys)
+        for block in _blocks(key):
+            self._blocks.setdefault(block, []).append(len(self.keys))
+        self.keys.append(key)
+        self.items.append([item])
+        self.pages.append([url])
+
+    def ranked(self) -> List[int]:
+        """Group indexes, the most supported first, then in order of first appearance"""
+        return sorted(range(len(self.keys)), key=lambda i: -len(self.pages[i]))
+
+
+def _merge_dict_items(items: List[Dict]) -> Dict:
+    """Merge the dict items of one group (e.g. the same pricing tier seen on several pages)"""
+    merged: Dict[str, Any] = {}
+    for item in items:
+        for key, value in item.items():
+            if _is_placeholder(value):
+                continue
+            if isinstance(value, list):
+                merged.setdefault(key, [])
+                seen = {normalize_item(_item_text(existing)) for existing in merged[key]}
+                for element in value:
+                    element_key = normalize_item(_item_text(element))
+                    if element_key and not any(_same_item(element_key, other) for other in seen):
+                        merged[key].append(element)
+                        seen.add(element_key)
+            elif key not in merged:
+                merged[key] = value
+    return merged
+
+
+def _aggregate_field(values: List[tuple]) -> Optional[Any]:
+    """Aggregate the (url, value) pairs of one field across pages"""
+    present = [(url, value) for url, value in values if not _is_placeholder(value)]
+    if not present:
+        return None
+    if all(isinstance(value, bool) for _, value in present):
+        return {'value': any(value for _, value in present),
+                'pages': [url for url, value in present if value]}
+
+    groups = _ItemGroups()
+    is_list = any(isinstance(value, list) for _, value in present)
+    for url, value in present:
+        for item in (value if isinstance(value, list) else [value]):
+            if not _is_placeholder(item):
+                groups.add(item, url)
+
+    order = range(len(groups.keys)) if is_list else groups.ranked()[:MAX_TEXT_VALUES]
+    aggregated = []
+    for i in order:
+        items = groups.items[i]
+        value = _merge_dict_items(items) if isinstance(items[0], dict) else items[0]
+        aggregated.append({'value': value, 'pages': groups.pages[i]})
+    return aggregated
+
+
+def aggregate_analyses(website_analysis: Dict[str, Dict]) -> Dict[str, Dict[str, Any]]:
+    """
+    Merge the analyses of all the pages of a website into one deterministic aggregate
+
+    List items are unioned and deduplicated (case-, punctuation- and fuzzy-insensitive),
+    'Not specified' placeholders are dropped, dict items such as pricing tiers are
+    merged by name and every item records the pages supporting it. Text fields keep
+    their most supported distinct values, flags are OR-ed.
+
+    Args:
+        website_analysis: Dictionary with URLs as keys and WebsiteAnalysis dicts as values
+
+    Returns:
+        Dict: For each section and specified field, a list of {'value', 'pages'} items
+            ({'value', 'pages'} for flags)
+    """
+    aggregate: Dict[str, Dict[str, Any]] = {}
+    for section in ALL_SECTIONS:
+        field_values: Dict[str, List[tuple]] = {}
+        for url, sections in website_analysis.items():
+            section_data = sections.get(section) if isinstance(sections, dict) else None
+            if not isinstance(section_data, dict):
+                continue
+            for field, value in section_data.items():
+                field_values.setdefault(field, []).append((url, value))
+        aggregate[section] = {}
+        for field, values in field_values.items():
+            aggregated = _aggregate_field(values)
+            if aggregated is not None:
+                aggregate[section][field] = aggregated
+    return aggregate
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, dict):
+        name = value.get('name', '')
+        details = [str(value['price'])] if 'price' in value else []
+        details += [f"{key}: {', '.join(map(str, item)) if isinstance(item, list) else item}"
+                    for key, item in value.items() if key not in ('name', 'price')]
+        return f"{name} ({'; '.join(details)})" if details else str(name)
+    return str(value)
+
+
+def format_aggregate(aggregate: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Render an aggregate as compact text for the summarizer prompt
+
+    Each field takes one line; items supported by several pages are suffixed
+    with their page count so the model can weigh them.
+
+    Args:
+        aggregate: Output of aggregate_analyses
+
+    Returns:
+        Dict: Section names to their text
+    """
+    text = {}
+    for section, fields in aggregate.items():
+        lines = []
+        for field, aggregated in fields.items():
+            if isinstance(aggregated, dict):
+                lines.append(f"{field}: {'yes' if aggregated['value'] else 'no'}")
+                continue
+            items = [_format_value(item['value']) + (f" [{len(item['pages'])} pages]" if len(item['pages']) > 1 else '')
+                     for item in aggregated]
+            lines.append(f"{field}: {' | '.join(items)}")
+        text[section] = "\n".join(lines) or NOT_SPECIFIED
+    return text
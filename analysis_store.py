@@ -0,0 +1,96 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from url_canonical import canonicalize_url
+
+DEFAULT_STORE_PATH = os.path.join('.cache', 'page_analyses.sqlite')
+
+
+class AnalysisStore:
+    """Persistent per-page analyses keyed by canonical URL, for incremental re-crawls."""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        """Initialize the store, creating the database if needed.
+
+        Args:
+            path: Location of the SQLite database file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS page_analyses (
+                canonical_url TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                analyzer_version TEXT NOT NULL,
+                analysis TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def lookup(self, url: str, content_hash: str, analyzer_version: str = "") -> Optional[Dict]:
+        """Return the stored analysis of a page if its text did not change.
+
+        Args:
+            url: URL of the page
+            content_hash: Hash of the page's current clean text
+            analyzer_version: Version of the analyzer prompt and schema
+
+        Returns:
+            dict: The stored analysis, or None if the page is new or changed
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, analyzer_version, analysis FROM page_analyses WHERE canonical_url = ?",
+                (canonicalize_url(url),)
+            ).fetchone()
+        if row is None or row[0] != content_hash or row[1] != analyzer_version:
+            return None
+        return json.loads(row[2])
+
+    def save(self, url: str, content_hash: str, analysis: Dict, analyzer_version: str = ""):
+        """Store the analysis of a page.
+
+        Args:
+            url: URL of the page
+            content_hash: Hash of the analyzed clean text
+            analysis: Output of WebsiteAnalyzer.analyze_content
+            analyzer_version: Version of the analyzer prompt and schema
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO page_analyses VALUES (?, ?, ?, ?, ?, ?)",
+                (canonicalize_url(url), url, content_hash, analyzer_version, json.dumps(analysis), time.time())
+            )
+            self._conn.commit()
+
+    def clear(self):
+        """Remove every stored analysis"""
+        with self._lock:
+            self._conn.execute("DELETE FROM page_analyses")
+            self._conn.commit()
+
+
+_shared_store: Optional[AnalysisStore] = None
+_shared_store_lock = threading.Lock()
+
+
+def get_analysis_store() -> AnalysisStore:
+    """Return the process-wide analysis store, creating it on first use.
+
+    Returns:
+        AnalysisStore: The shared analysis store
+    """
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = AnalysisStore()
+        return _shared_store
@@ -2,17 +2,40 @@ import streamlit as st
 import json
 import os
 from dotenv import load_dotenv
-from website_scraping import WebsiteScraper
-from linkedin_analyzer import LinkedInAnalyzer
-from website_summarizer import WebsiteSummarizer
 from urllib.parse import urlparse
 from get_websites_links import get_company_website
+from job_runner import get_job_runner
+from pipeline import deep_analysis_job, quick_analysis_job
 import time
 
 MISTRAL_API_KEY = st.secrets["MISTRAL_API_KEY"]
 GOOGLE_API_KEY = st.secrets["GOOGLE_API_KEY"]
 CX = st.secrets["GOOGLE_CSE_ID"]
 
+# Analyses run in background jobs shared by all sessions, so they survive reruns and reloads
+runner = get_job_runner()
+
+# Summary sections with their titles and emojis, in display order
+SUMMARY_SECTIONS = [
+    ("company_overview_summary", "🏢 Company Overview"),
+    ("sales_intelligence_summary", "📊 Sales Intelligence"),
+    ("pricing_summary", "💰 Pricing Information"),
+    ("firmographic_summary", "📈 Firmographic Data"),
+    ("gtm_strategy_summary", "🎯 Go-to-Market Strategy"),
+    ("overall_summary", "📝 Overall Summary"),
+]
+
+# Status box labels of the stages of the analysis jobs
+QUICK_STAGE_LABELS = {
+    'crawl': "📊 Analyzing website",
+    'linkedin': "💼 Analyzing LinkedIn",
+    'summary': "🤖 Creating analysis summary",
+}
+DEEP_STAGE_LABELS = {
+    'crawl': "📊 Deep analyzing website",
+    'summary': "🤖 Creating deep analysis summary",
+}
+
 # Configure Streamlit page
 st.set_page_config(
     page_title="Company Intelligence Bot",
@@ -41,10 +64,101 @@ What company would you like to analyze?"""
 
 
 
+def format_summary(summary):
+    """Format the summary sections received so far with their titles and emojis"""
+    return "\n" + "\n\n".join(f"{title} <br>\n{summary[field]}" for field, title in SUMMARY_SECTIONS if field in summary) + "\n"
+
+
+def render_stages(job, labels):
+    """Show each stage of a background job in its own status box"""
+    for name, stage in job.stages.items():
+        label = labels.get(name, name)
+        if stage['state'] == 'running':
+            st.status(label, state="running")
+        elif stage['state'] == 'done':
+            with st.status(f"{label} ({stage['seconds']:.1f}s)", state="complete"):
+                budget = job.partial.get('budget') if name == 'crawl' else None
+                if budget and budget['exhausted']:
+                    st.write(f"⏱️ Crawl stopped early ({budget['exhausted']} budget reached), using the pages analyzed so far")
+                levels = stage.get('levels') or []
+                if len(levels) > 1:
+                    st.caption("🌳 Summarized by groups of pages: " + " → ".join(
+                        f"{level['calls']} call(s) in {level['seconds']:.1f}s" for level in levels))
+        elif stage['state'] == 'failed':
+            with st.status(f"{label} failed", state="error"):
+                st.write(stage.get('error', ''))
+
+
+def submit_job(kind, func, *args, params):
+    """Start an analysis in the background; its id in the URL lets a reloaded page find it again"""
+    job_id = runner.submit(kind, func, *args, params=params)
+    st.session_state.jobs[kind] = job_id
+    st.query_params["job"] = job_id
+    print(f"Submitted {kind} analysis job {job_id}")
+    return job_id
+
+
+@st.fragment(run_every=1)
+def job_progress(job_id, labels, on_finished):
+    """Poll a background job: stage statuses and summary sections are rendered as they
+    arrive, without rerunning the page; the page is rerun once the job is finished"""
+    job = runner.get(job_id)
+    if job is None:
+        st.error("This analysis is no longer available, please start a new one.")
+        if st.button("🔄 Start New Analysis", type="primary"):
+            reset_analysis()
+            st.rerun()
+        return
+    if job.status == 'queued':
+        st.info("⏳ Waiting for other analyses to finish...")
+    render_stages(job, labels)
+    if job.partial.get('summary'):
+        with st.chat_message("assistant"):
+            st.markdown(format_summary(job.partial['summary']), unsafe_allow_html=True)
+    if job.finished:
+        on_finished(job)
+        st.rerun(scope="app")
+
+
+def finish_quick_analysis(job):
+    if job.status == 'failed':
+        st.session_state.messages.append({"role": "assistant", "content": f"❌ The analysis failed: {job.error}"})
+        st.session_state.stage = 0
+        return
+    st.session_state.results["website_analyse_quick"] = job.result['website_analysis']
+    st.session_state.results["linkedin"] = job.result['linkedin']
+    st.session_state.results["summary_quick"] = job.result['summary']
+    # Save the summary to chat history
+    st.session_state.messages.append({"role": "assistant", "content": format_summary(job.result['summary'])})
+    st.session_state.stage = 2
+
+
+def finish_deep_analysis(job):
+    if job.status == 'failed':
+        st.session_state.messages.append({"role": "assistant", "content": f"❌ The deep analysis failed: {job.error}"})
+    else:
+        st.session_state.results["website_analyse_deep"] = job.result['website_analysis']
+        st.session_state.results["summary_deep"] = job.result['summary']
+        st.session_state.messages.append({"role": "assistant", "content": format_summary(job.result['summary'])})
+    st.session_state.stage = 2
+
+
+def reset_analysis():
+    st.session_state.stage = 0
+    st.session_state.results = {}
+    st.session_state.jobs = {}
+    st.query_params.clear()
+
+
 def get_companies_websites(user_input):
     print(f"Searching for {user_input}'s online presence...")
     with st.status(f"🔍 Searching for {user_input}'s online presence...") as status:
-        info = get_company_website(user_input, MISTRAL_API_KEY, GOOGLE_API_KEY, CX)
+        try:
+            info = get_company_website(user_input, MISTRAL_API_KEY, GOOGLE_API_KEY, CX)
+        except Exception as e:
+            print(f"Search failed for {user_input}: {e}")
+            st.error(f"The search failed, please try again later: {e}")
+            return
         print(f"Company info retrieved: {info}")
 
     if info.get('website') or info.get('linkedin'):
@@ -79,12 +193,18 @@ def set_state(i):
 
 def analyse_links(): 
     st.session_state.stage = 1
+    st.session_state.jobs = {}
     with st.chat_message("user"):
         message = "Yes, analyze these sources"
         st.markdown(message)
         st.session_state.messages.append({"role": "user", "content": message})
     
-    
+
+def start_deep_analysis():
+    st.session_state.stage = 3
+    st.session_state.jobs.pop('deep', None)
+    st.session_state.messages.append({"role": "user", "content": "Create deep website analysis"})
+
 
 # Display chat messages
 for message in st.session_state.messages:
@@ -97,6 +217,19 @@ if 'stage' not in st.session_state:
 if 'results' not in st.session_state :
     st.session_state.results = {}
 
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = {}
+    # A reloaded page picks up the analysis of its URL, which kept running meanwhile
+    job = runner.get(st.query_params.get("job"))
+    if job is not None:
+        print(f"Resuming {job.kind} analysis job {job.id}")
+        st.session_state.results.update(job.params)
+        st.session_state.jobs[job.kind] = job.id
+        if st.session_state.results.get('summary_quick'):
+            st.session_state.messages.append({"role": "assistant", "content": format_summary(st.session_state.results['summary_quick'])})
+        st.session_state.stage = 1 if job.kind == 'quick' else 3
+        st.rerun()
+
 if st.session_state.stage == 0:
     prompt = st.chat_input("Enter a company name, LinkedIn URL, or website URL")
     if prompt:
@@ -110,54 +243,13 @@ if st.session_state.stage == 0:
         analyze_input(prompt)
 
 if st.session_state.stage == 1:
-    print("Starting detailed analysis of sources")
-    if st.session_state.results.get('website_url'):
-        print(f"Analyzing website: {st.session_state.results['website_url']}")
-        with st.status(f"📊 Analyzing website: {st.session_state.results['website_url']}"):
-            analyzer = WebsiteScraper(MISTRAL_API_KEY)
-            analyzer.crawl_website(st.session_state.results['website_url'], depth=1, max_links_per_depth=1)
-            st.session_state.results["website_analyse_quick"] = analyzer.get_results()
-    
-    if st.session_state.results.get('linkedin_url'):
-        print(f"Analyzing LinkedIn: {st.session_state.results['linkedin_url']}")
-        with st.status(f"💼 Analyzing LinkedIn: {st.session_state.results['linkedin_url']}"):
-            linkedin_analyzer = LinkedInAnalyzer(api_key=MISTRAL_API_KEY)
-            result = linkedin_analyzer.scrape_and_analyze(st.session_state.results['linkedin_url'])
-            st.session_state.results["linkedin"] = result
-    
-    print("Creating analysis summary")
-    with st.status("🤖 Creating analysis summary..."):
-        summary = WebsiteSummarizer(st.session_state.results["website_analyse_quick"], st.session_state.results["linkedin"],MISTRAL_API_KEY).summarize_analysis()
-        st.session_state.results["summary_quick"] = summary
-
-    # Format the summary with section titles and emojis
-    formatted_summary = f"""
-🏢 Company Overview <br>
-{summary['company_overview_summary']}
-
-📊 Sales Intelligence <br>
-{summary['sales_intelligence_summary']}
-
-💰 Pricing Information <br>
-{summary['pricing_summary']}
-
-📈 Firmographic Data <br>
-{summary['firmographic_summary']}
-
-🎯 Go-to-Market Strategy <br>
-{summary['gtm_strategy_summary']}
-
-📝 Overall Summary <br>
-{summary['overall_summary']}
-"""
-
-    with st.chat_message("assistant"):
-        st.markdown(formatted_summary, unsafe_allow_html=True)
-        
-    # Save the summary to chat history
-    st.session_state.messages.append({"role": "assistant", "content": formatted_summary})
-    
-    st.session_state.stage = 2
+    if 'quick' not in st.session_state.jobs:
+        print("Starting detailed analysis of sources")
+        website_url = st.session_state.results.get('website_url')
+        linkedin_url = st.session_state.results.get('linkedin_url')
+        submit_job('quick', quick_analysis_job, MISTRAL_API_KEY, website_url, linkedin_url,
+                   params={'website_url': website_url, 'linkedin_url': linkedin_url})
+    job_progress(st.session_state.jobs['quick'], QUICK_STAGE_LABELS, finish_quick_analysis)
     
 if st.session_state.stage == 2:
     # Add download buttons for each analysis type
@@ -166,8 +258,7 @@ if st.session_state.stage == 2:
     
     # Add reset button
     if st.button("🔄 Start New Analysis", type="primary"):
-        st.session_state.stage = 0
-        st.session_state.results = {}
+        reset_analysis()
         st.rerun()
     
     with col1:
@@ -208,9 +299,8 @@ if st.session_state.stage == 2:
                 mime="application/json"
             ):
                 print("Deep website analysis downloaded")
-        elif st.session_state.results.get('website_analyse_quick'):
-            if st.button("📊 Create Deep Website Analysis"):
-                st.session_state.stage = 3
+        elif st.session_state.results.get('website_analyse_quick') and st.session_state.results.get('website_url'):
+            st.button("📊 Create Deep Website Analysis", on_click=start_deep_analysis)
     with col5:
         if st.session_state.results.get('summary_deep'):
             if st.download_button(
@@ -224,48 +314,12 @@ if st.session_state.stage == 2:
     print("Analysis completed successfully")
 
 if st.session_state.stage == 3:
-    with st.chat_message("user"):
-        message = "Create deep website analysis"
-        st.markdown(message)
-        st.session_state.messages.append({"role": "user", "content": message})
-    
-    print("Starting deep analysis of website")
-    if st.session_state.results.get('website_url'):
-        print(f"Deep Analyzing website: {st.session_state.results['website_url']}")
-        with st.status(f"📊 Analyzing website: {st.session_state.results['website_url']}"):
-            analyzer = WebsiteScraper(MISTRAL_API_KEY)
-            analyzer.crawl_website(st.session_state.results['website_url'], depth=3, max_links_per_depth=5)
-            st.session_state.results["website_analyse_deep"] = analyzer.get_results()
-        
-        with st.status("🤖 Creating analysis summary..."):
-            summary = WebsiteSummarizer(st.session_state.results["website_analyse_deep"], st.session_state.results["linkedin"], MISTRAL_API_KEY).summarize_analysis()
-            st.session_state.results["summary_deep"] = summary 
-            # Format the summary with section titles and emojis
-        formatted_summary = f"""
-🏢 Company Overview <br>
-{summary['company_overview_summary']}
-
-📊 Sales Intelligence <br>
-{summary['sales_intelligence_summary']}
-
-💰 Pricing Information <br>
-{summary['pricing_summary']}
-
-📈 Firmographic Data <br>
-{summary['firmographic_summary']}
-
-🎯 Go-to-Market Strategy <br>
-{summary['gtm_strategy_summary']}
-
-📝 Overall Summary <br>
-{summary['overall_summary']}
-"""
-
-        with st.chat_message("assistant"):
-            st.markdown(formatted_summary, unsafe_allow_html=True)
-            
-        # Save the summary to chat history
-        st.session_state.messages.append({"role": "assistant", "content": formatted_summary})
-        
+    if not st.session_state.results.get('website_url'):
+        st.session_state.messages.append({"role": "assistant", "content": "No website was found, there is nothing to analyze in depth."})
         st.session_state.stage = 2
         st.rerun()
+    if 'deep' not in st.session_state.jobs:
+        print(f"Deep Analyzing website: {st.session_state.results['website_url']}")
+        submit_job('deep', deep_analysis_job, MISTRAL_API_KEY, st.session_state.results['website_url'],
+                   st.session_state.results.get('linkedin') or {}, params=dict(st.session_state.results))
+    job_progress(st.session_state.jobs['deep'], DEEP_STAGE_LABELS, finish_deep_analysis)
@@ -0,0 +1,87 @@
+"""Micro-benchmark of HTML parsing on a large synthetic marketing page.
+
+Compares the previous pipeline (one html.parser pass to extract links in the
+scraper, a second html.parser pass to clean the text in the analyzer) with the
+single-pass parse_html() on each available parser backend.
+
+Usage:
+    python benchmarks/bench_html_parsing.py [--sections 400] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from html_document import clean_text, parse_html
+
+
+def build_marketing_page(sections: int) -> str:
+    """Build a large marketing page with navigation, inline scripts and many content blocks"""
+    nav = "".join(f'<li><a href="/solutions/item-{i}">Solution {i}</a></li>' for i in range(60))
+    blocks = []
+    for i in range(sections):
+        blocks.append(f"""
+        <section class="feature feature-{i}">
+          <h2>Feature {i}: predictive lead scoring for revenue teams</h2>
+          <p>Our platform helps <strong>B2B SaaS</strong> companies identify the accounts most likely to convert.
+             <a href="/customers/story-{i}">Read the customer story</a> or <a href="/pricing?ref={i}">see pricing</a>.</p>
+          <ul>{"".join(f'<li><span>Benefit {j}</span> for segment {i}</li>' for j in range(5))}</ul>
+          <script>window.dataLayer.push({{"event": "view", "section": {i}}});</script>
+          <style>.feature-{i} {{ color: #{i % 999:03d}; }}</style>
+        </section>""")
+    return f"""<!DOCTYPE html>
+<html><head><title>Example - Predictive Revenue Platform</title>
+<meta name="description" content="Example"><link rel="canonical" href="https://www.example.com/">
+<script>{"var x = 1;" * 2000}</script></head>
+<body><nav><ul>{nav}</ul></nav><main>{"".join(blocks)}</main>
+<footer>{"".join(f'<a href="/legal/page-{i}">Legal {i}</a>' for i in range(40))}</footer></body></html>"""
+
+
+def previous_pipeline(html: str, url: str):
+    """Two html.parser passes, as done before the single-pass document pipeline"""
+    soup = BeautifulSoup(html, 'html.parser')
+    links = [a['href'] for a in soup.find_all('a', href=True)]
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup(["script", "style", "meta", "link"]):
+        element.decompose()
+    return links, clean_text(soup.get_text(separator='\n', strip=True))
+
+
+def timed(func, repeat: int) -> float:
+    """Return the best wall-clock time of several runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sections', type=int, default=400, help='Number of content sections in the page')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of runs per variant')
+    args = parser.parse_args()
+
+    html = build_marketing_page(args.sections)
+    url = "https://www.example.com/"
+    print(f"Page size: {len(html) / 1024:.0f} KiB")
+
+    baseline = timed(lambda: previous_pipeline(html, url), args.repeat)
+    print(f"{'2x html.parser (previous)':<28} {baseline * 1000:8.1f} ms")
+
+    for backend in ('html.parser', 'lxml'):
+        try:
+            BeautifulSoup("<p></p>", backend)
+        except Exception:
+            print(f"{'1x ' + backend:<28} {'not installed':>11}")
+            continue
+        elapsed = timed(lambda: parse_html(html, url, parser=backend), args.repeat)
+        print(f"{'1x ' + backend:<28} {elapsed * 1000:8.1f} ms  ({baseline / elapsed:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
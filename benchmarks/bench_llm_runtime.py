@@ -0,0 +1,90 @@
+"""Micro-benchmark of the LLM setup overhead of the analyzers.
+
+Compares the previous setup (a new ChatMistralAI, parser and chain per
+analyzer, format instructions recomputed on every call) with the shared
+LLMRuntime, both for creating the four analyzer classes and for the per-call
+work done before the request is sent. No request is sent to the API.
+
+Usage:
+    python benchmarks/bench_llm_runtime.py [--calls 200] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_mistralai import ChatMistralAI
+from get_websites_links import SEARCH_ANALYSIS_PROMPT, WebsiteFinder, WebsiteResults
+from linkedin_analyzer import LINKEDIN_PROMPT, LinkedInAnalyzer, LinkedInCompany
+from llm_runtime import LLMRuntime
+from structured_output import RepairingOutputParser, json_mode
+from website_analyzer import ANALYSIS_PROMPT, WebsiteAnalysis, WebsiteAnalyzer
+from website_summarizer import SUMMARY_PROMPT, WebsiteSummarizer, WebsiteSummary
+
+API_KEY = "benchmark-key"
+SCHEMAS = [(ANALYSIS_PROMPT, WebsiteAnalysis), (LINKEDIN_PROMPT, LinkedInCompany),
+           (SUMMARY_PROMPT, WebsiteSummary), (SEARCH_ANALYSIS_PROMPT, WebsiteResults)]
+
+
+def previous_setup():
+    """One model, parser and chain per analyzer, as done before the shared runtime"""
+    for prompt, schema in SCHEMAS:
+        llm = ChatMistralAI(mistral_api_key=API_KEY)
+        parser = RepairingOutputParser.from_llm(schema, llm)
+        prompt | json_mode(llm) | parser
+
+
+def runtime_setup(runtime: LLMRuntime):
+    """The four analyzer classes on a shared runtime"""
+    WebsiteAnalyzer(API_KEY, runtime=runtime)
+    LinkedInAnalyzer(API_KEY, runtime=runtime)
+    WebsiteSummarizer({}, {}, API_KEY, runtime=runtime)
+    WebsiteFinder(API_KEY, runtime=runtime)
+
+
+def previous_call(llm, parser):
+    """Per-call work before the request: chain composition and format instructions"""
+    chain = ANALYSIS_PROMPT | json_mode(llm) | parser
+    return chain, parser.get_format_instructions()
+
+
+def runtime_call(runtime: LLMRuntime):
+    return runtime.chain(ANALYSIS_PROMPT, WebsiteAnalysis), runtime.format_instructions(WebsiteAnalysis)
+
+
+def timed(func, repeat: int) -> float:
+    """Return the best wall-clock time of several runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=200, help='Number of analysis calls per run')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of runs per variant')
+    args = parser.parse_args()
+
+    runtime = LLMRuntime(API_KEY)
+    runtime_setup(runtime)  # warm the shared runtime, as after the first Streamlit run
+
+    baseline = timed(previous_setup, args.repeat)
+    elapsed = timed(lambda: runtime_setup(runtime), args.repeat)
+    print(f"{'Startup, 4 analyzers':<28} previous {baseline * 1000:8.2f} ms   "
+          f"runtime {elapsed * 1000:8.2f} ms  ({baseline / elapsed:.0f}x faster)")
+
+    llm = ChatMistralAI(mistral_api_key=API_KEY)
+    analysis_parser = RepairingOutputParser.from_llm(WebsiteAnalysis, llm)
+    baseline = timed(lambda: [previous_call(llm, analysis_parser) for _ in range(args.calls)], args.repeat)
+    elapsed = timed(lambda: [runtime_call(runtime) for _ in range(args.calls)], args.repeat)
+    print(f"{'Per call overhead':<28} previous {baseline / args.calls * 1e6:8.1f} us   "
+          f"runtime {elapsed / args.calls * 1e6:8.1f} us  ({baseline / elapsed:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
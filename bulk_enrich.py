@@ -0,0 +1,191 @@
+"""Enrich a list of companies in bulk: search, website crawl, LinkedIn and summary.
+
+Reads company names, website URLs or LinkedIn company URLs from a CSV file (a
+company, name, website, url or linkedin column, the first column otherwise) or
+a JSONL file (strings, or objects with the same keys), enriches them with a
+bounded pool of workers and appends one JSON line per company to the output
+as soon as it is done. Finished companies are recorded in a checkpoint file
+next to the output, so an interrupted run started again skips them; failed
+companies (including failed searches and companies without a website or
+LinkedIn page) are written with their error and retried on the next run.
+
+Usage:
+    python bulk_enrich.py companies.csv [-o enriched.jsonl] [--workers 4] [--deep]
+
+Requires MISTRAL_API_KEY, GOOGLE_API_KEY and GOOGLE_CSE_ID in the environment (or .env).
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from dotenv import load_dotenv
+from pipeline import build_enrichment_pipeline
+
+INPUT_KEYS = ('company', 'name', 'website', 'url', 'linkedin')
+
+
+def input_key(value: str) -> str:
+    """Identity of an input in the checkpoint: case and surrounding whitespace are ignored"""
+    return ' '.join(value.lower().split())
+
+
+def _record_value(record: Dict) -> Optional[str]:
+    for key in INPUT_KEYS:
+        if record.get(key):
+            return str(record[key])
+    return None
+
+
+def read_inputs(path: str) -> List[str]:
+    """Read the companies to enrich from a CSV or JSONL file, without duplicates.
+
+    Args:
+        path: Location of the .csv or .jsonl file
+
+    Returns:
+        list: Company names or URLs, in file order
+    """
+    values = []
+    with open(path, newline='', encoding='utf-8') as file:
+        if path.endswith(('.jsonl', '.ndjson')):
+            for line in file:
+                if line.strip():
+                    record = json.loads(line)
+                    values.append(record if isinstance(record, str) else _record_value(record))
+        else:
+            rows = list(csv.reader(file))
+            header = [name.strip().lower() for name in rows[0]] if rows else []
+            column = next((header.index(key) for key in INPUT_KEYS if key in header), None)
+            # Without a known column name, the file is a plain list of companies
+            if column is None:
+                column, header = 0, None
+            values = [row[column] for row in rows[1 if header else 0:] if len(row) > column]
+    unique = {}
+    for value in values:
+        if value and value.strip():
+            unique.setdefault(input_key(value), value.strip())
+    return list(unique.values())
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    """Return the input keys of the companies already enriched"""
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding='utf-8') as file:
+        return {line.rstrip('\n') for line in file if line.strip()}
+
+
+def enrich_company(value: str, mistral_api_key: str, google_api_key: str, cx: str, depth: str = 'quick') -> Dict:
+    """Run search, crawl, LinkedIn analysis and summary for one company.
+
+    Args:
+        value: Company name, website URL or LinkedIn company URL
+        mistral_api_key: Mistral API key for LLM access
+        google_api_key: Google API key
+        cx: Custom Search engine id
+        depth: 'quick' or 'deep' website analysis
+
+    Returns:
+        dict: The sources found, the website and LinkedIn analyses and the summary
+    """
+    pipeline = build_enrichment_pipeline(mistral_api_key, google_api_key, cx, depth=depth)
+    run = pipeline.run({'company': value})
+    result = {
+        'company': value,
+        **run.results['search'],
+        'website_analysis': run.results['crawl']['analysis'],
+        'crawl_budget': run.results['crawl']['budget'],
+        'linkedin_analysis': run.results['linkedin'] or {},
+        'summary': run.results['summary'],
+        'stage_seconds': run.seconds,
+    }
+    if 'linkedin' in run.errors:
+        error = run.errors['linkedin']
+        result['linkedin_error'] = f"{type(error).__name__}: {error}"
+    return result
+
+
+def run_bulk(values: Iterable[str], output_path: str, enrich: Callable[[str], Dict], workers: int = 4,
+             checkpoint_path: Optional[str] = None) -> Dict[str, int]:
+    """Enrich companies with a pool of workers, streaming the results to a JSONL file.
+
+    Args:
+        values: Company names or URLs
+        output_path: JSONL file the results are appended to
+        enrich: Function enriching one company
+        workers: Number of companies enriched at the same time
+        checkpoint_path: File recording the finished companies, next to the output by default
+
+    Returns:
+        dict: Number of companies enriched, failed and skipped (already in the checkpoint)
+    """
+    checkpoint_path = checkpoint_path or output_path + '.checkpoint'
+    done = load_checkpoint(checkpoint_path)
+    values = list(values)
+    pending = [value for value in values if input_key(value) not in done]
+    counts = {'enriched': 0, 'failed': 0, 'skipped': len(values) - len(pending)}
+    print(f"{len(pending)} companies to enrich, {counts['skipped']} already done")
+
+    def timed_enrich(value):
+        start = time.perf_counter()
+        try:
+            return {'input': value, 'status': 'ok', **enrich(value)}, time.perf_counter() - start
+        except Exception as e:
+            return {'input': value, 'status': 'error', 'error': f"{type(e).__name__}: {e}"}, time.perf_counter() - start
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='enrich')
+    try:
+        with open(output_path, 'a', encoding='utf-8') as output, open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+            futures = {pool.submit(timed_enrich, value): value for value in pending}
+            for i, future in enumerate(as_completed(futures), 1):
+                record, seconds = future.result()
+                record['seconds'] = round(seconds, 1)
+                # The result is on disk before the company is marked as done
+                output.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+                output.flush()
+                os.fsync(output.fileno())
+                if record['status'] == 'ok':
+                    checkpoint.write(input_key(record['input']) + '\n')
+                    checkpoint.flush()
+                    counts['enriched'] += 1
+                else:
+                    counts['failed'] += 1
+                print(f"[{i}/{len(pending)}] {record['input']}: {record['status']} in {seconds:.1f}s"
+                      + (f" ({record['error']})" if record['status'] == 'error' else ''))
+    finally:
+        # On interruption, pending companies are dropped: the checkpoint lets the next run resume
+        pool.shutdown(wait=False, cancel_futures=True)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='CSV or JSONL file of company names or URLs')
+    parser.add_argument('-o', '--output', help='JSONL output file (default: <input>.enriched.jsonl)')
+    parser.add_argument('--workers', type=int, default=4, help='Companies enriched at the same time')
+    parser.add_argument('--deep', action='store_true', help='Deep website analysis instead of the quick one')
+    parser.add_argument('--limit', type=int, help='Only enrich the first companies of the file')
+    args = parser.parse_args()
+
+    load_dotenv()
+    keys = [os.getenv('MISTRAL_API_KEY'), os.getenv('GOOGLE_API_KEY'), os.getenv('GOOGLE_CSE_ID')]
+    if not all(keys):
+        sys.exit("MISTRAL_API_KEY, GOOGLE_API_KEY and GOOGLE_CSE_ID environment variables must be set")
+
+    values = read_inputs(args.input)[:args.limit]
+    output = args.output or os.path.splitext(args.input)[0] + '.enriched.jsonl'
+    depth = 'deep' if args.deep else 'quick'
+    try:
+        counts = run_bulk(values, output, lambda value: enrich_company(value, *keys, depth=depth), args.workers)
+    except KeyboardInterrupt:
+        sys.exit(f"Interrupted, run the same command again to resume. Results so far are in {output}")
+    print(f"Done: {counts['enriched']} enriched, {counts['failed']} failed, {counts['skipped']} skipped. "
+          f"Results in {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import hashlib
+import re
+from typing import Dict, List, Optional, Tuple
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and collapse whitespace before fingerprinting"""
+    return re.sub(r'\s+', ' ', text.lower()).strip()
+
+
+def content_hash(text: str) -> str:
+    """Exact fingerprint of the normalized text.
+
+    Args:
+        text: Clean page text
+
+    Returns:
+        str: SHA-256 hex digest of the normalized text
+    """
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+def _shingles(words: List[str], size: int) -> List[str]:
+    """Overlapping word n-grams of the text"""
+    if len(words) <= size:
+        return [' '.join(words)]
+    return [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash of the word shingles of a text.
+
+    Texts sharing most of their shingles get fingerprints that differ in only a
+    few bits, which makes near-duplicates cheap to detect.
+
+    Args:
+        text: Clean page text
+        shingle_size: Number of words per shingle
+
+    Returns:
+        int: The SimHash fingerprint
+    """
+    words = re.findall(r'\w+', normalize_text(text))
+    weights = [0] * SIMHASH_BITS
+    for shingle in _shingles(words, shingle_size):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints"""
+    return bin(a ^ b).count('1')
+
+
+class DuplicateIndex:
+    """Index of page fingerprints detecting exact and near-duplicate texts."""
+
+    def __init__(self, max_distance: int = 3, min_words: int = 30):
+        """Initialize an empty index.
+
+        Args:
+            max_distance: Maximum SimHash Hamming distance between near-duplicates
+                (must be lower than the number of bands)
+            min_words: Texts shorter than this are only compared exactly
+        """
+        self.max_distance = min(max_distance, SIMHASH_BANDS - 1)
+        self.min_words = min_words
+        self._exact: Dict[str, str] = {}
+        self._fingerprints: Dict[str, int] = {}
+        self._bands: List[Dict[int, List[str]]] = [{} for _ in range(SIMHASH_BANDS)]
+
+    @staticmethod
+    def _band_keys(fingerprint: int) -> List[int]:
+        """Split a fingerprint into bands; near-duplicates share at least one band"""
+        width = SIMHASH_BITS // SIMHASH_BANDS
+        return [fingerprint >> (band * width) & ((1 << width) - 1) for band in range(SIMHASH_BANDS)]
+
+    def find(self, text: str) -> Tuple[Optional[str], Optional[str]]:
+        """Look up a text in the index.
+
+        Args:
+            text: Clean page text
+
+        Returns:
+            tuple: (key of the matching document, 'exact' or 'near') or (None, None)
+        """
+        exact = self._exact.get(content_hash(text))
+        if exact is not None:
+            return exact, 'exact'
+        if len(text.split()) < self.min_words:
+            return None, None
+
+        fingerprint = simhash(text)
+        for band, key in enumerate(self._band_keys(fingerprint)):
+            for candidate in self._bands[band].get(key, []):
+                if hamming_distance(fingerprint, self._fingerprints[candidate]) <= self.max_distance:
+                    return candidate, 'near'
+        return None, None
+
+    def add(self, key: str, text: str):
+        """Add a document text to the index.
+
+        Args:
+            key: Identifier of the document (e.g. its URL)
+            text: Clean page text
+        """
+        self._exact.setdefault(content_hash(text), key)
+        if len(text.split()) < self.min_words:
+            return
+        fingerprint = simhash(text)
+        self._fingerprints[key] = fingerprint
+        for band, band_key in enumerate(self._band_keys(fingerprint)):
+            self._bands[band].setdefault(band_key, []).append(key)
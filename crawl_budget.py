@@ -0,0 +1,99 @@
+import threading
+import time
+from typing import Dict, Optional
+
+# Crawl budgets, so that each analysis answers within a predictable time
+QUICK_CRAWL_BUDGET = {"max_pages": 2, "deadline_seconds": 60}
+DEEP_CRAWL_BUDGET = {"max_pages": 40, "max_tokens": 400_000, "deadline_seconds": 300}
+
+
+class CrawlBudget:
+    """Page, LLM token and wall-clock limits of a single crawl."""
+
+    def __init__(self, max_pages: Optional[int] = None, max_tokens: Optional[int] = None,
+                 deadline_seconds: Optional[float] = None):
+        """Initialize the budget. A limit set to None is unbounded.
+
+        Args:
+            max_pages: Maximum number of pages fetched
+            max_tokens: Maximum number of (estimated) LLM tokens spent on page analyses
+            deadline_seconds: Wall-clock time after which no new work is scheduled
+                and pending work is abandoned
+        """
+        self.max_pages = max_pages
+        self.max_tokens = max_tokens
+        self.deadline_seconds = deadline_seconds
+        self.pages_used = 0
+        self.tokens_used = 0
+        self.exhausted: Optional[str] = None
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the wall-clock timer"""
+        self.started_at = time.monotonic()
+
+    def elapsed(self) -> float:
+        """Seconds since the crawl started"""
+        return time.monotonic() - self.started_at
+
+    def time_left(self) -> Optional[float]:
+        """Seconds left before the deadline, None without deadline"""
+        if self.deadline_seconds is None:
+            return None
+        return max(self.deadline_seconds - self.elapsed(), 0.0)
+
+    def _mark(self, budget: str):
+        """Remember the first budget that ran out"""
+        if self.exhausted is None:
+            self.exhausted = budget
+            print(f"Crawl {budget} budget exhausted, returning partial results")
+
+    def check_deadline(self) -> bool:
+        """Whether there is time left, marking the deadline as exhausted otherwise"""
+        if self.time_left() == 0.0:
+            self._mark('deadline')
+            return False
+        return True
+
+    def reserve_pages(self, count: int) -> int:
+        """Reserve up to count page fetches.
+
+        Returns:
+            int: Number of pages that fit in the remaining budget
+        """
+        with self._lock:
+            if self.max_pages is not None and self.pages_used + count > self.max_pages:
+                count = max(self.max_pages - self.pages_used, 0)
+                self._mark('pages')
+            self.pages_used += count
+            return count
+
+    def reserve_tokens(self, tokens: int) -> bool:
+        """Reserve tokens for one LLM call.
+
+        Returns:
+            bool: False if the call does not fit in the remaining token budget
+        """
+        with self._lock:
+            if self.max_tokens is not None and self.tokens_used + tokens > self.max_tokens:
+                self._mark('tokens')
+                return False
+            self.tokens_used += tokens
+            return True
+
+    @property
+    def is_exhausted(self) -> bool:
+        return self.exhausted is not None
+
+    def summary(self) -> Dict:
+        """Describe budget usage and which budget, if any, ran out"""
+        return {
+            'exhausted': self.exhausted,
+            'pages_used': self.pages_used,
+            'max_pages': self.max_pages,
+            'tokens_used': self.tokens_used,
+            'max_tokens': self.max_tokens,
+            'elapsed_seconds': round(self.elapsed(), 2),
+            'deadline_seconds': self.deadline_seconds,
+        }
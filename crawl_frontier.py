@@ -0,0 +1,81 @@
+import re
+from typing import Dict, Iterable, List
+from urllib.parse import urlparse
+
+# URL keywords hinting that a page fills one of the WebsiteAnalysis sections
+SECTION_KEYWORDS: Dict[str, List[str]] = {
+    'pricing': ['pricing', 'plans', 'plan', 'price', 'prices', 'buy', 'subscribe', 'quote'],
+    'product': ['product', 'products', 'platform', 'features', 'feature', 'solutions', 'solution',
+                'integrations', 'how-it-works', 'use-cases', 'use-case', 'services', 'service'],
+    'customers': ['customers', 'customer', 'case-studies', 'case-study', 'testimonials', 'stories',
+                  'success', 'clients', 'references'],
+    'about': ['about', 'about-us', 'company', 'team', 'leadership', 'mission', 'partners', 'partner',
+              'contact', 'who-we-are'],
+}
+
+SECTION_WEIGHTS: Dict[str, float] = {
+    'pricing': 10.0,
+    'product': 8.0,
+    'customers': 7.0,
+    'about': 6.0,
+}
+
+# URL keywords of pages that rarely add business intelligence
+LOW_VALUE_KEYWORDS = ['careers', 'career', 'jobs', 'job', 'blog', 'news', 'press', 'events', 'event',
+                      'webinar', 'webinars', 'legal', 'privacy', 'terms', 'cookie', 'cookies', 'gdpr',
+                      'login', 'signin', 'sign-in', 'signup', 'sign-up', 'register', 'tag', 'tags',
+                      'category', 'categories', 'author', 'page', 'search', 'feed', 'rss', 'wp-content']
+
+LOCALE_SEGMENT = re.compile(r'^[a-z]{2}([-_][a-z]{2})?$')
+
+
+def _path_segments(url: str) -> List[str]:
+    """Split the path of a URL into lowercase segments"""
+    return [segment for segment in urlparse(url).path.lower().split('/') if segment]
+
+
+def score_url(url: str) -> float:
+    """Score how likely a URL is to fill the WebsiteAnalysis sections.
+
+    Args:
+        url: Absolute URL of a candidate page
+
+    Returns:
+        float: Higher scores for pricing, product, customer and about pages,
+            lower scores for deep, localized or low-value pages
+    """
+    segments = _path_segments(url)
+    if not segments:
+        return 20.0
+
+    words = set()
+    for segment in segments:
+        words.add(segment)
+        words.update(re.split(r'[-_.]', segment))
+
+    score = 0.0
+    for section, keywords in SECTION_KEYWORDS.items():
+        if any(keyword in words for keyword in keywords):
+            score += SECTION_WEIGHTS[section]
+
+    if any(keyword in words for keyword in LOW_VALUE_KEYWORDS):
+        score -= 8.0
+    if LOCALE_SEGMENT.match(segments[0]) and segments[0] != 'en':
+        score -= 5.0
+
+    # Prefer shallow, short paths over deep article-like slugs
+    score -= 1.5 * (len(segments) - 1)
+    score -= max(len(segments[-1]) - 30, 0) / 10
+    return score
+
+
+def rank_urls(urls: Iterable[str]) -> List[str]:
+    """Order candidate URLs from highest to lowest value.
+
+    Args:
+        urls: Candidate URLs
+
+    Returns:
+        list: Deduplicated URLs, best first, ties broken by length then alphabetically
+    """
+    return sorted(set(urls), key=lambda url: (-score_url(url), len(url), url))
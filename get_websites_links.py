@@ -1,11 +1,13 @@
 import os
 from dotenv import load_dotenv
-from googleapiclient.discovery import build
 import json
-from langchain_mistralai import ChatMistralAI
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser,OutputFixingParser
+from llm_cache import LLMCache, get_llm_cache
+from llm_executor import LLMExecutor, get_llm_executor
+from llm_runtime import LLMRuntime, get_llm_runtime
+from search_client import get_search_client
+from website_resolver import DEFAULT_MIN_CONFIDENCE, count_resolution, resolve_search
 
 # Load environment variables from .env
 load_dotenv()
@@ -15,20 +17,7 @@ class WebsiteResults(BaseModel):
     website: str = Field(description="URL of the company's website",default="None")
     linkedin: str = Field(description="URL of the company's LinkedIn profile",default="None")
 
-class WebsiteFinder:
-    """A class to find and extract company websites and information from search results using LLM."""
-    
-    def __init__(self, api_key: str):
-        """Initialize the WebsiteFinder with Mistral API key.
-        
-        Args:
-            api_key (str): The Mistral API key for LLM access
-        """
-        self.llm = ChatMistralAI(mistral_api_key=api_key)
-        base_parser = PydanticOutputParser(pydantic_object=WebsiteResults)
-        self.parser = OutputFixingParser.from_llm(parser=base_parser, llm=self.llm)
-        
-        self.prompt = ChatPromptTemplate.from_messages([
+SEARCH_ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
     ("system", """You are an expert at analyzing search results and extracting official company websites and LinkedIn profiles.
 Always return valid JSON data with all specified fields as a SINGLE DICTIONARY (not a list).
 Only return the JSON data, do not add any explanatory text before or after.
@@ -47,10 +36,37 @@ Extract the company's official website URL and LinkedIn profile URL. Follow thes
 Return ONLY the following JSON without any additional text:
 {format_instructions}""")
 ])
+
+class WebsiteFinder:
+    """A class to find and extract company websites and information from search results using LLM."""
+    
+    def __init__(self, api_key: str, llm_cache: LLMCache = None, executor: LLMExecutor = None,
+                 runtime: LLMRuntime = None, min_confidence: float = DEFAULT_MIN_CONFIDENCE):
+        """Initialize the WebsiteFinder with Mistral API key.
+        
+        Args:
+            api_key (str): The Mistral API key for LLM access
+            llm_cache (LLMCache, optional): Cache of LLM responses, defaults to the shared on-disk cache
+            executor (LLMExecutor, optional): Rate-limited LLM executor, defaults to the shared one
+            runtime (LLMRuntime, optional): Shared models, parsers and chains, defaults to the runtime of the API key
+            min_confidence (float, optional): Confidence above which the heuristic resolver's picks are
+                used without asking the LLM
+        """
+        self.runtime = runtime or get_llm_runtime(api_key)
+        self.llm = self.runtime.chat_model()
+        self.llm_cache = llm_cache or get_llm_cache()
+        self.executor = executor or get_llm_executor()
+        self.parser = self.runtime.parser(WebsiteResults)
+        
+        self.prompt = SEARCH_ANALYSIS_PROMPT
+        self.min_confidence = min_confidence
        
     def analyze_search(self, company: str, search_results):
         """Analyze search results to extract company website, LinkedIn profile, and description.
         
+        Unambiguous results (a domain and a LinkedIn company page named after the company)
+        are resolved locally; the LLM only analyzes the others.
+        
         Args:
             company (str): Name of the company to analyze
             search_results (list): List of dictionaries containing search results with 'title', 'link', and 'description'
@@ -65,29 +81,37 @@ Return ONLY the following JSON without any additional text:
         Raises:
             Exception: If there's an error during analysis
         """
+        resolution = resolve_search(company, search_results)
+        resolved = resolution.confidence >= self.min_confidence
+        count_resolution(resolved)
+        if resolved:
+            print(f"Search results resolved without LLM (confidence {resolution.confidence:.2f})")
+            return resolution.to_dict(company)
+        
         try:
-            # Create chain
-            chain = self.prompt | self.llm | self.parser
+            # Shared chain of the prompt and schema
+            chain = self.runtime.chain(self.prompt, WebsiteResults)
             
-            # Invoke chain
-            response = chain.invoke({
+            inputs = {
                 "company": company,
                 "search_result": json.dumps(search_results, indent=2, ensure_ascii=False), 
-                "format_instructions": self.parser.get_format_instructions()
-            })
+                "format_instructions": self.runtime.format_instructions(WebsiteResults)
+            }
             
-            return response.model_dump()
+            # Invoke chain, unless the same search results were already analyzed
+            return self.llm_cache.cached(self.llm.model, self.prompt, inputs,
+                                         lambda: self.executor.invoke(chain, inputs).model_dump())
             
         except Exception as e:
             print(f"Error analyzing content: {e}")
             raise e
 
 def search_google(query: str, google_api_key, cx, num_results: int = 5) -> list:
-    """Search Google Custom Search API for given query.
+    """Search Google Custom Search API for given query, through the shared cached client.
     
     Args:
         query (str): Search query string
-        num_results (int, optional): Number of results to return. Defaults to 10.
+        num_results (int, optional): Number of results to return. Defaults to 5.
         
     Returns:
         list: List of dictionaries containing search results with 'title', 'link', and 'description'
@@ -100,16 +124,7 @@ def search_google(query: str, google_api_key, cx, num_results: int = 5) -> list:
         raise ValueError("GOOGLE_API_KEY and GOOGLE_CSE_ID environment variables must be set")
     
     try:
-        service = build('customsearch', 'v1', developerKey=google_api_key)
-        
-        result = service.cse().list(q=query, cx=cx, num=num_results).execute()
-        if 'items' in result:
-            return [{
-                'title': item.get('title', ''),
-                'link': item.get('link', ''),
-                'description': item.get('snippet', '')
-            } for item in result['items']]
-        return []
+        return get_search_client(google_api_key, cx).search(query, num_results)
         
     except Exception as e:
         print(f"Error during Google search: {str(e)}")
@@ -123,10 +138,16 @@ def get_company_website(company: str,mistral_api_key, google_api_key, cx) -> dic
         
     Returns:
         dict: Dictionary containing company information with website URL, LinkedIn profile, and description
+        
+    Raises:
+        Exception: If every search failed
     """
    
-    # General search for the official website
-    search_results = search_google(company, google_api_key, cx, num_results=5) + search_google(f"{company} linkedin", google_api_key, cx, num_results=5)
+    # General search for the official website and LinkedIn search, in parallel
+    client = get_search_client(google_api_key, cx)
+    search_results = []
+    for results in client.search_many([company, f"{company} linkedin"], num_results=5):
+        search_results += results
     
     results = WebsiteFinder(mistral_api_key).analyze_search(company, search_results)
     return results
@@ -0,0 +1,85 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    DEFAULT_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_PARSER = 'html.parser'
+
+# Elements whose content is never useful text for analysis
+NON_TEXT_TAGS = ["script", "style", "meta", "link", "noscript", "template"]
+
+
+@dataclass
+class ParsedDocument:
+    """Everything the crawl and the analyzers need from one HTML page."""
+    url: str
+    title: str = ""
+    links: List[str] = field(default_factory=list)
+    canonical_url: Optional[str] = None
+    headings: List[str] = field(default_factory=list)
+    text: str = ""
+
+
+def clean_text(text: str) -> str:
+    """Normalize whitespace in extracted text.
+
+    Args:
+        text: Text extracted from the HTML, one block per line
+
+    Returns:
+        str: Non-empty stripped chunks, one per line
+    """
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return '\n'.join(chunk for chunk in chunks if chunk)
+
+
+def parse_html(html_content: str, url: str = "", parser: str = None) -> ParsedDocument:
+    """Parse an HTML page once and extract its links, metadata and clean text.
+
+    Args:
+        html_content: Raw HTML content
+        url: URL the page was fetched from, used to resolve relative links
+        parser: BeautifulSoup parser backend ('lxml' or 'html.parser'), defaults to
+            lxml when it is installed
+
+    Returns:
+        ParsedDocument: The extracted page information
+    """
+    parser = parser or DEFAULT_PARSER
+    try:
+        soup = BeautifulSoup(html_content, parser)
+    except Exception:
+        # Fall back to the pure-Python parser if the fast backend is unavailable or fails
+        soup = BeautifulSoup(html_content, 'html.parser')
+
+    document = ParsedDocument(url=url)
+
+    if soup.title and soup.title.string:
+        document.title = soup.title.string.strip()
+
+    canonical = soup.find('link', rel='canonical', href=True)
+    if canonical:
+        document.canonical_url = urljoin(url, canonical['href'].strip())
+
+    links = []
+    for link in soup.find_all('a', href=True):
+        links.append(urljoin(url, link['href'].strip()))
+    document.links = list(dict.fromkeys(links))
+
+    document.headings = [
+        heading.get_text(separator=' ', strip=True)
+        for heading in soup.find_all(['h1', 'h2', 'h3'])
+    ]
+    document.headings = [heading for heading in document.headings if heading]
+
+    # Remove non-text elements before extracting the text
+    for element in soup(NON_TEXT_TAGS):
+        element.decompose()
+
+    document.text = clean_text(soup.get_text(separator='\n', strip=True))
+    return document
@@ -0,0 +1,189 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import requests
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_CACHE_PATH = os.path.join('.cache', 'http_cache.sqlite')
+
+# Headers that describe the transfer rather than the stored (already decoded) body
+_TRANSFER_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive'}
+
+
+def normalize_cache_key(url: str) -> str:
+    """Normalize a URL into a cache key.
+
+    Args:
+        url: URL to normalize
+
+    Returns:
+        str: The URL with a lowercase scheme and host, without fragment and trailing slash
+    """
+    parsed = urlparse(url)
+    path = parsed.path.rstrip('/')
+    key = f"{parsed.scheme.lower()}://{parsed.netloc.lower()}{path}"
+    if parsed.query:
+        key += f"?{parsed.query}"
+    return key
+
+
+@dataclass
+class CachedResponse:
+    """A response body and its headers as stored in the cache."""
+    url: str
+    status_code: int
+    headers: Dict[str, str]
+    body: bytes
+    stored_at: float
+
+    def is_fresh(self, ttl_seconds: float) -> bool:
+        """Whether the entry can be served without revalidation"""
+        return time.time() - self.stored_at < ttl_seconds
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Build the If-None-Match / If-Modified-Since headers for revalidation"""
+        headers = CaseInsensitiveDict(self.headers)
+        conditional = {}
+        if headers.get('ETag'):
+            conditional['If-None-Match'] = headers['ETag']
+        if headers.get('Last-Modified'):
+            conditional['If-Modified-Since'] = headers['Last-Modified']
+        return conditional
+
+    def to_response(self) -> requests.Response:
+        """Rebuild a requests.Response from the cached entry"""
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.body
+        response._content_consumed = True
+        response.url = self.url
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.from_cache = True
+        return response
+
+
+class HttpCache:
+    """A persistent SQLite cache of HTTP responses keyed by normalized URL."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = 24 * 3600,
+                 max_size_bytes: int = 200 * 1024 * 1024):
+        """Initialize the cache, creating the database if needed.
+
+        Args:
+            path: Location of the SQLite database file
+            ttl_seconds: Time during which an entry is served without contacting the server
+            max_size_bytes: Total body size above which least recently used entries are evicted
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_size_bytes = max_size_bytes
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status_code INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def lookup(self, url: str) -> Optional[CachedResponse]:
+        """Return the cached entry for a URL, if any"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status_code, headers, body, stored_at FROM responses WHERE key = ?",
+                (normalize_cache_key(url),)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?",
+                               (time.time(), normalize_cache_key(url)))
+            self._conn.commit()
+        return CachedResponse(url=row[0], status_code=row[1], headers=json.loads(row[2]),
+                              body=row[3], stored_at=row[4])
+
+    def store(self, url: str, status_code: int, headers, body: bytes):
+        """Store a response body and its headers.
+
+        Args:
+            url: URL the response was fetched from
+            status_code: HTTP status code
+            headers: Response headers
+            body: Decoded response body
+        """
+        if 'no-store' in headers.get('Cache-Control', '').lower():
+            return
+        stored_headers = {k: v for k, v in headers.items() if k.lower() not in _TRANSFER_HEADERS}
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (normalize_cache_key(url), url, status_code, json.dumps(stored_headers),
+                 body, len(body), now, now)
+            )
+            self.stats['stores'] += 1
+            self._evict()
+            self._conn.commit()
+
+    def refresh(self, url: str, headers=None):
+        """Mark an entry as fresh again after a 304 Not Modified revalidation"""
+        with self._lock:
+            if headers:
+                row = self._conn.execute("SELECT headers FROM responses WHERE key = ?",
+                                         (normalize_cache_key(url),)).fetchone()
+                if row:
+                    stored_headers = json.loads(row[0])
+                    for name in ('ETag', 'Last-Modified', 'Cache-Control', 'Expires'):
+                        if headers.get(name):
+                            stored_headers[name] = headers[name]
+                    self._conn.execute("UPDATE responses SET headers = ? WHERE key = ?",
+                                       (json.dumps(stored_headers), normalize_cache_key(url)))
+            self._conn.execute("UPDATE responses SET stored_at = ? WHERE key = ?",
+                               (time.time(), normalize_cache_key(url)))
+            self._conn.commit()
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits in max_size_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_size_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_size_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.stats['evictions'] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return a copy of the hit/miss counters"""
+        with self._lock:
+            return dict(self.stats)
+
+    def record(self, outcome: str):
+        """Increment one of the hit/revalidated/miss counters"""
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
@@ -0,0 +1,237 @@
+import codecs
+import threading
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Dict, Optional, Sequence, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from http_cache import HttpCache
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+
+
+@dataclass
+class FetchResult:
+    """The (possibly truncated) text body of a streamed page fetch."""
+    url: str
+    status_code: int
+    content_type: str = ""
+    text: str = ""
+    truncated: bool = False
+    skipped_reason: Optional[str] = None
+    from_cache: bool = False
+    revalidated: bool = False
+
+
+class _TextCounter(HTMLParser):
+    """Incrementally count the visible text characters of streamed HTML."""
+
+    SKIPPED_TAGS = {'script', 'style', 'noscript', 'template'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.chars = 0
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.chars += len(data.strip())
+
+
+class HttpClient:
+    """A pooled, keep-alive HTTP client shared by all page fetches."""
+
+    def __init__(self, pool_connections: int = 16, pool_maxsize: int = 16,
+                 timeout: Tuple[float, float] = (5.0, 20.0), max_retries: int = 2,
+                 backoff_factor: float = 0.5, cache: Optional[HttpCache] = None):
+        """Initialize the HTTP client.
+
+        Args:
+            pool_connections: Number of per-host connection pools to keep
+            pool_maxsize: Maximum number of keep-alive connections per host
+            timeout: Default (connect, read) timeout in seconds
+            max_retries: Maximum number of retries on connection errors and 429/5xx responses
+            backoff_factor: Exponential backoff factor between retries
+            cache: Optional on-disk response cache consulted before the network
+        """
+        self.timeout = timeout
+        self.cache = cache
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, use_cache: bool = True,
+            **kwargs) -> requests.Response:
+        """Send a GET request through the shared session.
+
+        Fresh cached responses are returned without touching the network. Stale
+        entries are revalidated with a conditional request (ETag/Last-Modified).
+
+        Args:
+            url: URL to fetch
+            headers: Extra headers merged over the default ones
+            use_cache: Whether to consult and fill the response cache
+            **kwargs: Extra arguments passed to requests (e.g. timeout, stream)
+
+        Returns:
+            requests.Response: The HTTP response
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        if self.cache is None or not use_cache:
+            return self.session.get(url, headers=headers, **kwargs)
+
+        entry = self.cache.lookup(url)
+        if entry and entry.is_fresh(self.cache.ttl_seconds):
+            self.cache.record('hits')
+            return entry.to_response()
+
+        request_headers = dict(headers or {})
+        if entry:
+            request_headers.update(entry.conditional_headers())
+        response = self.session.get(url, headers=request_headers, **kwargs)
+
+        if entry and response.status_code == 304:
+            self.cache.record('revalidated')
+            self.cache.refresh(url, response.headers)
+            response.close()
+            cached = entry.to_response()
+            cached.revalidated = True
+            return cached
+
+        self.cache.record('misses')
+        if response.status_code == 200 and not kwargs.get('stream'):
+            self.cache.store(url, response.status_code, response.headers, response.content)
+        return response
+
+    def fetch_page(self, url: str, headers: Optional[Dict[str, str]] = None, max_bytes: int = 2 * 1024 * 1024,
+                   max_text_chars: Optional[int] = None,
+                   allowed_content_types: Sequence[str] = HTML_CONTENT_TYPES) -> FetchResult:
+        """Stream a page, checking its Content-Type before reading and bounding the body size.
+
+        Args:
+            url: URL to fetch
+            headers: Extra headers merged over the default ones
+            max_bytes: Stop reading the body past this many bytes
+            max_text_chars: Stop reading (or, with a cache, decoding) once this many visible text
+                characters were received
+            allowed_content_types: Content types whose body is read, others are skipped
+
+        Returns:
+            FetchResult: The decoded text and whether it was truncated or skipped
+        """
+        response = self.get(url, headers=headers, stream=True)
+        from_cache = getattr(response, 'from_cache', False)
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        result = FetchResult(url=url, status_code=response.status_code, content_type=content_type,
+                             from_cache=from_cache, revalidated=getattr(response, 'revalidated', False))
+
+        if content_type and content_type not in allowed_content_types:
+            response.close()
+            result.skipped_reason = f"content type {content_type}"
+            return result
+
+        declared_length = response.headers.get('Content-Length')
+        if declared_length and declared_length.isdigit() and int(declared_length) > max_bytes:
+            print(f"{url} declares {declared_length} bytes, reading only the first {max_bytes}")
+
+        decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+        counter = _TextCounter() if max_text_chars else None
+        body = bytearray()
+        text_parts = []
+        body_truncated = text_complete = False
+        # Past the text cap, the rest of the body is still downloaded (up to max_bytes) when
+        # it can be cached, so that later fetches of the page are served from the cache
+        cacheable = self.cache is not None and not from_cache and response.status_code == 200
+        try:
+            for chunk in response.iter_content(chunk_size=16 * 1024):
+                if len(body) + len(chunk) > max_bytes:
+                    chunk = chunk[:max_bytes - len(body)]
+                    body_truncated = True
+                body.extend(chunk)
+                if not text_complete:
+                    text = decoder.decode(chunk)
+                    text_parts.append(text)
+                    if counter:
+                        counter.feed(text)
+                        text_complete = counter.chars >= max_text_chars
+                if body_truncated or (text_complete and not cacheable):
+                    break
+            if not text_complete:
+                text_parts.append(decoder.decode(b'', final=True))
+        finally:
+            response.close()
+
+        result.text = ''.join(text_parts)
+        result.truncated = body_truncated or text_complete
+        if cacheable and not body_truncated:
+            self.cache.store(url, response.status_code, response.headers, bytes(body))
+        return result
+
+    def get_pool_stats(self) -> Dict:
+        """Return connection pool statistics.
+
+        Returns:
+            dict: Number of pools, requests sent, new connections opened and
+                the resulting connection reuse rate
+        """
+        pools = self.adapter.poolmanager.pools
+        stats = {'pools': 0, 'requests': 0, 'connections': 0}
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats['pools'] += 1
+            stats['requests'] += pool.num_requests
+            stats['connections'] += pool.num_connections
+        stats['reused'] = max(stats['requests'] - stats['connections'], 0)
+        stats['reuse_rate'] = stats['reused'] / stats['requests'] if stats['requests'] else 0.0
+        return stats
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+_shared_client: Optional[HttpClient] = None
+_shared_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Return the process-wide HTTP client, creating it on first use.
+
+    Returns:
+        HttpClient: The shared HTTP client
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = HttpClient(cache=HttpCache())
+        return _shared_client
@@ -0,0 +1,155 @@
+import dataclasses
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+# Finished jobs are kept this long for the pages polling them, then dropped
+DEFAULT_JOB_TTL_SECONDS = 3600
+
+
+@dataclass
+class Job:
+    """State of a background job, as seen by the pages polling it."""
+    id: str
+    kind: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    status: str = 'queued'
+    # Stage name -> {'state': 'running' | 'done' | 'failed' | 'skipped', 'seconds', 'error'}
+    stages: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # Results available before the end of the job (e.g. the summary sections generated so far)
+    partial: Dict[str, Any] = field(default_factory=dict)
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed')
+
+
+class JobProgress:
+    """Progress reporter handed to a job function, safe to use from any thread."""
+
+    def __init__(self, runner: "JobRunner", job_id: str):
+        self._runner = runner
+        self.job_id = job_id
+
+    def stage(self, name: str, state: str, **details):
+        """Record the state of a stage of the job"""
+        with self._runner._lock:
+            job = self._runner._jobs[self.job_id]
+            job.stages = {**job.stages, name: {'state': state, **details}}
+
+    def update(self, **partial):
+        """Publish partial results; values must not be mutated afterwards (pass copies)"""
+        with self._runner._lock:
+            job = self._runner._jobs[self.job_id]
+            job.partial = {**job.partial, **partial}
+
+    def stage_callback(self) -> Callable[[str, Any, Dict[str, Any]], None]:
+        """Pipeline callback recording the stage events of a pipeline run in the job"""
+        def callback(event: str, stage, details: Dict[str, Any]):
+            state = {'started': 'running'}.get(event, event)
+            self.stage(stage.name, state, **{key: str(value) if key == 'error' else value
+                                             for key, value in details.items() if key in ('seconds', 'error')})
+        return callback
+
+
+class JobRunner:
+    """Runs long analyses in background threads and keeps their progress and results.
+
+    Jobs are identified by an id that pages store (e.g. in st.session_state or the
+    URL) to poll them; progress and results live in the runner, so they survive
+    Streamlit reruns and page reloads. Threads rather than processes: the jobs
+    share the process-wide LLM rate limiter, caches and HTTP connection pools.
+    """
+
+    def __init__(self, max_workers: int = 4, ttl_seconds: float = DEFAULT_JOB_TTL_SECONDS):
+        """Initialize the runner.
+
+        Args:
+            max_workers: Jobs running at the same time, later ones are queued
+            ttl_seconds: Time finished jobs are kept before being dropped
+        """
+        self.max_workers = max_workers
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+
+    def submit(self, kind: str, func: Callable[..., Any], *args, params: Optional[Dict[str, Any]] = None,
+               **kwargs) -> str:
+        """Queue a job.
+
+        Args:
+            kind: Type of job, for the pages displaying it
+            func: Function run as func(progress, *args, **kwargs), its return value is the job result
+            params: Parameters to keep with the job for display or restoration (not passed to func)
+
+        Returns:
+            str: The job id
+        """
+        job = Job(id=uuid.uuid4().hex, kind=kind, params=dict(params or {}))
+        with self._lock:
+            self._purge()
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job.id, func, args, kwargs)
+        return job.id
+
+    def _run(self, job_id: str, func: Callable[..., Any], args, kwargs):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.status, job.started_at = 'running', time.time()
+        try:
+            result = func(JobProgress(self, job_id), *args, **kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            with self._lock:
+                job.status, job.error, job.finished_at = 'failed', f"{type(e).__name__}: {e}", time.time()
+            return
+        with self._lock:
+            job.status, job.result, job.finished_at = 'done', result, time.time()
+
+    def get(self, job_id: Optional[str]) -> Optional[Job]:
+        """Return a snapshot of a job, None if unknown or expired"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dataclasses.replace(job) if job else None
+
+    def _purge(self):
+        """Drop the jobs finished more than ttl_seconds ago"""
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and time.time() - job.finished_at > self.ttl_seconds]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return the number of jobs by status"""
+        with self._lock:
+            stats = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+            for job in self._jobs.values():
+                stats[job.status] += 1
+            return stats
+
+
+_shared_runner: Optional[JobRunner] = None
+_shared_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """Return the process-wide job runner, shared by all Streamlit sessions.
+
+    Returns:
+        JobRunner: The shared runner
+    """
+    global _shared_runner
+    with _shared_runner_lock:
+        if _shared_runner is None:
+            _shared_runner = JobRunner()
+        return _shared_runner
@@ -1,15 +1,16 @@
 import requests
-from bs4 import BeautifulSoup
+from html_document import parse_html
 from typing import Dict, List
 import json
 import os
 from dotenv import load_dotenv
-from langchain_mistralai import ChatMistralAI
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser,OutputFixingParser
-import httpx
-import time
+from http_client import HttpClient, get_http_client
+from llm_cache import LLMCache, get_llm_cache
+from llm_executor import LLMExecutor, get_llm_executor, run_sync
+from llm_runtime import LLMRuntime, get_llm_runtime
+from token_counting import estimate_tokens
 
 # Load environment variables
 load_dotenv()
@@ -29,16 +30,9 @@ class LinkedInCompany(BaseModel):
     specialties: List[str] = Field(description="Company specialties", default_factory=list)
     employees: List[LinkedInEmployee] = Field(description="Key employees", default_factory=list)
 
-class LinkedInAnalyzer:
-    def __init__(self, api_key: str):
-        """Initialize the LinkedIn analyzer with Mistral API key"""
-        self.llm = ChatMistralAI(mistral_api_key=api_key)
-        base_parser = PydanticOutputParser(pydantic_object=LinkedInCompany)
-        self.parser = OutputFixingParser.from_llm(parser=base_parser, llm=self.llm)
-        # Create prompt template for analysis
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are an expert at analyzing LinkedIn company profiles. Always return valid JSON data with all specified fields."),
-            ("human", """Extract company information from the following LinkedIn page content.
+LINKEDIN_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You are an expert at analyzing LinkedIn company profiles. Always return valid JSON data with all specified fields."),
+    ("human", """Extract company information from the following LinkedIn page content.
 Focus on finding these specific details about {company_name}:
 1. Company name
 2. Description/About
@@ -57,7 +51,19 @@ Return the information in this exact JSON format (include all fields even if nul
 {format_instructions}
 
 Only return the JSON object, no other text. For employees, focus on finding leadership roles and list up to 10 employees.""")
-        ])
+])
+
+class LinkedInAnalyzer:
+    def __init__(self, api_key: str, http_client: HttpClient = None, llm_cache: LLMCache = None,
+                 executor: LLMExecutor = None, runtime: LLMRuntime = None):
+        """Initialize the LinkedIn analyzer with Mistral API key"""
+        self.http_client = http_client or get_http_client()
+        self.runtime = runtime or get_llm_runtime(api_key)
+        self.llm = self.runtime.chat_model()
+        self.llm_cache = llm_cache or get_llm_cache()
+        self.executor = executor or get_llm_executor()
+        self.parser = self.runtime.parser(LinkedInCompany)
+        self.prompt = LINKEDIN_PROMPT
         
     def _extract_content_from_html(self, html_content: str) -> str:
         """Extract readable text content from HTML.
@@ -68,21 +74,7 @@ Only return the JSON object, no other text. For employees, focus on finding lead
         Returns:
             str: Clean text content from the HTML
         """
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # Get text content
-        text = soup.get_text(separator='\n', strip=True)
-        
-        # Clean up text
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-        
-        return text
+        return parse_html(html_content).text
 
     def analyze_content(self, content: str, company_name: str = None) -> dict:
         """Analyze LinkedIn content using LLM.
@@ -94,34 +86,33 @@ Only return the JSON object, no other text. For employees, focus on finding lead
         Returns:
             dict: Analyzed LinkedIn data
         """
-        try:
-            # Create chain
-            chain = self.prompt | self.llm | self.parser
-            
-            # Get response
-            response = chain.invoke({
-                "content": content,
-                "company_name": company_name,
-                "format_instructions": self.parser.get_format_instructions()
-            })
+        return run_sync(self.aanalyze_content(content, company_name))
+
+    async def aanalyze_content(self, content: str, company_name: str = None) -> dict:
+        """Async version of analyze_content, rate limited and retried by the shared LLM executor.
+        
+        Args:
+            content (str): LinkedIn profile content to analyze
+            company_name (str, optional): Company name for context
             
+        Returns:
+            dict: Analyzed LinkedIn data
+        """
+        # Shared chain of the prompt and schema
+        chain = self.runtime.chain(self.prompt, LinkedInCompany)
+        inputs = {
+            "content": content,
+            "company_name": company_name,
+            "format_instructions": self.runtime.format_instructions(LinkedInCompany)
+        }
+        
+        async def invoke_chain():
+            response = await self.executor.ainvoke(chain, inputs, estimate_tokens(content) + 2000)
             return response.model_dump()
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 429:  # Rate limit error
-                print("Rate limit exceeded, waiting 5 seconds before retry...")
-                time.sleep(2)  # Wait 2 seconds before retrying
-                try:
-                    # Retry once
-                    response = chain.invoke({
-                        "content": content,
-                        "company_name": company_name,
-                        "format_instructions": self.parser.get_format_instructions()
-                    })
-                    return response.model_dump()
-                except Exception as retry_error:
-                    print(f"Retry failed: {str(retry_error)}")
-                    raise retry_error
-            raise e
+        
+        try:
+            # Get response, unless the same profile content was already analyzed
+            return await self.llm_cache.acached(self.llm.model, self.prompt, inputs, invoke_chain)
         except Exception as e:
             print(f"Error analyzing LinkedIn content: {str(e)}")
             raise e
@@ -137,6 +128,7 @@ Only return the JSON object, no other text. For employees, focus on finding lead
             
         Raises:
             ValueError: If the URL is not a valid LinkedIn company URL
+            requests.HTTPError: If LinkedIn refused the request (e.g. HTTP 999 for bots) or the page was not HTML
         """
         # Validate LinkedIn URL
         if not (linkedin_url.startswith(('http://', 'https://')) and 
@@ -150,16 +142,19 @@ Only return the JSON object, no other text. For employees, focus on finding lead
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
                 'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
                 'Upgrade-Insecure-Requests': '1',
                 'Cache-Control': 'max-age=0'
             }
             
-            response = requests.get(linkedin_url, headers=headers)
+            page = self.http_client.fetch_page(linkedin_url, headers=headers)
+            # Same checks as the website scraper: a login wall or an error page is no profile
+            if page.skipped_reason:
+                raise requests.HTTPError(f"LinkedIn page skipped: {page.skipped_reason}")
+            if page.status_code >= 400:
+                raise requests.HTTPError(f"LinkedIn page returned HTTP {page.status_code}")
             
             # Extract text content
-            content = self._extract_content_from_html(response.text)
+            content = self._extract_content_from_html(page.text)
             
             # Get company name from URL for better context
             company_name = linkedin_url.split('company/')[1].split('/')[0].replace('-', ' ').title()
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from langchain_core.prompts import ChatPromptTemplate
+
+DEFAULT_CACHE_PATH = os.path.join('.cache', 'llm_cache.sqlite')
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def prompt_template_hash(prompt: ChatPromptTemplate) -> str:
+    """Hash the message templates of a prompt, independently of its inputs.
+
+    Args:
+        prompt: The chat prompt template
+
+    Returns:
+        str: SHA-256 hex digest of the message roles and templates
+    """
+    try:
+        templates = [(type(message).__name__, message.prompt.template) for message in prompt.messages]
+    except AttributeError:
+        templates = repr(prompt)
+    return _sha256(json.dumps(templates))
+
+
+def cache_key(model: str, prompt: ChatPromptTemplate, inputs: Dict) -> str:
+    """Build the content address of an LLM call.
+
+    Args:
+        model: Name of the LLM model
+        prompt: The chat prompt template
+        inputs: Variables passed to the prompt
+
+    Returns:
+        str: SHA-256 of the model name, the prompt template hash and the input hash
+    """
+    input_hash = _sha256(json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str))
+    return _sha256(f"{model}\0{prompt_template_hash(prompt)}\0{input_hash}")
+
+
+class LLMCache:
+    """A persistent SQLite cache of parsed LLM responses shared by all analyzers."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = 7 * 24 * 3600,
+                 max_size_bytes: int = 100 * 1024 * 1024):
+        """Initialize the cache, creating the database if needed.
+
+        Args:
+            path: Location of the SQLite database file
+            ttl_seconds: Age after which a cached response is ignored and recomputed
+            max_size_bytes: Total size above which least recently used entries are evicted
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_size_bytes = max_size_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, model: str, prompt: ChatPromptTemplate, inputs: Dict) -> Optional[Dict]:
+        """Return the cached response of an LLM call, if any and not expired"""
+        key = cache_key(model, prompt, inputs)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.stats['misses'] += 1
+                return None
+            self._conn.execute("UPDATE llm_responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.stats['hits'] += 1
+        return json.loads(row[0])
+
+    def set(self, model: str, prompt: ChatPromptTemplate, inputs: Dict, value: Dict):
+        """Store the parsed response of an LLM call"""
+        key = cache_key(model, prompt, inputs)
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?, ?)",
+                               (key, model, data, len(data), now, now))
+            self.stats['stores'] += 1
+            self._evict()
+            self._conn.commit()
+
+    def cached(self, model: str, prompt: ChatPromptTemplate, inputs: Dict, compute: Callable[[], Dict]) -> Dict:
+        """Return the cached response of an LLM call, computing and storing it on a miss.
+
+        Args:
+            model: Name of the LLM model
+            prompt: The chat prompt template
+            inputs: Variables passed to the prompt
+            compute: Function performing the LLM call and returning a JSON-serializable dict
+
+        Returns:
+            dict: The cached or freshly computed response
+        """
+        value = self.get(model, prompt, inputs)
+        if value is None:
+            value = compute()
+            self.set(model, prompt, inputs, value)
+        return value
+
+    async def acached(self, model: str, prompt: ChatPromptTemplate, inputs: Dict,
+                      compute: Callable[[], Awaitable[Dict]]) -> Dict:
+        """Async version of cached, where compute is a coroutine function"""
+        value = self.get(model, prompt, inputs)
+        if value is None:
+            value = await compute()
+            self.set(model, prompt, inputs, value)
+        return value
+
+    def _evict(self):
+        """Delete expired entries, then least recently used ones until the cache fits in max_size_bytes"""
+        cursor = self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        self.stats['evictions'] += cursor.rowcount
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        if total <= self.max_size_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM llm_responses ORDER BY last_access ASC").fetchall():
+            if total <= self.max_size_bytes:
+                break
+            self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            total -= size
+            self.stats['evictions'] += 1
+
+    def get_stats(self) -> Dict:
+        """Return the hit/miss counters and the hit rate"""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+            self._conn.commit()
+
+
+_shared_cache: Optional[LLMCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Return the process-wide LLM cache, creating it on first use.
+
+    Returns:
+        LLMCache: The shared LLM cache
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMCache()
+        return _shared_cache
@@ -0,0 +1,390 @@
+import asyncio
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Coroutine, Dict, Iterator, Optional
+import httpx
+from structured_output import OutputFixNeeded
+from token_counting import estimate_tokens
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """Process-wide token buckets for requests per minute and tokens per minute."""
+
+    def __init__(self, requests_per_minute: float = 60, tokens_per_minute: float = 500_000,
+                 request_burst: Optional[float] = None):
+        """Initialize full buckets.
+
+        Args:
+            requests_per_minute: Sustained request rate allowed by the LLM quota
+            tokens_per_minute: Sustained token rate allowed by the LLM quota
+            request_burst: Number of requests that may be sent back to back, defaults
+                to one second worth of requests (at least one)
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.request_burst = request_burst or max(requests_per_minute / 60, 1.0)
+        self._requests = float(self.request_burst)
+        self._tokens = float(tokens_per_minute)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """Take one request and some tokens from the buckets.
+
+        The buckets may go negative: the caller then waits until they refill,
+        which keeps reservations first-come first-served.
+
+        Returns:
+            float: Seconds to wait before sending the request
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated_at
+            self._updated_at = now
+            self._requests = min(self.request_burst, self._requests + elapsed * self.requests_per_minute / 60)
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+            self._requests -= 1
+            self._tokens -= min(tokens, self.tokens_per_minute)
+            return max(-self._requests * 60 / self.requests_per_minute,
+                       -self._tokens * 60 / self.tokens_per_minute,
+                       0.0)
+
+    async def acquire(self, tokens: int = 0):
+        """Wait until a request of this size fits in the quota"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self, tokens: int = 0):
+        """Blocking version of acquire"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+
+def _retry_delay(error: Exception) -> Optional[float]:
+    """Return the delay requested by the server (Retry-After) for retryable errors, None otherwise"""
+    if isinstance(error, httpx.HTTPStatusError):
+        if error.response.status_code not in RETRYABLE_STATUS_CODES:
+            return None
+        retry_after = error.response.headers.get('Retry-After', '')
+        return float(retry_after) if retry_after.replace('.', '', 1).isdigit() else 0.0
+    if isinstance(error, (httpx.TransportError, asyncio.TimeoutError)):
+        return 0.0
+    return None
+
+
+class LLMExecutor:
+    """Runs LLM chains concurrently within the rate limits, retrying rate-limited and failed calls."""
+
+    def __init__(self, rate_limiter: RateLimiter = None, max_in_flight: int = 4, max_retries: int = 4,
+                 base_delay: float = 1.0, max_delay: float = 30.0):
+        """Initialize the executor.
+
+        Args:
+            rate_limiter: Request and token rate limiter, defaults to a new one
+            max_in_flight: Maximum number of LLM calls running at the same time
+            max_retries: Maximum number of retries on 429/5xx and transport errors
+            base_delay: First backoff delay in seconds, doubled at each retry
+            max_delay: Upper bound of a backoff delay in seconds
+        """
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = {'calls': 0, 'retries': 0, 'failures': 0}
+        # Only used on the LLM loop, where every call runs whatever loop awaits it:
+        # an asyncio semaphore is shared by all callers without polling
+        self._slots = asyncio.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+
+    async def _invoke_in_slot(self, chain, inputs: Dict) -> Any:
+        """Invoke a chain once an in-flight slot is free (runs on the LLM loop)"""
+        async with self._slots:
+            return await chain.ainvoke(inputs)
+
+    async def _stream_in_slot(self, chain, inputs: Dict) -> AsyncIterator[Any]:
+        """Stream a chain once an in-flight slot is free, holding it until the stream ends (runs on the LLM loop)"""
+        async with self._slots:
+            async for chunk in chain.astream(inputs):
+                yield chunk
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _backoff(self, attempt: int, server_delay: float) -> float:
+        """Exponential backoff with full jitter, never shorter than the server's Retry-After"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, server_delay)
+
+    async def ainvoke(self, chain, inputs: Dict, estimated_tokens: int = 0) -> Any:
+        """Invoke a chain asynchronously within the concurrency and rate limits.
+
+        An output its parser cannot repair locally is fixed by a second LLM call,
+        itself rate limited, retried and counted.
+
+        Args:
+            chain: LangChain runnable (e.g. prompt | llm | parser)
+            inputs: Variables passed to the chain
+            estimated_tokens: Estimated prompt and completion tokens of the call
+
+        Returns:
+            The chain output
+        """
+        try:
+            return await self._ainvoke(chain, inputs, estimated_tokens)
+        except OutputFixNeeded as e:
+            return await self._afix_output(e)
+
+    async def aparse(self, parser, text: str) -> Any:
+        """Parse a model output, fixing it with an LLM call when local repair fails.
+
+        Args:
+            parser: Output parser of the expected schema (e.g. a RepairingOutputParser)
+            text: Raw model output
+
+        Returns:
+            The parsed output
+        """
+        try:
+            return parser.parse(text)
+        except OutputFixNeeded as e:
+            return await self._afix_output(e)
+
+    async def _afix_output(self, error: OutputFixNeeded) -> Any:
+        """Ask the model to fix an output, then parse its answer"""
+        inputs = error.fix_inputs()
+        # The fixed output is about as long as the broken one
+        estimated_tokens = estimate_tokens(''.join(inputs.values())) + estimate_tokens(error.text)
+        fixed = await self._ainvoke(error.parser.fix_chain, inputs, estimated_tokens)
+        return error.parser.parse_fixed(fixed)
+
+    async def _ainvoke(self, chain, inputs: Dict, estimated_tokens: int) -> Any:
+        """Invoke a chain once rate limit tokens and a slot are available, retrying failed calls"""
+        attempt = 0
+        while True:
+            # Rate limit tokens first: a call waiting for the quota does not hold a slot
+            await self.rate_limiter.acquire(estimated_tokens)
+            try:
+                self._count('calls')
+                return await run_on_llm_loop(self._invoke_in_slot(chain, inputs))
+            except OutputFixNeeded:
+                # The call succeeded, its output is fixed by the caller
+                raise
+            except Exception as e:
+                server_delay = _retry_delay(e)
+                if server_delay is None or attempt >= self.max_retries:
+                    self._count('failures')
+                    raise
+                error_name = type(e).__name__
+
+            delay = self._backoff(attempt, server_delay)
+            attempt += 1
+            self._count('retries')
+            print(f"LLM call failed ({error_name}), retrying in {delay:.1f}s (attempt {attempt}/{self.max_retries})")
+            await asyncio.sleep(delay)
+
+    async def astream(self, chain, inputs: Dict, estimated_tokens: int = 0) -> AsyncIterator[Any]:
+        """Stream the output chunks of a chain within the concurrency and rate limits.
+
+        Failed calls are only retried until the first chunk was produced.
+
+        Args:
+            chain: LangChain runnable (e.g. prompt | llm)
+            inputs: Variables passed to the chain
+            estimated_tokens: Estimated prompt and completion tokens of the call
+
+        Yields:
+            The chain output chunks
+        """
+        attempt = 0
+        while True:
+            streamed = False
+            await self.rate_limiter.acquire(estimated_tokens)
+            try:
+                self._count('calls')
+                async for chunk in stream_on_llm_loop(self._stream_in_slot(chain, inputs)):
+                    streamed = True
+                    yield chunk
+                return
+            except Exception as e:
+                server_delay = _retry_delay(e)
+                if streamed or server_delay is None or attempt >= self.max_retries:
+                    self._count('failures')
+                    raise
+                error_name = type(e).__name__
+
+            delay = self._backoff(attempt, server_delay)
+            attempt += 1
+            self._count('retries')
+            print(f"LLM call failed ({error_name}), retrying in {delay:.1f}s (attempt {attempt}/{self.max_retries})")
+            await asyncio.sleep(delay)
+
+    def invoke(self, chain, inputs: Dict, estimated_tokens: int = 0) -> Any:
+        """Blocking version of ainvoke"""
+        return run_sync(self.ainvoke(chain, inputs, estimated_tokens))
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return the call, retry and failure counters"""
+        with self._lock:
+            return dict(self.stats)
+
+
+_llm_loop: Optional[asyncio.AbstractEventLoop] = None
+_llm_loop_lock = threading.Lock()
+
+
+def get_llm_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide event loop running the LLM calls, started on first use.
+
+    The chat models are shared by the whole process, and the pooled connections
+    of their async HTTP clients belong to the loop that opened them: used from
+    another loop once that one is closed, they fail with "Event loop is closed".
+    All LLM calls therefore run on this long-lived loop, in a daemon thread,
+    whatever loop or thread awaits them.
+    """
+    global _llm_loop
+    with _llm_loop_lock:
+        if _llm_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='llm-loop', daemon=True).start()
+            _llm_loop = loop
+        return _llm_loop
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+async def run_on_llm_loop(coroutine: Coroutine) -> Any:
+    """Await a coroutine run on the LLM loop, from any event loop.
+
+    Cancelling the awaiting task cancels the coroutine.
+    """
+    loop = get_llm_loop()
+    if _running_loop() is loop:
+        return await coroutine
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, loop))
+
+
+async def stream_on_llm_loop(iterable: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """Iterate over an async iterator run on the LLM loop, from any event loop"""
+    loop = get_llm_loop()
+    if _running_loop() is loop:
+        async for item in iterable:
+            yield item
+        return
+
+    caller = asyncio.get_running_loop()
+    items: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def produce():
+        try:
+            async for item in iterable:
+                caller.call_soon_threadsafe(items.put_nowait, (item, None))
+        except Exception as e:
+            caller.call_soon_threadsafe(items.put_nowait, (None, e))
+        else:
+            caller.call_soon_threadsafe(items.put_nowait, (done, None))
+
+    producer = asyncio.run_coroutine_threadsafe(produce(), loop)
+    try:
+        while True:
+            item, error = await items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        producer.cancel()
+
+
+def run_sync(coroutine: Coroutine) -> Any:
+    """Run a coroutine to completion from synchronous code.
+
+    The coroutine runs on the LLM loop rather than on a new loop per call, so
+    the connections of the shared chat models stay usable across calls.
+
+    Raises:
+        RuntimeError: If called from a coroutine running on the LLM loop, which
+            would wait for itself
+    """
+    loop = get_llm_loop()
+    if _running_loop() is loop:
+        coroutine.close()
+        raise RuntimeError("run_sync cannot be called from the LLM loop, await the coroutine instead")
+    future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+    try:
+        return future.result()
+    except BaseException:
+        # Interrupted (e.g. KeyboardInterrupt): stop the coroutine too
+        future.cancel()
+        raise
+
+
+def iterate_sync(iterable: AsyncIterator[Any]) -> Iterator[Any]:
+    """Iterate over an async iterator from synchronous code.
+
+    The iterator runs on the LLM loop; items are handed over as soon as they
+    are produced. Closing the generator early cancels the iteration.
+    """
+    items: queue.Queue = queue.Queue()
+    done = object()
+
+    async def consume():
+        try:
+            async for item in iterable:
+                items.put((item, None))
+        except Exception as e:
+            items.put((None, e))
+        finally:
+            items.put((done, None))
+
+    future = asyncio.run_coroutine_threadsafe(consume(), get_llm_loop())
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                break
+            yield item
+    finally:
+        future.cancel()
+
+
+_shared_executor: Optional[LLMExecutor] = None
+_shared_executor_lock = threading.Lock()
+
+
+def get_llm_executor() -> LLMExecutor:
+    """Return the process-wide LLM executor, creating it on first use.
+
+    The Mistral quota can be set with the MISTRAL_REQUESTS_PER_MINUTE,
+    MISTRAL_TOKENS_PER_MINUTE and MISTRAL_MAX_IN_FLIGHT environment variables.
+
+    Returns:
+        LLMExecutor: The shared LLM executor
+    """
+    global _shared_executor
+    with _shared_executor_lock:
+        if _shared_executor is None:
+            rate_limiter = RateLimiter(
+                requests_per_minute=float(os.getenv('MISTRAL_REQUESTS_PER_MINUTE', 60)),
+                tokens_per_minute=float(os.getenv('MISTRAL_TOKENS_PER_MINUTE', 500_000)),
+            )
+            _shared_executor = LLMExecutor(rate_limiter, max_in_flight=int(os.getenv('MISTRAL_MAX_IN_FLIGHT', 4)))
+        return _shared_executor
@@ -0,0 +1,99 @@
+import threading
+from typing import Dict, Optional, Tuple
+from langchain_core.language_models import BaseChatModel
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+from langchain_mistralai import ChatMistralAI
+from structured_output import RepairingOutputParser, json_mode
+
+DEFAULT_MODEL = "mistral-small"
+
+
+class LLMRuntime:
+    """Chat models, parsers and chains shared by every analyzer using the same API key.
+
+    Each model is created once, so all analyzers share its pooled HTTP clients,
+    and chains and format instructions are built once per prompt and schema.
+    The async client's connections belong to one event loop: the LLMExecutor
+    runs every call on the process-wide LLM loop (see llm_executor.get_llm_loop).
+    """
+
+    def __init__(self, api_key: str, models: Optional[Dict[str, BaseChatModel]] = None):
+        """Initialize an empty runtime.
+
+        Args:
+            api_key: Mistral API key for LLM access
+            models: Chat models to use instead of creating ChatMistralAI ones, by model name
+        """
+        self.api_key = api_key
+        self._models: Dict[str, BaseChatModel] = dict(models or {})
+        self._parsers: Dict[Tuple[type, str], RepairingOutputParser] = {}
+        self._format_instructions: Dict[type, str] = {}
+        # Keyed on id(prompt): the cached entry keeps the prompt alive so its id is never reused
+        self._chains: Dict[Tuple[int, Optional[type], str, bool], Tuple[ChatPromptTemplate, Runnable]] = {}
+        self._lock = threading.RLock()
+
+    def chat_model(self, model: str = DEFAULT_MODEL) -> BaseChatModel:
+        """Return the shared chat model of a model name"""
+        with self._lock:
+            if model not in self._models:
+                self._models[model] = ChatMistralAI(mistral_api_key=self.api_key, model=model)
+            return self._models[model]
+
+    def parser(self, schema: type, model: str = DEFAULT_MODEL) -> RepairingOutputParser:
+        """Return the shared output parser of a schema, fixing outputs with the given model"""
+        key = (schema, model)
+        with self._lock:
+            if key not in self._parsers:
+                self._parsers[key] = RepairingOutputParser.from_llm(schema, self.chat_model(model))
+            return self._parsers[key]
+
+    def format_instructions(self, schema: type) -> str:
+        """Return the format instructions of a schema, computed once"""
+        with self._lock:
+            if schema not in self._format_instructions:
+                self._format_instructions[schema] = self.parser(schema).get_format_instructions()
+            return self._format_instructions[schema]
+
+    def chain(self, prompt: ChatPromptTemplate, schema: Optional[type], model: str = DEFAULT_MODEL,
+              json_output: bool = True) -> Runnable:
+        """Return the prompt | model | parser chain of a prompt and output schema, built once.
+
+        Args:
+            prompt: The chat prompt template, expected to live as long as the process
+            schema: Pydantic model of the expected output, None for a chain returning
+                the raw model messages (e.g. for streaming)
+            model: Name of the chat model
+            json_output: Whether to ask the model for a JSON object response
+
+        Returns:
+            Runnable: The chain
+        """
+        key = (id(prompt), schema, model, json_output)
+        with self._lock:
+            if key not in self._chains:
+                llm = self.chat_model(model)
+                chain = prompt | (json_mode(llm) if json_output else llm)
+                if schema is not None:
+                    chain = chain | self.parser(schema, model)
+                self._chains[key] = (prompt, chain)
+            return self._chains[key][1]
+
+
+_runtimes: Dict[str, LLMRuntime] = {}
+_runtimes_lock = threading.Lock()
+
+
+def get_llm_runtime(api_key: str) -> LLMRuntime:
+    """Return the process-wide runtime of an API key, creating it on first use.
+
+    Args:
+        api_key: Mistral API key for LLM access
+
+    Returns:
+        LLMRuntime: The shared runtime
+    """
+    with _runtimes_lock:
+        if api_key not in _runtimes:
+            _runtimes[api_key] = LLMRuntime(api_key)
+        return _runtimes[api_key]
@@ -0,0 +1,86 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+from crawl_frontier import SECTION_KEYWORDS
+
+ALL_SECTIONS: Tuple[str, ...] = ('company_overview', 'sales_intelligence', 'pricing', 'firmographic', 'gtm_strategy')
+
+# WebsiteAnalysis sections each page type can fill
+PAGE_TYPE_SECTIONS: Dict[str, Tuple[str, ...]] = {
+    'home': ALL_SECTIONS,
+    'pricing': ('pricing',),
+    'product': ('company_overview', 'sales_intelligence'),
+    'customers': ('sales_intelligence', 'firmographic'),
+    'about': ('company_overview', 'firmographic'),
+    'careers': ('company_overview', 'firmographic'),
+    'content': ('company_overview', 'gtm_strategy'),
+    'other': ALL_SECTIONS,
+}
+
+# URL keywords of the page types not used for crawl ranking
+PAGE_TYPE_KEYWORDS: Dict[str, List[str]] = {
+    **SECTION_KEYWORDS,
+    'careers': ['careers', 'career', 'jobs', 'job', 'hiring', 'join-us'],
+    'content': ['blog', 'news', 'press', 'articles', 'article', 'resources', 'events', 'webinar', 'webinars',
+                'podcast', 'guides', 'guide', 'ebook', 'whitepaper', 'docs', 'documentation'],
+}
+
+# Checked in this order: the most specific page types first
+PAGE_TYPE_PRIORITY = ['pricing', 'customers', 'careers', 'content', 'product', 'about']
+
+# Page types whose URL prefix applies to every page below it (/blog/how-pricing-works is a blog post)
+CONTAINER_PAGE_TYPES = ['content', 'careers']
+
+
+def _words(text: str) -> set:
+    """Lowercase words and hyphenated phrases of a URL path or heading"""
+    text = text.lower()
+    words = set(re.split(r'[^a-z0-9]+', text))
+    words.update(re.split(r'[/\s]+', text))
+    words.update('-'.join(phrase.split()) for phrase in re.split(r'[^a-z0-9 ]+', text))
+    words.discard('')
+    return words
+
+
+def classify_page(url: str, headings: Optional[Iterable[str]] = None) -> str:
+    """Guess the type of a page from its URL, then from its headings.
+
+    Args:
+        url: URL of the page
+        headings: h1-h3 headings of the page
+
+    Returns:
+        str: One of the PAGE_TYPE_SECTIONS keys
+    """
+    path = urlparse(url).path.strip('/')
+    if not path:
+        return 'home'
+
+    path_words = _words(path)
+    for page_type in CONTAINER_PAGE_TYPES:
+        if any(keyword in _words(segment) for segment in path.split('/')[:-1]
+               for keyword in PAGE_TYPE_KEYWORDS[page_type]):
+            return page_type
+    for page_type in PAGE_TYPE_PRIORITY:
+        if any(keyword in path_words for keyword in PAGE_TYPE_KEYWORDS[page_type]):
+            return page_type
+
+    # Only the first headings describe the page, later ones are often footer or menu titles.
+    # Headings hinting at several page types describe a mixed page, which gets the full schema
+    heading_words = _words(' / '.join(list(headings or [])[:3]))
+    heading_types = [page_type for page_type in PAGE_TYPE_PRIORITY
+                     if any(keyword in heading_words for keyword in PAGE_TYPE_KEYWORDS[page_type])]
+    return heading_types[0] if len(heading_types) == 1 else 'other'
+
+
+def sections_for_page(url: str, headings: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """Return the WebsiteAnalysis sections worth extracting from a page.
+
+    Args:
+        url: URL of the page
+        headings: h1-h3 headings of the page
+
+    Returns:
+        tuple: Section names, in WebsiteAnalysis order
+    """
+    return PAGE_TYPE_SECTIONS[classify_page(url, headings)]
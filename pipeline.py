@@ -0,0 +1,323 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+from crawl_budget import DEEP_CRAWL_BUDGET, QUICK_CRAWL_BUDGET
+from get_websites_links import get_company_website
+from job_runner import JobProgress
+from linkedin_analyzer import LinkedInAnalyzer
+from website_scraping import WebsiteScraper
+from website_summarizer import WebsiteSummarizer
+
+# Crawl shape and budget of each analysis depth, as in the Streamlit app. The quick
+# analysis reads the homepage and the most valuable page linked from it or its sitemap
+CRAWL_SETTINGS = {
+    'quick': {'depth': 2, 'max_links_per_depth': 1, **QUICK_CRAWL_BUDGET},
+    'deep': {'depth': 3, 'max_links_per_depth': 5, **DEEP_CRAWL_BUDGET},
+}
+
+# Called with the event ('started', 'done', 'failed' or 'skipped'), the stage and details
+StageCallback = Callable[[str, "Stage", Dict[str, Any]], None]
+
+
+@dataclass
+class Stage:
+    """A step of a pipeline, run once all the stages it depends on are done."""
+    name: str
+    func: Callable[[Dict[str, Any]], Any]
+    depends_on: Tuple[str, ...] = ()
+    label: str = ''
+    # A failed optional stage gives None to the stages depending on it instead of skipping them
+    optional: bool = False
+
+
+@dataclass
+class PipelineRun:
+    """Results, status and duration of each stage of a pipeline run."""
+    results: Dict[str, Any] = field(default_factory=dict)
+    status: Dict[str, str] = field(default_factory=dict)
+    seconds: Dict[str, float] = field(default_factory=dict)
+    errors: Dict[str, Exception] = field(default_factory=dict)
+
+
+class Pipeline:
+    """Runs stages in dependency order, independent stages concurrently.
+
+    Stage functions run in worker threads; callbacks always run on the thread
+    calling run(), so they can safely update a Streamlit page.
+    """
+
+    def __init__(self, stages: Iterable[Stage], max_workers: int = 4):
+        """Initialize the pipeline.
+
+        Args:
+            stages: The stages, each depending only on stages listed or on run() inputs
+            max_workers: Maximum number of stages running at the same time
+
+        Raises:
+            ValueError: If a stage name is repeated or the dependencies have a cycle
+        """
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate pipeline stage: {stage.name}")
+            self.stages[stage.name] = stage
+        self.max_workers = max_workers
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        visiting, visited = set(), set()
+
+        def visit(name):
+            if name in visited or name not in self.stages:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline dependency cycle through stage: {name}")
+            visiting.add(name)
+            for dependency in self.stages[name].depends_on:
+                visit(dependency)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def _required(self, targets: Optional[Iterable[str]], inputs: Dict[str, Any]) -> Set[str]:
+        """Stages to run: the targets and their dependencies not given as inputs"""
+        required, pending = set(), list(self.stages if targets is None else targets)
+        while pending:
+            name = pending.pop()
+            if name in required or name in inputs:
+                continue
+            if name not in self.stages:
+                raise ValueError(f"Unknown pipeline stage: {name}")
+            required.add(name)
+            pending.extend(self.stages[name].depends_on)
+        return required
+
+    def run(self, inputs: Optional[Dict[str, Any]] = None, targets: Optional[Iterable[str]] = None,
+            callback: Optional[StageCallback] = None) -> PipelineRun:
+        """Run the stages needed for the targets.
+
+        Args:
+            inputs: Initial values, by name; a stage whose name is given is not run
+            targets: Stages whose results are wanted, all of them by default
+            callback: Function notified of each stage event, on the calling thread
+
+        Returns:
+            PipelineRun: The results of the inputs and of the stages run
+
+        Raises:
+            Exception: The error of the first failed non-optional stage, once the
+                stages already running are done
+        """
+        inputs = dict(inputs or {})
+        run = PipelineRun(results=dict(inputs))
+        remaining = self._required(targets, inputs)
+        running: Dict[Future, Tuple[Stage, float]] = {}
+        failure: Optional[Exception] = None
+
+        def notify(event: str, stage: Stage, **details):
+            if callback is not None:
+                callback(event, stage, details)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pipeline') as pool:
+            while remaining or running:
+                # Skip the stages that can no longer run, start the ready ones
+                for name in sorted(remaining):
+                    stage = self.stages[name]
+                    blocked = [dependency for dependency in stage.depends_on
+                               if run.status.get(dependency) in ('failed', 'skipped')
+                               and not (run.status[dependency] == 'failed' and self.stages[dependency].optional)]
+                    if blocked or failure is not None:
+                        remaining.discard(name)
+                        run.status[name] = 'skipped'
+                        notify('skipped', stage, blocked_by=blocked)
+                    elif all(dependency in run.results for dependency in stage.depends_on):
+                        remaining.discard(name)
+                        run.status[name] = 'running'
+                        notify('started', stage)
+                        running[pool.submit(stage.func, dict(run.results))] = (stage, time.perf_counter())
+                if not running:
+                    if remaining:
+                        # Only reachable with a dependency that is neither a stage nor an input
+                        raise ValueError(f"Missing pipeline inputs for stages: {', '.join(sorted(remaining))}")
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, start = running.pop(future)
+                    run.seconds[stage.name] = round(time.perf_counter() - start, 2)
+                    error = future.exception()
+                    if error is None:
+                        run.results[stage.name] = future.result()
+                        run.status[stage.name] = 'done'
+                        notify('done', stage, seconds=run.seconds[stage.name], result=run.results[stage.name])
+                        continue
+                    run.errors[stage.name] = error
+                    run.status[stage.name] = 'failed'
+                    if stage.optional:
+                        run.results[stage.name] = None
+                    elif failure is None:
+                        failure = error
+                    notify('failed', stage, seconds=run.seconds[stage.name], error=error)
+
+        if failure is not None:
+            raise failure
+        return run
+
+
+def _found(value: Optional[str]) -> Optional[str]:
+    """Normalize the 'None' strings of the search results"""
+    return value if value and value != 'None' else None
+
+
+def find_sources(company: str, mistral_api_key: str, google_api_key: str, cx: str) -> Dict[str, Optional[str]]:
+    """
+    Find the website and LinkedIn page of a company name, or use the URL given instead
+
+    Args:
+        company: Company name, website URL or LinkedIn company URL
+        mistral_api_key: Mistral API key for LLM access
+        google_api_key: Google API key
+        cx: Custom Search engine id
+
+    Returns:
+        Dict: The 'website' and 'linkedin' URLs, None when not found
+
+    Raises:
+        LookupError: If neither a website nor a LinkedIn page was found
+        Exception: If the searches failed
+    """
+    if 'linkedin.com/company/' in company.lower():
+        return {'website': None, 'linkedin': company}
+    if company.startswith(('http://', 'https://')):
+        return {'website': company, 'linkedin': None}
+    sources = get_company_website(company, mistral_api_key, google_api_key, cx)
+    sources = {'website': _found(sources.get('website')), 'linkedin': _found(sources.get('linkedin'))}
+    if not any(sources.values()):
+        raise LookupError(f"No website or LinkedIn page found for {company}")
+    return sources
+
+
+def build_enrichment_pipeline(mistral_api_key: str, google_api_key: str = None, cx: str = None,
+                              depth: str = 'quick', max_workers: int = 4) -> Pipeline:
+    """
+    Build the company enrichment pipeline
+
+    search -> (website crawl and page analysis || LinkedIn analysis) -> summary
+
+    The website crawl analyzes each page in the background while it fetches the
+    next ones, so page analysis is part of the crawl stage. LinkedIn analysis is
+    optional: when the page cannot be scraped the summary uses the website only.
+
+    Args:
+        mistral_api_key: Mistral API key for LLM access
+        google_api_key: Google API key, only needed by the search stage
+        cx: Custom Search engine id, only needed by the search stage
+        depth: 'quick' or 'deep' website analysis
+        max_workers: Maximum number of stages running at the same time
+
+    Returns:
+        Pipeline: Stages 'search' (input 'company'), 'crawl', 'linkedin' and 'summary'
+    """
+    def search(results):
+        return find_sources(results['company'], mistral_api_key, google_api_key, cx)
+
+    def crawl(results):
+        website = results['search'].get('website')
+        if not website:
+            return {'analysis': {}, 'budget': None}
+        scraper = WebsiteScraper(mistral_api_key)
+        budget = scraper.crawl_website(website, **CRAWL_SETTINGS[depth])
+        return {'analysis': scraper.get_results(), 'budget': budget}
+
+    def linkedin(results):
+        linkedin_url = results['search'].get('linkedin')
+        if not linkedin_url:
+            return {}
+        return LinkedInAnalyzer(api_key=mistral_api_key).scrape_and_analyze(linkedin_url)
+
+    def summary(results):
+        website_analysis = results['crawl']['analysis']
+        linkedin_analysis = results['linkedin'] or {}
+        if not website_analysis and not linkedin_analysis:
+            return None
+        return WebsiteSummarizer(website_analysis, linkedin_analysis, mistral_api_key).summarize_analysis()
+
+    return Pipeline([
+        Stage('search', search, label="🔍 Searching for the company's online presence"),
+        Stage('crawl', crawl, ('search',), label="📊 Analyzing website"),
+        Stage('linkedin', linkedin, ('search',), label="💼 Analyzing LinkedIn", optional=True),
+        Stage('summary', summary, ('crawl', 'linkedin'), label="🤖 Creating analysis summary"),
+    ], max_workers=max_workers)
+
+
+def _stream_summary_job(progress: JobProgress, website_analysis: Dict, linkedin_analysis: Dict,
+                        mistral_api_key: str) -> Dict[str, str]:
+    """Summarize the analyses, publishing each summary section as soon as it is generated"""
+    progress.stage('summary', 'running')
+    start = time.perf_counter()
+    summarizer = WebsiteSummarizer(website_analysis, linkedin_analysis, mistral_api_key)
+    summary = {}
+    try:
+        for name, value in summarizer.stream_summary():
+            summary[name] = value
+            progress.update(summary=dict(summary))
+    except Exception as e:
+        progress.stage('summary', 'failed', seconds=round(time.perf_counter() - start, 2), error=str(e))
+        raise
+    progress.stage('summary', 'done', seconds=round(time.perf_counter() - start, 2),
+                   levels=summarizer.get_stats()['levels'])
+    return summary
+
+
+def quick_analysis_job(progress: JobProgress, mistral_api_key: str, website_url: Optional[str],
+                       linkedin_url: Optional[str]) -> Dict[str, Any]:
+    """
+    Background job of the quick analysis: website crawl and LinkedIn analysis
+    concurrently, then the summary streamed section by section
+
+    Args:
+        progress: Progress reporter of the job
+        mistral_api_key: Mistral API key for LLM access
+        website_url: Company website, None to analyze LinkedIn only
+        linkedin_url: LinkedIn company page, None to analyze the website only
+
+    Returns:
+        Dict: The 'website_analysis', 'linkedin' analysis, crawl 'budget' and 'summary'
+    """
+    run = build_enrichment_pipeline(mistral_api_key).run(
+        {'search': {'website': website_url, 'linkedin': linkedin_url}},
+        targets=[name for name, url in (('crawl', website_url), ('linkedin', linkedin_url)) if url],
+        callback=progress.stage_callback())
+    website_analysis = (run.results.get('crawl') or {}).get('analysis', {})
+    budget = (run.results.get('crawl') or {}).get('budget')
+    linkedin_analysis = run.results.get('linkedin') or {}
+    progress.update(budget=budget)
+    summary = _stream_summary_job(progress, website_analysis, linkedin_analysis, mistral_api_key)
+    return {'website_analysis': website_analysis, 'linkedin': linkedin_analysis, 'budget': budget, 'summary': summary}
+
+
+def deep_analysis_job(progress: JobProgress, mistral_api_key: str, website_url: str,
+                      linkedin_analysis: Dict) -> Dict[str, Any]:
+    """
+    Background job of the deep analysis: deep website crawl, then the summary
+    streamed section by section with the LinkedIn analysis already done
+
+    Args:
+        progress: Progress reporter of the job
+        mistral_api_key: Mistral API key for LLM access
+        website_url: Company website
+        linkedin_analysis: LinkedIn analysis of the quick analysis
+
+    Returns:
+        Dict: The 'website_analysis', crawl 'budget' and 'summary'
+    """
+    run = build_enrichment_pipeline(mistral_api_key, depth='deep').run(
+        {'search': {'website': website_url, 'linkedin': None}}, targets=['crawl'],
+        callback=progress.stage_callback())
+    website_analysis, budget = run.results['crawl']['analysis'], run.results['crawl']['budget']
+    progress.update(budget=budget)
+    summary = _stream_summary_job(progress, website_analysis, linkedin_analysis or {}, mistral_api_key)
+    return {'website_analysis': website_analysis, 'budget': budget, 'summary': summary}
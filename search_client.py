@@ -0,0 +1,237 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+from googleapiclient.discovery import build
+from googleapiclient.http import build_http
+
+DEFAULT_CACHE_PATH = os.path.join('.cache', 'search_cache.sqlite')
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase a query and collapse whitespace: Google treats these variants the same"""
+    return ' '.join(query.lower().split())
+
+
+def _format_items(result: Dict) -> List[Dict[str, str]]:
+    """Keep the title, link and snippet of the items of a Custom Search response"""
+    return [{
+        'title': item.get('title', ''),
+        'link': item.get('link', ''),
+        'description': item.get('snippet', '')
+    } for item in result.get('items', [])]
+
+
+class SearchClient:
+    """Google Custom Search client with a persistent result cache.
+
+    The API service is built once, identical queries running at the same time
+    share a single API call and results are cached on disk for ttl_seconds, so
+    repeated lookups cost neither latency nor paid quota.
+    """
+
+    def __init__(self, google_api_key: str, cx: str, cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+                 ttl_seconds: float = 7 * 24 * 3600, max_workers: int = 4, service=None):
+        """Initialize the client, creating the cache database if needed.
+
+        Args:
+            google_api_key: Google API key
+            cx: Custom Search engine id
+            cache_path: Location of the SQLite cache, None to disable the cache
+            ttl_seconds: Age after which cached results are ignored and fetched again
+            max_workers: Queries run in parallel by search_many
+            service: Custom Search service to use instead of building one (e.g. for tests)
+        """
+        if not google_api_key or not cx:
+            raise ValueError("GOOGLE_API_KEY and GOOGLE_CSE_ID environment variables must be set")
+        self.google_api_key = google_api_key
+        self.cx = cx
+        self.ttl_seconds = ttl_seconds
+        self.max_workers = max_workers
+        self.stats = {'hits': 0, 'misses': 0, 'api_calls': 0, 'coalesced': 0, 'errors': 0}
+        self._service = service
+        self._in_flight: Dict[str, Future] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # httplib2 connections are not thread-safe: one per thread
+        self._local = threading.local()
+
+        self._conn = None
+        if cache_path:
+            directory = os.path.dirname(cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS search_results (
+                    key TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    num INTEGER NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+
+    @property
+    def service(self):
+        """The Custom Search service, built (and its discovery document loaded) on first use"""
+        with self._lock:
+            if self._service is None:
+                self._service = build('customsearch', 'v1', developerKey=self.google_api_key, cache_discovery=False)
+            return self._service
+
+    def _key(self, query: str, num_results: int) -> str:
+        return hashlib.sha256(f"{self.cx}\0{normalize_query(query)}\0{num_results}".encode('utf-8')).hexdigest()
+
+    def _get_cached(self, key: str) -> Optional[List[Dict[str, str]]]:
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM search_results WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return json.loads(row[0])
+
+    def _store(self, key: str, query: str, num_results: int, items: List[Dict[str, str]]):
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO search_results VALUES (?, ?, ?, ?, ?)",
+                               (key, normalize_query(query), num_results, json.dumps(items, ensure_ascii=False),
+                                time.time()))
+            self._conn.execute("DELETE FROM search_results WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+
+    def _fetch(self, query: str, num_results: int) -> List[Dict[str, str]]:
+        """Call the API, on a connection owned by the current thread"""
+        if not hasattr(self._local, 'http'):
+            self._local.http = build_http()
+        with self._lock:
+            self.stats['api_calls'] += 1
+        request = self.service.cse().list(q=query, cx=self.cx, num=num_results)
+        return _format_items(request.execute(http=self._local.http))
+
+    def search(self, query: str, num_results: int = 5) -> List[Dict[str, str]]:
+        """Search Google for a query, from the cache when possible.
+
+        Args:
+            query: Search query string
+            num_results: Number of results to return
+
+        Returns:
+            list: Dictionaries with the 'title', 'link' and 'description' of each result
+
+        Raises:
+            Exception: If the API call fails (failures are not cached)
+        """
+        key = self._key(query, num_results)
+        cached = self._get_cached(key)
+        if cached is not None:
+            with self._lock:
+                self.stats['hits'] += 1
+            return cached
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+                self.stats['misses'] += 1
+            else:
+                self.stats['coalesced'] += 1
+        if not owner:
+            return future.result()
+
+        try:
+            # An identical search may have completed between the cache lookup and the registration
+            items = self._get_cached(key)
+            if items is None:
+                items = self._fetch(query, num_results)
+                self._store(key, query, num_results, items)
+            future.set_result(items)
+            return items
+        except Exception as e:
+            with self._lock:
+                self.stats['errors'] += 1
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def submit(self, query: str, num_results: int = 5) -> Future:
+        """Start a search in the client's thread pool.
+
+        Args:
+            query: Search query string
+            num_results: Number of results to return
+
+        Returns:
+            Future: The future of the search results
+        """
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='search')
+        return self._pool.submit(self.search, query, num_results)
+
+    def search_many(self, queries: Sequence[str], num_results: int = 5) -> List[List[Dict[str, str]]]:
+        """Run several searches in parallel.
+
+        A failed query gives no results instead of failing the others, unless
+        every query failed: no results would then be mistaken for an unknown company.
+
+        Args:
+            queries: Search query strings
+            num_results: Number of results per query
+
+        Returns:
+            list: The results of each query, in the order of the queries
+
+        Raises:
+            Exception: The first error, if every query failed
+        """
+        futures = [self.submit(query, num_results) for query in queries]
+        results, errors = [], []
+        for query, future in zip(queries, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Error during Google search for {query}: {str(e)}")
+                results.append([])
+                errors.append(e)
+        if errors and len(errors) == len(queries):
+            raise errors[0]
+        return results
+
+    def get_stats(self) -> Dict:
+        """Return the cache, API call and coalescing counters"""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_rate'] = (stats['hits'] + stats['coalesced']) / lookups if lookups else 0.0
+        return stats
+
+
+_clients: Dict[Tuple[str, str], SearchClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_search_client(google_api_key: str, cx: str) -> SearchClient:
+    """Return the process-wide search client of an API key and engine, creating it on first use.
+
+    Args:
+        google_api_key: Google API key
+        cx: Custom Search engine id
+
+    Returns:
+        SearchClient: The shared client
+    """
+    with _clients_lock:
+        if (google_api_key, cx) not in _clients:
+            _clients[(google_api_key, cx)] = SearchClient(google_api_key, cx)
+        return _clients[(google_api_key, cx)]
@@ -0,0 +1,95 @@
+import xml.etree.ElementTree as ET
+from typing import List
+from urllib.parse import urljoin, urlparse
+from http_client import HttpClient
+
+SITEMAP_CONTENT_TYPES = ('application/xml', 'text/xml', 'text/plain', 'application/rss+xml')
+
+
+def _local_name(tag: str) -> str:
+    """Strip the XML namespace from a tag name"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_sitemap(xml_content: str) -> tuple[List[str], List[str]]:
+    """Parse a sitemap or sitemap index.
+
+    Args:
+        xml_content: Content of the sitemap file
+
+    Returns:
+        tuple: (page URLs, nested sitemap URLs)
+    """
+    try:
+        root = ET.fromstring(xml_content.strip())
+    except ET.ParseError:
+        return [], []
+
+    pages, sitemaps = [], []
+    for element in root:
+        kind = _local_name(element.tag)
+        loc = next((child.text.strip() for child in element
+                    if _local_name(child.tag) == 'loc' and child.text), None)
+        if not loc:
+            continue
+        if kind == 'sitemap':
+            sitemaps.append(loc)
+        elif kind == 'url':
+            pages.append(loc)
+    return pages, sitemaps
+
+
+def _sitemaps_from_robots(robots_txt: str) -> List[str]:
+    """Extract the Sitemap: entries of a robots.txt file"""
+    sitemaps = []
+    for line in robots_txt.splitlines():
+        if line.lower().startswith('sitemap:'):
+            sitemaps.append(line.split(':', 1)[1].strip())
+    return sitemaps
+
+
+def fetch_sitemap_urls(base_url: str, http_client: HttpClient, max_urls: int = 500,
+                       max_sitemaps: int = 10) -> List[str]:
+    """Discover page URLs of a website from its robots.txt and sitemap.xml.
+
+    Args:
+        base_url: Homepage of the website
+        http_client: HTTP client used for the fetches
+        max_urls: Maximum number of page URLs returned
+        max_sitemaps: Maximum number of sitemap files fetched (sitemap indexes included)
+
+    Returns:
+        list: Page URLs listed in the sitemaps, in discovery order
+    """
+    parsed = urlparse(base_url)
+    root = f"{parsed.scheme}://{parsed.netloc}/"
+
+    queue = []
+    try:
+        robots = http_client.fetch_page(urljoin(root, 'robots.txt'), allowed_content_types=('text/plain', 'text/html'))
+        if robots.status_code == 200:
+            queue.extend(_sitemaps_from_robots(robots.text))
+    except Exception as e:
+        print(f"Error fetching robots.txt for {root}: {str(e)}")
+    if not queue:
+        queue.append(urljoin(root, 'sitemap.xml'))
+
+    pages, seen = [], set()
+    while queue and len(seen) < max_sitemaps and len(pages) < max_urls:
+        sitemap_url = queue.pop(0)
+        if sitemap_url in seen or sitemap_url.endswith('.gz'):
+            continue
+        seen.add(sitemap_url)
+        try:
+            result = http_client.fetch_page(sitemap_url, max_bytes=10 * 1024 * 1024,
+                                            allowed_content_types=SITEMAP_CONTENT_TYPES)
+        except Exception as e:
+            print(f"Error fetching sitemap {sitemap_url}: {str(e)}")
+            continue
+        if result.status_code != 200 or result.skipped_reason:
+            continue
+        found_pages, nested = parse_sitemap(result.text)
+        pages.extend(found_pages)
+        queue.extend(nested)
+
+    return list(dict.fromkeys(pages))[:max_urls]
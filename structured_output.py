@@ -0,0 +1,304 @@
+import json
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from langchain.output_parsers import PydanticOutputParser
+from langchain.output_parsers.fix import NAIVE_FIX_PROMPT
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import BaseOutputParser, StrOutputParser
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel, ValidationError
+
+JSON_OBJECT_FORMAT = {"type": "json_object"}
+
+_stats = {'parsed': 0, 'repaired': 0, 'llm_fixes': 0}
+_stats_lock = threading.Lock()
+# Counters of the innermost count_parser_stats() block of the current context
+_scoped_stats: ContextVar[Optional[Dict[str, int]]] = ContextVar('scoped_parser_stats', default=None)
+
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+        scoped = _scoped_stats.get()
+        if scoped is not None:
+            scoped[name] += 1
+
+
+def get_parser_stats() -> Dict[str, int]:
+    """Return how many outputs parsed directly, after local repair, or through an LLM fix"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+@contextmanager
+def count_parser_stats() -> Iterator[Dict[str, int]]:
+    """Count the outputs parsed within the block, including by the tasks it starts.
+
+    Unlike differences of get_parser_stats(), the counts leave out the outputs
+    parsed at the same time for other contexts (e.g. concurrent crawls).
+
+    Yields:
+        dict: The counters of the block, updated as outputs are parsed
+    """
+    scoped = dict.fromkeys(_stats, 0)
+    token = _scoped_stats.set(scoped)
+    try:
+        yield scoped
+    finally:
+        _scoped_stats.reset(token)
+
+
+def json_mode(llm) -> Runnable:
+    """Ask the model for a JSON object response (Mistral's native JSON mode).
+
+    Args:
+        llm: The chat model
+
+    Returns:
+        Runnable: The model bound to the JSON object response format
+    """
+    return llm.bind(response_format=JSON_OBJECT_FORMAT)
+
+
+def _extract_json(text: str) -> str:
+    """Return the first balanced JSON object or array of a text, ignoring fences and surrounding prose"""
+    start = next((i for i, char in enumerate(text) if char in '{['), None)
+    if start is None:
+        return text
+    closing = {'{': '}', '[': ']'}
+    stack, in_string, escaped = [], False, False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in closing:
+            stack.append(closing[char])
+        elif stack and char == stack[-1]:
+            stack.pop()
+            if not stack:
+                return text[start:i + 1]
+    # Truncated answer: close what is still open
+    return text[start:] + ('"' if in_string else '') + ''.join(reversed(stack))
+
+
+def repair_json(text: str) -> Any:
+    """Parse the JSON of an LLM answer, fixing the usual formatting mistakes.
+
+    Handles markdown code fences, text before or after the JSON, escaped
+    underscores (company\\_overview), trailing commas and truncated answers.
+
+    Args:
+        text: Raw model output
+
+    Returns:
+        The parsed JSON value
+
+    Raises:
+        ValueError: If the text cannot be repaired
+    """
+    candidate = _extract_json(text.strip())
+    candidate = candidate.replace('\\_', '_')
+    candidate = re.sub(r',\s*([}\]])', r'\1', candidate)
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Could not repair JSON output: {e}") from e
+
+
+def _coerce_shape(value: Any, model: type) -> Any:
+    """Fix list-vs-dict wrapping mistakes against the expected schema"""
+    fields = model.model_fields
+    if isinstance(value, list):
+        list_fields = [name for name, field in fields.items() if getattr(field.annotation, '__origin__', None) is list]
+        if len(list_fields) == 1 and not (len(value) == 1 and isinstance(value[0], dict) and list_fields[0] in value[0]):
+            return {list_fields[0]: value}
+        if len(value) == 1 and isinstance(value[0], dict):
+            return _coerce_shape(value[0], model)
+        return value
+    if isinstance(value, dict) and len(value) == 1:
+        key, inner = next(iter(value.items()))
+        # The model wrapped the answer in its schema name or echoed the schema's "properties"
+        if key not in fields and isinstance(inner, dict) and (key in ('properties', 'data', 'result') or
+                                                                key.lower() == model.__name__.lower()):
+            return inner
+    return value
+
+
+class OutputFixNeeded(OutputParserException):
+    """A model output that local repair could not parse, to be fixed with an LLM call.
+
+    The fix is left to LLMExecutor so that it is rate limited, retried and
+    counted like any other LLM call.
+    """
+
+    def __init__(self, parser: "RepairingOutputParser", text: str, error: Exception):
+        super().__init__(f"Output could not be repaired locally: {error}", llm_output=text)
+        self.parser = parser
+        self.text = text
+        self.error = error
+
+    def fix_inputs(self) -> Dict[str, str]:
+        """Variables of the parser's fix chain"""
+        return {"instructions": self.parser.get_format_instructions(), "completion": self.text,
+                "error": repr(self.error)}
+
+
+class RepairingOutputParser(BaseOutputParser):
+    """Pydantic output parser repairing malformed JSON locally before an LLM fix.
+
+    Outputs the local repair cannot handle raise OutputFixNeeded when the parser
+    has a fix chain; LLMExecutor then runs the fix call and parse_fixed() its answer.
+    """
+
+    base_parser: PydanticOutputParser
+    fix_chain: Optional[Any] = None
+
+    @classmethod
+    def from_llm(cls, pydantic_object: type, llm) -> "RepairingOutputParser":
+        """Build the parser for a schema, with an LLM fix as a last resort.
+
+        Args:
+            pydantic_object: The expected output schema
+            llm: Model used to fix outputs the local repair cannot handle
+
+        Returns:
+            RepairingOutputParser: The parser
+        """
+        base_parser = PydanticOutputParser(pydantic_object=pydantic_object)
+        return cls(base_parser=base_parser, fix_chain=NAIVE_FIX_PROMPT | llm | StrOutputParser())
+
+    @property
+    def _type(self) -> str:
+        return "repairing_pydantic"
+
+    def get_format_instructions(self) -> str:
+        return self.base_parser.get_format_instructions()
+
+    def _parse_locally(self, text: str) -> Optional[BaseModel]:
+        try:
+            result = self.base_parser.parse(text)
+            _count('parsed')
+            return result
+        except Exception:
+            pass
+        model = self.base_parser.pydantic_object
+        try:
+            result = model.model_validate(_coerce_shape(repair_json(text), model))
+        except (ValueError, ValidationError):
+            return None
+        _count('repaired')
+        return result
+
+    def parse(self, text: str) -> BaseModel:
+        result = self._parse_locally(text)
+        if result is not None:
+            return result
+        try:
+            return self.base_parser.parse(text)
+        except OutputParserException as e:
+            if self.fix_chain is None:
+                raise
+            raise OutputFixNeeded(self, text, e) from e
+
+    def parse_fixed(self, text: str) -> BaseModel:
+        """Parse the answer of the fix chain, without asking for another fix.
+
+        Raises:
+            OutputParserException: If the fixed output still does not match the schema
+        """
+        _count('llm_fixes')
+        result = self._parse_locally(text)
+        return result if result is not None else self.base_parser.parse(text)
+
+
+class IncrementalJSONParser:
+    """Parses the top-level fields of a JSON object while it is being streamed.
+
+    Feed the text chunks as they arrive; each top-level field is returned as
+    soon as its value is complete, long before the closing brace.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.fields: Dict[str, Any] = {}
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._key: Optional[str] = None
+        self._token_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Add streamed text.
+
+        Args:
+            chunk: Next piece of the model output
+
+        Returns:
+            list: (key, value) pairs of the top-level fields completed by this chunk
+        """
+        self.buffer += chunk
+        completed = []
+        while self._pos < len(self.buffer):
+            char = self.buffer[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key is None:
+                        self._key = self._decode(self.buffer[self._token_start:self._pos + 1]).replace('\\_', '_')
+                        self._token_start = None
+            elif char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._token_start is None:
+                    self._token_start = self._pos
+            elif char in '{[':
+                self._depth += 1
+                if self._depth == 2 and self._token_start is None:
+                    self._token_start = self._pos
+            elif char in '}]':
+                if self._depth == 1:
+                    completed += self._complete_value()
+                self._depth -= 1
+            elif char == ':' and self._depth == 1:
+                self._token_start = None
+            elif char == ',' and self._depth == 1:
+                completed += self._complete_value()
+            elif self._depth == 1 and self._key is not None and self._token_start is None and not char.isspace():
+                # Start of a number, true, false or null
+                self._token_start = self._pos
+            self._pos += 1
+        return completed
+
+    @staticmethod
+    def _decode(token: str) -> Any:
+        try:
+            return json.loads(token)
+        except json.JSONDecodeError:
+            return json.loads(token.replace('\\_', '_'))
+
+    def _complete_value(self) -> List[Tuple[str, Any]]:
+        """Emit the value ending at the current position, if any"""
+        key, start = self._key, self._token_start
+        self._key, self._token_start = None, None
+        if key is None or start is None:
+            return []
+        try:
+            value = self._decode(self.buffer[start:self._pos].strip())
+        except json.JSONDecodeError:
+            return []
+        self.fields[key] = value
+        return [(key, value)]
@@ -0,0 +1,120 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing the connection early (truncated reads, timeouts) are expected
+        pass
+
+
+class LocalServer:
+    """HTTP server running in a background thread, answering with a handler class"""
+
+    def __init__(self, handler):
+        self.server = QuietHTTPServer(('127.0.0.1', 0), handler)
+        self.requests = []
+        self.server.owner = self
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MistralHandler(BaseHTTPRequestHandler):
+    """Minimal Mistral chat completions API: answers with owner.respond(messages), streamed if asked"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        owner = self.server.owner
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        owner.requests.append(body)
+        content = owner.respond(body['messages'])
+        if body.get('stream'):
+            events = [{'id': 'stub', 'model': body['model'],
+                       'choices': [{'index': 0, 'delta': {'role': 'assistant', 'content': part}, 'finish_reason': None}]}
+                      for part in (content[:len(content) // 2], content[len(content) // 2:])]
+            events[-1]['choices'][0]['finish_reason'] = 'stop'
+            payload = ''.join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+            self._send(payload.encode(), 'text/event-stream')
+        else:
+            self._send(json.dumps({
+                'id': 'stub', 'object': 'chat.completion', 'model': body['model'],
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': 10, 'completion_tokens': 10, 'total_tokens': 20},
+            }).encode(), 'application/json')
+
+    def _send(self, data, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """Static website: owner.pages maps paths to (status, headers, body) or HTML strings"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        owner = self.server.owner
+        owner.requests.append((self.path, dict(self.headers)))
+        page = owner.pages.get(self.path.split('#')[0])
+        if callable(page):
+            page = page(self)
+        if page is None:
+            page = (404, {'Content-Type': 'text/html'}, '<html><body>Not found</body></html>')
+        elif isinstance(page, str):
+            page = (200, {'Content-Type': 'text/html; charset=utf-8'}, page)
+        status, headers, body = page
+        data = body.encode() if isinstance(body, str) else body
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(data)
+
+
+@pytest.fixture
+def mistral_stub():
+    """Local Mistral endpoint; set .respond to a function of the messages returning the answer"""
+    server = LocalServer(MistralHandler)
+    server.respond = lambda messages: '{}'
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def mistral_runtime(mistral_stub):
+    """LLM runtime whose default model is a real ChatMistralAI calling the local Mistral stub"""
+    from langchain_mistralai import ChatMistralAI
+    from llm_runtime import DEFAULT_MODEL, LLMRuntime
+    llm = ChatMistralAI(mistral_api_key="test-key", model=DEFAULT_MODEL, endpoint=mistral_stub.url + "/v1", max_retries=0)
+    return LLMRuntime("test-key", models={DEFAULT_MODEL: llm})
+
+
+@pytest.fixture
+def site():
+    """Local website; fill .pages with the paths to serve"""
+    server = LocalServer(SiteHandler)
+    server.pages = {}
+    yield server
+    server.close()
@@ -0,0 +1,68 @@
+from analysis_aggregation import aggregate_analyses, format_aggregate
+
+
+def page(**sections):
+    return {name: sections.get(name, {}) for name in
+            ('company_overview', 'sales_intelligence', 'pricing', 'firmographic', 'gtm_strategy')}
+
+
+class TestAggregateAnalyses:
+    def test_lists_are_unioned_and_deduplicated(self):
+        """Test that list items of all pages are kept once, case- and fuzzy-insensitive"""
+        aggregate = aggregate_analyses({
+            "https://a.com/": page(company_overview={"products_services": ["Lead scoring", "Not specified"]}),
+            "https://a.com/product": page(company_overview={"products_services": ["lead scoring.", "Intent data"]}),
+            "https://a.com/blog": page(company_overview={"products_services": ["Lead-scoring", "Intent Data API"]}),
+        })
+
+        assert aggregate["company_overview"]["products_services"] == [
+            {"value": "Lead scoring", "pages": ["https://a.com/", "https://a.com/product", "https://a.com/blog"]},
+            {"value": "Intent data", "pages": ["https://a.com/product"]},
+            {"value": "Intent Data API", "pages": ["https://a.com/blog"]},
+        ]
+
+    def test_placeholders_are_dropped(self):
+        """Test that 'Not specified' fields and empty lists do not appear"""
+        aggregate = aggregate_analyses({
+            "https://a.com/": page(company_overview={"name": "Not specified", "mission": "", "target_market": []}),
+        })
+
+        assert aggregate["company_overview"] == {}
+        assert format_aggregate(aggregate)["company_overview"] == "Not specified"
+
+    def test_text_fields_keep_most_supported_values(self):
+        """Test that text fields rank their distinct values by page support"""
+        aggregate = aggregate_analyses({
+            "https://a.com/": page(company_overview={"name": "MadKudu Inc"}),
+            "https://a.com/about": page(company_overview={"name": "MadKudu"}),
+            "https://a.com/jobs": page(company_overview={"name": "madkudu"}),
+        })
+
+        assert aggregate["company_overview"]["name"] == [
+            {"value": "MadKudu", "pages": ["https://a.com/about", "https://a.com/jobs"]},
+            {"value": "MadKudu Inc", "pages": ["https://a.com/"]},
+        ]
+
+    def test_pricing_tiers_merged_by_name(self):
+        """Test that the same tier on several pages is merged, not overwritten"""
+        aggregate = aggregate_analyses({
+            "https://a.com/pricing": page(pricing={"tiers": [{"name": "Pro", "price": "$99", "features": ["API"]}],
+                                                   "has_enterprise_pricing": False}),
+            "https://a.com/": page(pricing={"tiers": [{"name": "pro", "price": "Not specified", "features": ["SSO", "api"]}],
+                                            "has_enterprise_pricing": True}),
+        })
+
+        assert aggregate["pricing"]["tiers"] == [
+            {"value": {"name": "Pro", "price": "$99", "features": ["API", "SSO"]},
+             "pages": ["https://a.com/pricing", "https://a.com/"]},
+        ]
+        assert aggregate["pricing"]["has_enterprise_pricing"] == {"value": True, "pages": ["https://a.com/"]}
+
+    def test_format_is_compact(self):
+        """Test the one line per field rendering with page counts"""
+        aggregate = aggregate_analyses({
+            "https://a.com/": page(sales_intelligence={"pain_points": ["Bad leads", "Slow sales"]}),
+            "https://a.com/x": page(sales_intelligence={"pain_points": ["bad leads"]}),
+        })
+
+        assert format_aggregate(aggregate)["sales_intelligence"] == "pain_points: Bad leads [2 pages] | Slow sales"
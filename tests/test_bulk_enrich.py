@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+import pytest
+import analysis_store
+import http_client
+import llm_cache
+import llm_executor
+import llm_runtime
+import search_client
+from bulk_enrich import enrich_company, read_inputs, run_bulk
+from get_websites_links import WebsiteResults
+from website_summarizer import WebsiteSummary
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as file:
+        return [json.loads(line) for line in file]
+
+
+class TestReadInputs:
+    def test_csv_column_and_duplicates(self, tmp_path):
+        """Test that the company column is used and duplicate companies read once"""
+        path = tmp_path / "companies.csv"
+        path.write_text("id,Company\n1,MadKudu\n2, madkudu \n3,Alter Watt\n4,\n", encoding='utf-8')
+
+        assert read_inputs(str(path)) == ["MadKudu", "Alter Watt"]
+
+    def test_headerless_csv_and_jsonl(self, tmp_path):
+        """Test plain lists of companies and JSONL strings or objects"""
+        csv_path = tmp_path / "companies.csv"
+        csv_path.write_text("MadKudu\nhttps://www.alter-watt.com/\n", encoding='utf-8')
+        jsonl_path = tmp_path / "companies.jsonl"
+        jsonl_path.write_text('"MadKudu"\n{"website": "https://www.alter-watt.com/"}\n\n', encoding='utf-8')
+
+        assert read_inputs(str(csv_path)) == read_inputs(str(jsonl_path)) == ["MadKudu", "https://www.alter-watt.com/"]
+
+
+class TestRunBulk:
+    def test_results_stream_and_run_resumes(self, tmp_path):
+        """Test that finished companies are skipped on the next run and failed ones retried"""
+        output = str(tmp_path / "out.jsonl")
+        calls = []
+
+        def flaky_enrich(value):
+            calls.append(value)
+            if value == "Broken" and calls.count("Broken") == 1:
+                raise RuntimeError("site down")
+            return {'summary': value.upper()}
+
+        counts = run_bulk(["MadKudu", "Broken", "Alter Watt"], output, flaky_enrich, workers=2)
+        assert counts == {'enriched': 2, 'failed': 1, 'skipped': 0}
+        records = {record['input']: record for record in read_jsonl(output)}
+        assert records["MadKudu"]['summary'] == "MADKUDU"
+        assert records["Broken"]['status'] == 'error' and "site down" in records["Broken"]['error']
+
+        counts = run_bulk(["MadKudu", "Broken", "Alter Watt"], output, flaky_enrich, workers=2)
+        assert counts == {'enriched': 1, 'failed': 0, 'skipped': 2}
+        assert sorted(calls) == ["Alter Watt", "Broken", "Broken", "MadKudu"]
+        assert [record['status'] for record in read_jsonl(output)].count('ok') == 3
+
+    def test_bounded_worker_pool(self, tmp_path):
+        """Test that no more than the given number of companies run at the same time"""
+        running, peak, lock = [0], [0], threading.Lock()
+
+        def slow_enrich(value):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return {}
+
+        run_bulk([f"Company {i}" for i in range(10)], str(tmp_path / "out.jsonl"), slow_enrich, workers=3)
+        assert peak[0] == 3
+
+
+@pytest.fixture
+def stub_services(monkeypatch, tmp_path, mistral_runtime):
+    """Point the shared services used by enrich_company at the Mistral stub and temporary stores"""
+    monkeypatch.setitem(llm_runtime._runtimes, "test-key", mistral_runtime)
+    monkeypatch.setattr(llm_executor, "_shared_executor", llm_executor.LLMExecutor(llm_executor.RateLimiter(6000, 10 ** 8)))
+    monkeypatch.setattr(llm_cache, "_shared_cache", llm_cache.LLMCache(str(tmp_path / "llm.sqlite")))
+    monkeypatch.setattr(analysis_store, "_shared_store", analysis_store.AnalysisStore(str(tmp_path / "analyses.sqlite")))
+    monkeypatch.setattr(http_client, "_shared_client", http_client.HttpClient(cache=None))
+
+
+class TestBulkEnrichment:
+    def test_companies_enriched_concurrently(self, tmp_path, site, mistral_stub, stub_services):
+        """Test that several workers run the real enrichment pipeline against one shared ChatMistralAI model"""
+        lock = threading.Lock()
+        state = {"in_flight": 0, "max_in_flight": 0}
+        companies = ["Acme", "Globex", "Initech"]
+
+        summary = {field: f"{field} text" for field in WebsiteSummary.model_fields}
+
+        def respond(messages):
+            with lock:
+                state["in_flight"] += 1
+                state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            time.sleep(0.2)
+            with lock:
+                state["in_flight"] -= 1
+            content = json.dumps(messages)
+            if "summar" in messages[0]["content"].lower():
+                return json.dumps(summary)
+            name = next(company for company in companies if company in content)
+            return json.dumps({"company_overview": {"name": name}, "sales_intelligence": {}, "pricing": {},
+                               "firmographic": {}, "gtm_strategy": {}})
+
+        mistral_stub.respond = respond
+        site.pages.update({f"/{company.lower()}": f"<html><body><h1>{company}</h1><p>{company} builds software "
+                           f"for revenue teams.</p></body></html>" for company in companies})
+        output = str(tmp_path / "out.jsonl")
+
+        counts = run_bulk([f"{site.url}/{company.lower()}" for company in companies], output,
+                          lambda value: enrich_company(value, "test-key", None, None), workers=2)
+
+        assert counts == {'enriched': 3, 'failed': 0, 'skipped': 0}
+        records = {record['input']: record for record in read_jsonl(output)}
+        for company in companies:
+            record = records[f"{site.url}/{company.lower()}"]
+            assert record['website_analysis'][record['website']]['company_overview']['name'] == company
+            assert record['summary'] == summary
+        # One page analysis and one summary per company, two companies at a time
+        assert len(mistral_stub.requests) == 6
+        assert state["max_in_flight"] == 2
+
+    @pytest.mark.parametrize("search_fails, error", [(True, "quota exceeded"), (False, "No website or LinkedIn")])
+    def test_companies_without_sources_are_not_checkpointed(self, tmp_path, monkeypatch, mistral_stub, stub_services,
+                                                            search_fails, error):
+        """Test that a failed search or a company without sources is an error retried on the next run"""
+        class Service:
+            def cse(self):
+                return self
+
+            def list(self, q, cx, num):
+                return self
+
+            def execute(self, http=None):
+                if search_fails:
+                    raise RuntimeError("quota exceeded")
+                return {'items': []}
+
+        monkeypatch.setitem(search_client._clients, ("google-key", "cx"),
+                            search_client.SearchClient("google-key", "cx", cache_path=None, service=Service()))
+        mistral_stub.respond = lambda messages: WebsiteResults(company="Nowhere Inc").model_dump_json()
+        output = str(tmp_path / "out.jsonl")
+
+        counts = run_bulk(["Nowhere Inc"], output, lambda value: enrich_company(value, "test-key", "google-key", "cx"))
+
+        assert counts == {'enriched': 0, 'failed': 1, 'skipped': 0}
+        assert error in read_jsonl(output)[0]['error']
+        assert not open(output + '.checkpoint').read()
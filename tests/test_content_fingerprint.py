@@ -0,0 +1,45 @@
+from content_fingerprint import DuplicateIndex, content_hash, hamming_distance, simhash
+
+PAGE_TEXT = " ".join(
+    f"Predictive lead scoring helps revenue team {i} prioritize accounts, qualify inbound leads "
+    f"and route them to sales representative {i} with the right context"
+    for i in range(12)
+)
+
+
+class TestFingerprints:
+    def test_content_hash_ignores_case_and_whitespace(self):
+        """Test that formatting differences do not change the exact hash"""
+        assert content_hash("Pricing\n  Plans") == content_hash("pricing plans")
+        assert content_hash("Pricing plans") != content_hash("Pricing tiers")
+
+    def test_simhash_of_near_duplicates_is_close(self):
+        """Test that a small edit changes only a few SimHash bits"""
+        edited = PAGE_TEXT.replace("revenue team 5", "revenue team five")
+        assert hamming_distance(simhash(PAGE_TEXT), simhash(edited)) <= 3
+
+    def test_simhash_of_different_texts_is_far(self):
+        """Test that unrelated texts have distant fingerprints"""
+        other = " ".join(f"Our office {i} in Paris hosts engineering meetups every Thursday evening" for i in range(12))
+        assert hamming_distance(simhash(PAGE_TEXT), simhash(other)) > 10
+
+
+class TestDuplicateIndex:
+    def test_exact_duplicate(self):
+        """Test that identical texts are reported as exact duplicates"""
+        index = DuplicateIndex()
+        index.add("https://example.com/customers", "Acme uses us")
+        assert index.find("Acme  uses us") == ("https://example.com/customers", "exact")
+
+    def test_near_duplicate(self):
+        """Test that templated variants are reported as near duplicates"""
+        index = DuplicateIndex()
+        index.add("https://example.com/en/product", PAGE_TEXT)
+        variant = PAGE_TEXT + " Cookie settings"
+        assert index.find(variant) == ("https://example.com/en/product", "near")
+
+    def test_short_texts_are_only_compared_exactly(self):
+        """Test that short pages are not matched approximately"""
+        index = DuplicateIndex()
+        index.add("https://example.com/a", "Contact us today")
+        assert index.find("Contact us tomorrow") == (None, None)
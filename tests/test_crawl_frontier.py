@@ -0,0 +1,31 @@
+from crawl_frontier import rank_urls, score_url
+
+BASE = "https://www.madkudu.com"
+
+
+class TestScoreUrl:
+    def test_pricing_outranks_deep_careers_pages(self):
+        """Test that business pages come before low-value and deep pages"""
+        ranked = rank_urls([
+            f"{BASE}/about-us/careers/senior-software-engineer-paris",
+            f"{BASE}/blog/2023/how-to-score-leads",
+            f"{BASE}/about-us",
+            f"{BASE}/product/features",
+            f"{BASE}/pricing",
+        ])
+
+        assert ranked[0] == f"{BASE}/pricing"
+        assert ranked.index(f"{BASE}/about-us") < ranked.index(f"{BASE}/about-us/careers/senior-software-engineer-paris")
+        assert set(ranked[-2:]) == {f"{BASE}/about-us/careers/senior-software-engineer-paris",
+                                    f"{BASE}/blog/2023/how-to-score-leads"}
+
+    def test_homepage_and_locales(self):
+        """Test that the homepage scores highest and non-English locales are penalized"""
+        assert score_url(f"{BASE}/") > score_url(f"{BASE}/pricing")
+        assert score_url(f"{BASE}/fr/pricing") < score_url(f"{BASE}/en/pricing") < score_url(f"{BASE}/pricing")
+
+    def test_rank_urls_is_deduplicated_and_deterministic(self):
+        """Test that duplicates are dropped and ties broken by length then alphabetically"""
+        ranked = rank_urls([f"{BASE}/b-page", f"{BASE}/a-page", f"{BASE}/b-page", f"{BASE}/zz"])
+
+        assert ranked == [f"{BASE}/zz", f"{BASE}/a-page", f"{BASE}/b-page"]
@@ -0,0 +1,62 @@
+import os
+import sys
+import pytest
+import html_document
+from html_document import parse_html
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from bench_html_parsing import build_marketing_page  # noqa: E402
+
+PAGE = """<!DOCTYPE html>
+<html><head><title> Acme - Pricing </title>
+<link rel="canonical" href="/pricing">
+<style>.price { color: red; }</style>
+<script>var tracking = "do not index";</script></head>
+<body><nav><a href="/">Home</a> <a href="pricing#plans">Plans</a> <a href="https://docs.acme.com/api">API</a>
+<a href="/">Home again</a></nav>
+<h1>Simple <em>pricing</em></h1><h2>Starter</h2><p>For small   teams.</p><h3> </h3>
+<noscript>Enable JavaScript</noscript>
+<h4>Not a heading we keep</h4><p>Contact sales</p></body></html>"""
+
+PARSERS = ["html.parser", "lxml"]
+
+
+class TestParseHtml:
+    @pytest.mark.parametrize("parser", PARSERS)
+    def test_links_and_canonical_url(self, parser):
+        """Test that links are resolved against the page URL and deduplicated, in page order"""
+        document = parse_html(PAGE, "https://www.acme.com/en/pricing", parser=parser)
+
+        assert document.links == ["https://www.acme.com/", "https://www.acme.com/en/pricing#plans",
+                                  "https://docs.acme.com/api"]
+        assert document.canonical_url == "https://www.acme.com/pricing"
+        assert document.title == "Acme - Pricing"
+
+    @pytest.mark.parametrize("parser", PARSERS)
+    def test_headings_and_text(self, parser):
+        """Test that h1-h3 headings are kept and scripts, styles and noscript are left out of the text"""
+        document = parse_html(PAGE, "https://www.acme.com/pricing", parser=parser)
+
+        assert document.headings == ["Simple pricing", "Starter"]
+        assert "For small\nteams." in document.text
+        assert "Contact sales" in document.text
+        for hidden in ("tracking", "color: red", "Enable JavaScript"):
+            assert hidden not in document.text
+
+    def test_backends_agree_on_benchmark_page(self):
+        """Test that lxml and html.parser extract the same document from the benchmark page"""
+        html = build_marketing_page(20)
+        fast = parse_html(html, "https://www.example.com/", parser="lxml")
+        fallback = parse_html(html, "https://www.example.com/", parser="html.parser")
+
+        assert (fast.links, fast.headings, fast.text) == (fallback.links, fallback.headings, fallback.text)
+        assert len(fast.links) == 60 + 40 + 2 * 20
+
+    def test_falls_back_to_html_parser(self, monkeypatch):
+        """Test that an unavailable parser backend falls back to html.parser"""
+        monkeypatch.setattr(html_document, "DEFAULT_PARSER", "not-installed")
+
+        document = parse_html(PAGE, "https://www.acme.com/pricing")
+
+        assert document.headings == ["Simple pricing", "Starter"]
+        assert document == parse_html(PAGE, "https://www.acme.com/pricing", parser="html.parser")
@@ -0,0 +1,82 @@
+import time
+from http_cache import HttpCache, normalize_cache_key
+
+
+class TestNormalizeCacheKey:
+    def test_ignores_case_fragment_and_trailing_slash(self):
+        """Test that equivalent URLs share one cache key"""
+        assert normalize_cache_key("HTTPS://WWW.Example.com/pricing/#plans") == \
+            normalize_cache_key("https://www.example.com/pricing")
+
+    def test_keeps_query(self):
+        """Test that the query string is part of the key"""
+        assert normalize_cache_key("https://example.com/?page=2") != normalize_cache_key("https://example.com/")
+
+
+class TestHttpCache:
+    def setup_method(self):
+        """Setup a fresh cache for each test"""
+        self.headers = {'Content-Type': 'text/html; charset=utf-8', 'ETag': '"abc"',
+                        'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT', 'Content-Encoding': 'gzip'}
+
+    def test_store_and_lookup(self, tmp_path):
+        """Test that a stored response is returned with its headers and body"""
+        cache = HttpCache(str(tmp_path / "cache.sqlite"))
+        cache.store("https://example.com/", 200, self.headers, b"<html>hello</html>")
+
+        entry = cache.lookup("https://example.com")
+        assert entry is not None
+        assert entry.body == b"<html>hello</html>"
+        assert entry.is_fresh(cache.ttl_seconds)
+        assert 'Content-Encoding' not in entry.headers
+
+        response = entry.to_response()
+        assert response.text == "<html>hello</html>"
+        assert response.encoding == "utf-8"
+
+    def test_conditional_headers(self, tmp_path):
+        """Test that stale entries are revalidated with ETag and Last-Modified"""
+        cache = HttpCache(str(tmp_path / "cache.sqlite"), ttl_seconds=0)
+        cache.store("https://example.com/", 200, self.headers, b"body")
+
+        entry = cache.lookup("https://example.com/")
+        assert not entry.is_fresh(cache.ttl_seconds)
+        assert entry.conditional_headers() == {
+            'If-None-Match': '"abc"',
+            'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'
+        }
+
+    def test_refresh_after_not_modified(self, tmp_path):
+        """Test that a 304 revalidation makes the entry fresh again"""
+        cache = HttpCache(str(tmp_path / "cache.sqlite"), ttl_seconds=60)
+        cache.store("https://example.com/", 200, self.headers, b"body")
+        cache._conn.execute("UPDATE responses SET stored_at = ?", (time.time() - 120,))
+
+        assert not cache.lookup("https://example.com/").is_fresh(cache.ttl_seconds)
+        cache.refresh("https://example.com/", {'ETag': '"def"'})
+
+        entry = cache.lookup("https://example.com/")
+        assert entry.is_fresh(cache.ttl_seconds)
+        assert entry.headers['ETag'] == '"def"'
+
+    def test_size_based_eviction(self, tmp_path):
+        """Test that least recently used entries are evicted past the size limit"""
+        cache = HttpCache(str(tmp_path / "cache.sqlite"), max_size_bytes=25)
+        cache.store("https://example.com/a", 200, {}, b"x" * 10)
+        time.sleep(0.01)
+        cache.store("https://example.com/b", 200, {}, b"x" * 10)
+        time.sleep(0.01)
+        cache.lookup("https://example.com/a")
+        time.sleep(0.01)
+        cache.store("https://example.com/c", 200, {}, b"x" * 10)
+
+        assert cache.lookup("https://example.com/a") is not None
+        assert cache.lookup("https://example.com/b") is None
+        assert cache.lookup("https://example.com/c") is not None
+        assert cache.get_stats()['evictions'] == 1
+
+    def test_no_store(self, tmp_path):
+        """Test that responses marked no-store are not cached"""
+        cache = HttpCache(str(tmp_path / "cache.sqlite"))
+        cache.store("https://example.com/", 200, {'Cache-Control': 'no-store'}, b"body")
+        assert cache.lookup("https://example.com/") is None
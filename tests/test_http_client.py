@@ -0,0 +1,148 @@
+import time
+import pytest
+import requests
+from html_document import parse_html
+from http_cache import HttpCache
+from http_client import HttpClient
+
+
+class TestHttpClient:
+    def test_connections_are_reused(self, site):
+        """Test that successive requests to a host share one keep-alive connection"""
+        site.pages.update({f"/page-{i}": f"<html><body>Page {i}</body></html>" for i in range(5)})
+        client = HttpClient()
+
+        for i in range(5):
+            assert client.get(f"{site.url}/page-{i}").status_code == 200
+
+        stats = client.get_pool_stats()
+        assert (stats["pools"], stats["requests"], stats["connections"], stats["reused"]) == (1, 5, 1, 4)
+        assert stats["reuse_rate"] == pytest.approx(0.8)
+
+    def test_retries_server_errors(self, site):
+        """Test that 5xx responses are retried until the page is served"""
+        attempts = []
+
+        def flaky(handler):
+            attempts.append(time.monotonic())
+            if len(attempts) < 3:
+                return 503, {"Content-Type": "text/html"}, "Unavailable"
+            return "<html><body>Back</body></html>"
+
+        site.pages["/flaky"] = flaky
+        client = HttpClient(max_retries=2, backoff_factor=0)
+
+        response = client.get(site.url + "/flaky")
+        assert (response.status_code, len(attempts)) == (200, 3)
+
+    def test_read_timeout(self, site):
+        """Test that a server not answering within the read timeout fails the request"""
+        def slow(handler):
+            time.sleep(1)
+            return "<html><body>Too late</body></html>"
+
+        site.pages["/slow"] = slow
+        client = HttpClient(timeout=(1.0, 0.2), max_retries=0)
+
+        start = time.perf_counter()
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.get(site.url + "/slow")
+        assert time.perf_counter() - start < 0.8
+
+
+def versioned_page(body, etag='"v1"'):
+    """Page served with an ETag, answering 304 to a matching If-None-Match"""
+    def respond(handler):
+        if handler.headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, ""
+        return 200, {"Content-Type": "text/html; charset=utf-8", "ETag": etag}, body
+    return respond
+
+
+class TestHttpClientCache:
+    def test_fresh_hit_skips_the_network(self, tmp_path, site):
+        """Test that a fresh cached response is returned without any request"""
+        site.pages["/"] = versioned_page("<html><body>Home</body></html>")
+        client = HttpClient(cache=HttpCache(str(tmp_path / "http.sqlite")))
+
+        first = client.get(site.url + "/")
+        second = client.get(site.url + "/")
+
+        assert second.text == first.text == "<html><body>Home</body></html>"
+        assert second.from_cache
+        assert len(site.requests) == 1
+        assert client.cache.get_stats()["hits"] == 1
+
+    def test_stale_entry_is_revalidated(self, tmp_path, site):
+        """Test that a stale entry is revalidated with a conditional request and reused on 304"""
+        site.pages["/"] = versioned_page("<html><body>Home</body></html>")
+        client = HttpClient(cache=HttpCache(str(tmp_path / "http.sqlite"), ttl_seconds=0))
+
+        client.get(site.url + "/")
+        response = client.get(site.url + "/")
+
+        assert (response.status_code, response.text) == (200, "<html><body>Home</body></html>")
+        assert response.from_cache and response.revalidated
+        assert len(site.requests) == 2
+        assert site.requests[1][1].get("If-None-Match") == '"v1"'
+        stats = client.cache.get_stats()
+        assert (stats["misses"], stats["revalidated"], stats["hits"]) == (1, 1, 0)
+
+    def test_changed_page_replaces_entry(self, tmp_path, site):
+        """Test that a stale entry whose page changed is replaced by the new body"""
+        site.pages["/"] = versioned_page("<html><body>Old</body></html>")
+        client = HttpClient(cache=HttpCache(str(tmp_path / "http.sqlite"), ttl_seconds=0))
+        client.get(site.url + "/")
+
+        site.pages["/"] = versioned_page("<html><body>New</body></html>", etag='"v2"')
+
+        assert client.get(site.url + "/").text == "<html><body>New</body></html>"
+        assert client.cache.lookup(site.url + "/").body == b"<html><body>New</body></html>"
+        assert client.cache.get_stats()["misses"] == 2
+
+
+def long_page(paragraphs=200):
+    return "<html><body>" + "".join(f"<p>Paragraph {i} of a long page.</p>" for i in range(paragraphs)) + "</body></html>"
+
+
+class TestFetchPage:
+    def test_non_html_without_extension_is_skipped(self, site):
+        """Test that the Content-Type, not the URL, decides whether the body is read"""
+        site.pages["/download"] = (200, {"Content-Type": "application/pdf"}, b"%PDF-1.4" + b"\0" * 10000)
+        result = HttpClient(cache=None).fetch_page(site.url + "/download")
+
+        assert result.skipped_reason == "content type application/pdf"
+        assert result.text == ""
+
+    def test_oversized_body_is_truncated_and_not_cached(self, tmp_path, site):
+        """Test that no more than max_bytes are read and a partial body is never cached"""
+        site.pages["/huge"] = long_page(2000)
+        cache = HttpCache(str(tmp_path / "http.sqlite"))
+        result = HttpClient(cache=cache).fetch_page(site.url + "/huge", max_bytes=1000)
+
+        assert result.truncated
+        assert len(result.text.encode()) == 1000
+        assert cache.lookup(site.url + "/huge") is None
+
+    def test_text_cap(self, site):
+        """Test that reading stops once max_text_chars of visible text were received"""
+        site.pages["/long"] = long_page(2000)
+        result = HttpClient(cache=None).fetch_page(site.url + "/long", max_text_chars=500)
+
+        assert result.truncated
+        assert len(parse_html(result.text).text) >= 500
+        # The first 16 KB chunk already holds enough text: the rest of the page is not read
+        assert len(result.text.encode()) <= 16 * 1024 < len(long_page(2000))
+
+    def test_text_capped_page_is_cached_in_full(self, tmp_path, site):
+        """Test that a page cut by the text cap is still cached whole and served from the cache next time"""
+        site.pages["/long"] = long_page(2000)
+        client = HttpClient(cache=HttpCache(str(tmp_path / "http.sqlite")))
+
+        first = client.fetch_page(site.url + "/long", max_text_chars=500)
+        second = client.fetch_page(site.url + "/long", max_text_chars=500)
+
+        assert client.cache.lookup(site.url + "/long").body == long_page(2000).encode()
+        assert (first.truncated, second.truncated, second.from_cache) == (True, True, True)
+        assert second.text == first.text
+        assert len(site.requests) == 1
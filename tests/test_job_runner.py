@@ -0,0 +1,86 @@
+import threading
+import time
+from job_runner import JobRunner
+from pipeline import Pipeline, Stage
+
+
+def wait_finished(runner, job_id, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = runner.get(job_id)
+        if job.finished:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+class TestJobRunner:
+    def test_submit_and_poll(self):
+        """Test that a job runs in the background and its result is kept after it finishes"""
+        release = threading.Event()
+
+        def job(progress, value):
+            release.wait(1)
+            return value * 2
+
+        runner = JobRunner(max_workers=1)
+        job_id = runner.submit('quick', job, 21, params={'website_url': 'https://a.com'})
+        assert runner.get(job_id).status in ('queued', 'running')
+        release.set()
+
+        job = wait_finished(runner, job_id)
+        assert (job.status, job.result, job.kind) == ('done', 42, 'quick')
+        assert job.params == {'website_url': 'https://a.com'}
+        assert runner.get('unknown') is None
+
+    def test_progress_and_partial_results(self):
+        """Test that pipeline stage events and partial results are visible while the job runs"""
+        step = threading.Event()
+        seen = threading.Event()
+
+        def job(progress):
+            Pipeline([Stage('crawl', lambda results: 'pages')]).run(callback=progress.stage_callback())
+            progress.update(summary={'overall_summary': 'Partial'})
+            seen.set()
+            step.wait(1)
+            return 'done'
+
+        runner = JobRunner()
+        job_id = runner.submit('quick', job)
+        assert seen.wait(1)
+        job = runner.get(job_id)
+        assert job.status == 'running'
+        assert job.stages['crawl']['state'] == 'done' and 'seconds' in job.stages['crawl']
+        assert job.partial == {'summary': {'overall_summary': 'Partial'}}
+        step.set()
+        assert wait_finished(runner, job_id).result == 'done'
+
+    def test_failure_and_queueing(self):
+        """Test that failures are recorded on the job and jobs beyond max_workers wait"""
+        release = threading.Event()
+
+        def fail(progress):
+            release.wait(1)
+            raise RuntimeError("crawl blocked")
+
+        runner = JobRunner(max_workers=1)
+        first, second = runner.submit('deep', fail), runner.submit('deep', fail)
+        time.sleep(0.05)
+        assert runner.get(second).status == 'queued'
+        assert runner.get_stats() == {'queued': 1, 'running': 1, 'done': 0, 'failed': 0}
+        release.set()
+
+        job = wait_finished(runner, first)
+        assert job.status == 'failed' and job.error == "RuntimeError: crawl blocked"
+        wait_finished(runner, second)
+
+    def test_finished_jobs_expire(self):
+        """Test that finished jobs are dropped after the TTL, when the next job is submitted"""
+        runner = JobRunner(ttl_seconds=0.05)
+        old = runner.submit('quick', lambda progress: 1)
+        wait_finished(runner, old)
+        time.sleep(0.1)
+
+        new = runner.submit('quick', lambda progress: 2)
+        assert runner.get(old) is None
+        assert wait_finished(runner, new).result == 2
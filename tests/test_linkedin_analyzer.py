@@ -0,0 +1,47 @@
+import json
+import pytest
+import requests
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from http_client import HttpClient
+from linkedin_analyzer import LinkedInAnalyzer
+from llm_cache import LLMCache
+from llm_executor import LLMExecutor, RateLimiter
+from llm_runtime import DEFAULT_MODEL, LLMRuntime
+
+
+class FakeLLM(FakeListChatModel):
+    model: str = "fake-model"
+
+
+def make_analyzer(tmp_path):
+    llm = FakeLLM(responses=[json.dumps({"name": "Acme", "industry": "Software"})])
+    return LinkedInAnalyzer("test-key", http_client=HttpClient(cache=None),
+                            llm_cache=LLMCache(str(tmp_path / "llm.sqlite")),
+                            executor=LLMExecutor(RateLimiter(6000, 10 ** 8)),
+                            runtime=LLMRuntime("test-key", models={DEFAULT_MODEL: llm}))
+
+
+class TestScrapeAndAnalyze:
+    def test_analyzes_the_profile(self, tmp_path, site):
+        """Test that a company page is fetched, cleaned and analyzed"""
+        site.pages["/linkedin/company/acme"] = "<html><body><h1>Acme</h1><p>Acme builds software.</p></body></html>"
+        analyzer = make_analyzer(tmp_path)
+
+        result = analyzer.scrape_and_analyze(site.url + "/linkedin/company/acme")
+
+        assert (result["name"], result["industry"]) == ("Acme", "Software")
+        assert analyzer.executor.get_stats()["calls"] == 1
+
+    @pytest.mark.parametrize("page, error", [
+        ((999, {"Content-Type": "text/html"}, "<html><body>Sign in to LinkedIn</body></html>"), "HTTP 999"),
+        ((403, {"Content-Type": "text/html"}, "<html><body>Forbidden</body></html>"), "HTTP 403"),
+        ((200, {"Content-Type": "application/pdf"}, "%PDF"), "skipped"),
+    ])
+    def test_refused_pages_are_not_analyzed(self, tmp_path, site, page, error):
+        """Test that blocked, error and non-HTML responses raise instead of being analyzed"""
+        site.pages["/linkedin/company/acme"] = page
+        analyzer = make_analyzer(tmp_path)
+
+        with pytest.raises(requests.HTTPError, match=error):
+            analyzer.scrape_and_analyze(site.url + "/linkedin/company/acme")
+        assert analyzer.executor.get_stats()["calls"] == 0
@@ -0,0 +1,62 @@
+import time
+from langchain_core.prompts import ChatPromptTemplate
+from llm_cache import LLMCache, cache_key
+
+PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You are an expert at analyzing B2B company websites."),
+    ("user", "Analyze this content:\n{text}")
+])
+
+
+class TestCacheKey:
+    def test_key_depends_on_model_prompt_and_inputs(self):
+        """Test that each part of the content address changes the key"""
+        other_prompt = ChatPromptTemplate.from_messages([("user", "Summarize this content:\n{text}")])
+        key = cache_key("mistral-small", PROMPT, {"text": "Pricing"})
+
+        assert key == cache_key("mistral-small", PROMPT, {"text": "Pricing"})
+        assert key != cache_key("mistral-large", PROMPT, {"text": "Pricing"})
+        assert key != cache_key("mistral-small", other_prompt, {"text": "Pricing"})
+        assert key != cache_key("mistral-small", PROMPT, {"text": "Product"})
+
+
+class TestLLMCache:
+    def test_cached_computes_once(self, tmp_path):
+        """Test that a repeated call is served from the cache"""
+        cache = LLMCache(str(tmp_path / "llm.sqlite"))
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"company_overview": {"name": "MadKudu"}}
+
+        first = cache.cached("mistral-small", PROMPT, {"text": "MadKudu"}, compute)
+        second = cache.cached("mistral-small", PROMPT, {"text": "MadKudu"}, compute)
+
+        assert first == second == {"company_overview": {"name": "MadKudu"}}
+        assert len(calls) == 1
+        stats = cache.get_stats()
+        assert stats['hits'] == 1 and stats['misses'] == 1
+        assert stats['hit_rate'] == 0.5
+
+    def test_ttl(self, tmp_path):
+        """Test that expired entries are recomputed"""
+        cache = LLMCache(str(tmp_path / "llm.sqlite"), ttl_seconds=60)
+        cache.set("mistral-small", PROMPT, {"text": "a"}, {"value": 1})
+        cache._conn.execute("UPDATE llm_responses SET created_at = ?", (time.time() - 120,))
+        assert cache.get("mistral-small", PROMPT, {"text": "a"}) is None
+
+    def test_lru_eviction(self, tmp_path):
+        """Test that least recently used entries are evicted past the size limit"""
+        cache = LLMCache(str(tmp_path / "llm.sqlite"), max_size_bytes=40)
+        cache.set("m", PROMPT, {"text": "a"}, {"value": "x" * 5})
+        time.sleep(0.01)
+        cache.set("m", PROMPT, {"text": "b"}, {"value": "x" * 5})
+        time.sleep(0.01)
+        cache.get("m", PROMPT, {"text": "a"})
+        time.sleep(0.01)
+        cache.set("m", PROMPT, {"text": "c"}, {"value": "x" * 5})
+
+        assert cache.get("m", PROMPT, {"text": "a"}) is not None
+        assert cache.get("m", PROMPT, {"text": "b"}) is None
+        assert cache.get("m", PROMPT, {"text": "c"}) is not None
@@ -0,0 +1,220 @@
+import asyncio
+import threading
+import httpx
+import pytest
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel
+from llm_executor import LLMExecutor, RateLimiter, get_llm_loop, iterate_sync, run_sync
+from structured_output import RepairingOutputParser, get_parser_stats
+
+
+def rate_limit_error(retry_after: str = "0") -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://api.mistral.ai/v1/chat/completions")
+    response = httpx.Response(429, headers={"Retry-After": retry_after}, request=request)
+    return httpx.HTTPStatusError("Too Many Requests", request=request, response=response)
+
+
+class FlakyChain:
+    """Chain failing with the given errors before succeeding"""
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if self.errors:
+                raise self.errors.pop(0)
+            return inputs["text"].upper()
+        finally:
+            self.in_flight -= 1
+
+    async def astream(self, inputs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        for char in inputs["text"]:
+            await asyncio.sleep(0)
+            yield char.upper()
+
+
+class TestRateLimiter:
+    def test_burst_then_wait(self):
+        """Test that requests beyond the burst wait for the bucket to refill"""
+        limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=1000, request_burst=2)
+
+        assert limiter._reserve(0) == 0
+        assert limiter._reserve(0) == 0
+        assert limiter._reserve(0) == pytest.approx(1.0, abs=0.05)
+
+    def test_token_budget(self):
+        """Test that large requests wait for enough tokens"""
+        limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=600)
+
+        assert limiter._reserve(600) == 0
+        assert limiter._reserve(60) == pytest.approx(6.0, abs=0.05)
+
+
+class TestLLMExecutor:
+    def test_retries_rate_limited_calls(self):
+        """Test that 429 responses are retried with backoff"""
+        executor = LLMExecutor(RateLimiter(6000, 10 ** 7), base_delay=0.01)
+        chain = FlakyChain([rate_limit_error(), rate_limit_error()])
+
+        assert executor.invoke(chain, {"text": "ok"}) == "OK"
+        assert chain.calls == 3
+        assert executor.get_stats() == {'calls': 3, 'retries': 2, 'failures': 0}
+
+    def test_gives_up_after_max_retries(self):
+        """Test that the last error is raised once retries are exhausted"""
+        executor = LLMExecutor(RateLimiter(6000, 10 ** 7), max_retries=1, base_delay=0.01)
+        chain = FlakyChain([rate_limit_error(), rate_limit_error()])
+
+        with pytest.raises(httpx.HTTPStatusError):
+            executor.invoke(chain, {"text": "ok"})
+        assert executor.get_stats()['failures'] == 1
+
+    def test_does_not_retry_other_errors(self):
+        """Test that non-retryable errors are raised immediately"""
+        executor = LLMExecutor(RateLimiter(6000, 10 ** 7), base_delay=0.01)
+        chain = FlakyChain([ValueError("bad output")])
+
+        with pytest.raises(ValueError):
+            executor.invoke(chain, {"text": "ok"})
+        assert chain.calls == 1
+
+    def test_limits_calls_in_flight(self):
+        """Test that concurrent calls never exceed max_in_flight"""
+        executor = LLMExecutor(RateLimiter(6000, 10 ** 7), max_in_flight=2)
+        chain = FlakyChain()
+
+        async def run_all():
+            return await asyncio.gather(*(executor.ainvoke(chain, {"text": str(i)}) for i in range(6)))
+
+        assert asyncio.run(run_all()) == [str(i) for i in range(6)]
+        assert chain.max_in_flight == 2
+
+    def test_limits_calls_in_flight_across_threads(self):
+        """Test that calls awaited from different threads and event loops share the in-flight limit"""
+        executor = LLMExecutor(RateLimiter(6000, 10 ** 7), max_in_flight=2)
+        chain = FlakyChain()
+
+        threads = [threading.Thread(target=executor.invoke, args=(chain, {"text": str(i)})) for i in range(3)]
+        threads.append(threading.Thread(target=asyncio.run, args=(executor.ainvoke(chain, {"text": "x"}),)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert chain.calls == 4
+        assert chain.max_in_flight == 2
+
+    def test_cancelled_call_frees_its_slot(self):
+        """Test that cancelling a call, running or waiting for a slot, gives its slot back"""
+        executor = LLMExecutor(RateLimiter(6000, 10 ** 7), max_in_flight=1)
+
+        class SlowChain(FlakyChain):
+            async def ainvoke(self, inputs):
+                await asyncio.sleep(10)
+
+        async def cancel_calls():
+            calls = [asyncio.ensure_future(executor.ainvoke(SlowChain(), {"text": "slow"})) for _ in range(2)]
+            await asyncio.sleep(0.1)
+            for call in calls:
+                call.cancel()
+            await asyncio.gather(*calls, return_exceptions=True)
+
+        asyncio.run(cancel_calls())
+        assert run_sync(asyncio.wait_for(executor.ainvoke(FlakyChain(), {"text": "ok"}), 1)) == "OK"
+
+    def test_streams_with_retries(self):
+        """Test that a stream failing before its first chunk is retried"""
+        executor = LLMExecutor(RateLimiter(6000, 10 ** 7), base_delay=0.01)
+        chain = FlakyChain([rate_limit_error()])
+
+        assert list(iterate_sync(executor.astream(chain, {"text": "ok"}))) == ["O", "K"]
+        assert chain.calls == 2
+        assert executor.get_stats()['retries'] == 1
+
+
+class Overview(BaseModel):
+    name: str
+    industry: str
+
+
+class TestOutputFixes:
+    def fixing_chain(self, responses):
+        llm = FakeListChatModel(responses=responses)
+        parser = RepairingOutputParser.from_llm(Overview, llm)
+        return ChatPromptTemplate.from_messages([("user", "{text}")]) | llm | parser, parser
+
+    def test_fix_runs_through_the_executor(self):
+        """Test that the LLM fix of an output is a counted executor call"""
+        executor = LLMExecutor(RateLimiter(6000, 10 ** 7))
+        chain, _ = self.fixing_chain(["no json here", '{"name": "MadKudu", "industry": "SaaS"}'])
+        fixes = get_parser_stats()['llm_fixes']
+
+        assert executor.invoke(chain, {"text": "ok"}) == Overview(name="MadKudu", industry="SaaS")
+        assert executor.get_stats() == {'calls': 2, 'retries': 0, 'failures': 0}
+        assert get_parser_stats()['llm_fixes'] == fixes + 1
+
+    def test_aparse_fixes_streamed_outputs(self):
+        """Test that aparse fixes an output through the executor"""
+        executor = LLMExecutor(RateLimiter(6000, 10 ** 7))
+        _, parser = self.fixing_chain(['{"name": "MadKudu", "industry": "SaaS"}'])
+
+        assert run_sync(executor.aparse(parser, "no json here")).name == "MadKudu"
+        assert executor.get_stats()['calls'] == 1
+
+    def test_unfixable_output_raises(self):
+        """Test that an output still invalid after the fix raises a parser error"""
+        executor = LLMExecutor(RateLimiter(6000, 10 ** 7))
+        chain, _ = self.fixing_chain(["no json here", "still no json"])
+
+        with pytest.raises(OutputParserException):
+            executor.invoke(chain, {"text": "ok"})
+        assert executor.get_stats()['calls'] == 2
+
+
+class TestSyncBridges:
+    def test_run_sync_reuses_one_loop(self):
+        """Test that sync calls share one long-lived loop instead of a new loop per call"""
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        first, second = run_sync(current_loop()), run_sync(current_loop())
+        assert first is second is get_llm_loop()
+        assert first.is_running() and not first.is_closed()
+
+    def test_run_sync_from_the_llm_loop_raises(self):
+        """Test that a coroutine on the LLM loop cannot block waiting for that same loop"""
+        async def nested():
+            return run_sync(asyncio.sleep(0, result="never"))
+
+        with pytest.raises(RuntimeError, match="LLM loop"):
+            run_sync(nested())
+
+    def test_iterate_sync_closed_early_cancels(self):
+        """Test that leaving a sync iteration early stops the async iterator"""
+        stopped = threading.Event()
+
+        async def numbers():
+            try:
+                for i in range(1000):
+                    await asyncio.sleep(0.01)
+                    yield i
+            finally:
+                stopped.set()
+
+        items = iterate_sync(numbers())
+        assert [next(items), next(items)] == [0, 1]
+        items.close()
+        assert stopped.wait(1)
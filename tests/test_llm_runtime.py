@@ -0,0 +1,76 @@
+import asyncio
+import json
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate
+from llm_cache import LLMCache
+from llm_executor import LLMExecutor, RateLimiter
+from llm_runtime import DEFAULT_MODEL, LLMRuntime, get_llm_runtime
+from website_analyzer import ANALYSIS_PROMPT, WebsiteAnalysis, WebsiteAnalyzer
+from website_summarizer import WebsiteSummarizer, WebsiteSummary
+
+
+class TestLLMRuntime:
+    def test_one_model_per_name(self):
+        """Test that analyzers on the same runtime share the chat model"""
+        runtime = LLMRuntime("test-key")
+        analyzer = WebsiteAnalyzer("test-key", runtime=runtime)
+        summarizer = WebsiteSummarizer({}, {}, "test-key", runtime=runtime)
+
+        assert analyzer.llm is summarizer.llm is runtime.chat_model(DEFAULT_MODEL)
+
+    def test_chains_and_instructions_built_once(self):
+        """Test that chains, parsers and format instructions are cached per prompt and schema"""
+        runtime = LLMRuntime("test-key", models={DEFAULT_MODEL: FakeListChatModel(responses=["{}"])})
+
+        assert runtime.chain(ANALYSIS_PROMPT, WebsiteAnalysis) is runtime.chain(ANALYSIS_PROMPT, WebsiteAnalysis)
+        assert runtime.parser(WebsiteAnalysis) is runtime.parser(WebsiteAnalysis)
+        assert runtime.format_instructions(WebsiteAnalysis) == runtime.parser(WebsiteAnalysis).get_format_instructions()
+
+    def test_shared_runtime_per_api_key(self):
+        assert get_llm_runtime("key-a") is get_llm_runtime("key-a")
+        assert get_llm_runtime("key-a") is not get_llm_runtime("key-b")
+
+
+def full_analysis(name):
+    return json.dumps({"company_overview": {"name": name}, "sales_intelligence": {}, "pricing": {},
+                       "firmographic": {}, "gtm_strategy": {}})
+
+
+class TestSharedModelAcrossLoops:
+    def test_calls_from_successive_event_loops(self, tmp_path, mistral_stub, mistral_runtime):
+        """Test that the shared model keeps working when each call comes from a new, then closed, event loop"""
+        mistral_stub.respond = lambda messages: full_analysis("Acme")
+        analyzer = WebsiteAnalyzer("test-key", llm_cache=LLMCache(str(tmp_path / "llm.sqlite")),
+                                   executor=LLMExecutor(RateLimiter(6000, 10 ** 8)), runtime=mistral_runtime)
+
+        names = [asyncio.run(analyzer.aanalyze_text(f"Page {i} of Acme"))["company_overview"]["name"] for i in range(3)]
+        assert names == ["Acme"] * 3
+        assert len(mistral_stub.requests) == 3
+
+    def test_streams_from_successive_event_loops(self, mistral_stub, mistral_runtime):
+        """Test that streamed calls also survive the event loop of the previous call being closed"""
+        mistral_stub.respond = lambda messages: "Acme sells lead scoring"
+        executor = LLMExecutor(RateLimiter(6000, 10 ** 8))
+        chain = mistral_runtime.chain(ChatPromptTemplate.from_messages([("human", "{text}")]), None, json_output=False)
+
+        async def stream():
+            return "".join([chunk.content async for chunk in executor.astream(chain, {"text": "Who is Acme?"})])
+
+        assert [asyncio.run(stream()) for _ in range(3)] == ["Acme sells lead scoring"] * 3
+        assert all(request["stream"] for request in mistral_stub.requests)
+
+    def test_sync_apis_called_repeatedly(self, tmp_path, mistral_stub, mistral_runtime):
+        """Test that analyzers and summarizers can be called several times through their sync APIs"""
+        summary = {field: f"{field} text" for field in WebsiteSummary.model_fields}
+        mistral_stub.respond = lambda messages: (json.dumps(summary) if "summar" in messages[0]["content"].lower()
+                                                 else full_analysis("Acme"))
+        kwargs = {"llm_cache": LLMCache(str(tmp_path / "llm.sqlite")),
+                  "executor": LLMExecutor(RateLimiter(6000, 10 ** 8)), "runtime": mistral_runtime}
+        analyzer = WebsiteAnalyzer("test-key", **kwargs)
+        assert [analyzer.analyze_text(f"Page {i} of Acme")["company_overview"]["name"] for i in range(2)] == ["Acme"] * 2
+
+        summarizer = WebsiteSummarizer({"https://acme.com": json.loads(full_analysis("Acme"))}, {}, "test-key", **kwargs)
+        assert summarizer.summarize_analysis() == summary
+        kwargs["llm_cache"] = LLMCache(str(tmp_path / "other.sqlite"))
+        assert dict(WebsiteSummarizer({"https://acme.com": json.loads(full_analysis("Acme"))}, {}, "test-key",
+                                      **kwargs).stream_summary()) == summary
@@ -0,0 +1,40 @@
+import pytest
+from page_classifier import ALL_SECTIONS, classify_page, sections_for_page
+
+
+class TestClassifyPage:
+    @pytest.mark.parametrize("url,expected", [
+        ("https://madkudu.com/", "home"),
+        ("https://madkudu.com/pricing", "pricing"),
+        ("https://madkudu.com/product/pricing", "pricing"),
+        ("https://madkudu.com/en/platform", "product"),
+        ("https://madkudu.com/customers/acme", "customers"),
+        ("https://madkudu.com/about-us", "about"),
+        ("https://madkudu.com/careers/sales-engineer", "careers"),
+        ("https://madkudu.com/blog/how-pricing-works", "content"),
+        ("https://madkudu.com/legal/privacy", "other"),
+    ])
+    def test_url_patterns(self, url, expected):
+        """Test page types guessed from the URL path"""
+        assert classify_page(url) == expected
+
+    def test_headings_when_url_is_opaque(self):
+        """Test that headings classify pages whose URL says nothing"""
+        assert classify_page("https://madkudu.com/p/123", ["Simple, transparent pricing"]) == "pricing"
+        assert classify_page("https://madkudu.com/p/123", ["Case studies"]) == "customers"
+
+    def test_mixed_headings_keep_full_schema(self):
+        """Test that headings hinting at several page types fall back to the full schema"""
+        assert classify_page("https://madkudu.com/p/123", ["Our platform", "Pricing"]) == "other"
+        assert sections_for_page("https://madkudu.com/p/123", ["Our platform", "Pricing"]) == ALL_SECTIONS
+
+
+class TestSectionsForPage:
+    def test_pricing_page_only_extracts_pricing(self):
+        assert sections_for_page("https://madkudu.com/pricing") == ("pricing",)
+
+    def test_sections_keep_schema_order(self):
+        """Test that sections are listed in WebsiteAnalysis order"""
+        for url in ["https://madkudu.com/", "https://madkudu.com/customers", "https://madkudu.com/blog"]:
+            sections = sections_for_page(url)
+            assert list(sections) == [name for name in ALL_SECTIONS if name in sections]
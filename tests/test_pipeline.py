@@ -0,0 +1,73 @@
+import threading
+import time
+import pytest
+from pipeline import Pipeline, Stage
+
+
+def sleeper(value, seconds=0.1):
+    def func(results):
+        time.sleep(seconds)
+        return value
+    return func
+
+
+class TestPipeline:
+    def test_independent_stages_overlap(self):
+        """Test that stages with the same dependency run concurrently"""
+        pipeline = Pipeline([
+            Stage('search', lambda results: results['company'].lower()),
+            Stage('crawl', sleeper('pages'), ('search',)),
+            Stage('linkedin', sleeper('profile'), ('search',)),
+            Stage('summary', lambda results: f"{results['crawl']} + {results['linkedin']}", ('crawl', 'linkedin')),
+        ])
+
+        start = time.perf_counter()
+        run = pipeline.run({'company': 'MadKudu'})
+        assert time.perf_counter() - start < 0.18
+        assert run.results['summary'] == "pages + profile"
+        assert run.status == {'search': 'done', 'crawl': 'done', 'linkedin': 'done', 'summary': 'done'}
+
+    def test_callbacks_on_calling_thread(self):
+        """Test that stage events are delivered in order on the thread calling run()"""
+        events = []
+        pipeline = Pipeline([Stage('a', sleeper(1, 0.01)), Stage('b', sleeper(2, 0.01), ('a',))])
+
+        pipeline.run(callback=lambda event, stage, details: events.append((event, stage.name, threading.current_thread())))
+        assert [(event, name) for event, name, _ in events] == [('started', 'a'), ('done', 'a'), ('started', 'b'), ('done', 'b')]
+        assert all(thread is threading.current_thread() for _, _, thread in events)
+
+    def test_inputs_and_targets(self):
+        """Test that given stage results are not recomputed and only the targets' stages run"""
+        pipeline = Pipeline([
+            Stage('search', lambda results: pytest.fail("search should not run")),
+            Stage('crawl', lambda results: results['search'] + '/pages', ('search',)),
+            Stage('linkedin', lambda results: pytest.fail("linkedin should not run"), ('search',)),
+        ])
+
+        run = pipeline.run({'search': 'https://a.com'}, targets=['crawl'])
+        assert run.results == {'search': 'https://a.com', 'crawl': 'https://a.com/pages'}
+        assert pipeline.run({'search': 'https://a.com'}, targets=[]).status == {}
+
+    def test_optional_and_required_failures(self):
+        """Test that optional failures give None while required ones skip their dependents and raise"""
+        def fail(results):
+            raise RuntimeError("blocked")
+
+        optional = Pipeline([Stage('linkedin', fail, optional=True),
+                             Stage('summary', lambda results: results['linkedin'], ('linkedin',))])
+        run = optional.run()
+        assert run.results['summary'] is None
+        assert isinstance(run.errors['linkedin'], RuntimeError)
+
+        events = []
+        required = Pipeline([Stage('crawl', fail), Stage('summary', sleeper('x', 0), ('crawl',))])
+        with pytest.raises(RuntimeError):
+            required.run(callback=lambda event, stage, details: events.append((event, stage.name)))
+        assert events == [('started', 'crawl'), ('failed', 'crawl'), ('skipped', 'summary')]
+
+    def test_invalid_graphs(self):
+        """Test that cycles and unknown stages are rejected"""
+        with pytest.raises(ValueError):
+            Pipeline([Stage('a', sleeper(1), ('b',)), Stage('b', sleeper(2), ('a',))])
+        with pytest.raises(ValueError):
+            Pipeline([Stage('a', sleeper(1))]).run(targets=['missing'])
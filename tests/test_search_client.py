@@ -0,0 +1,97 @@
+import threading
+import time
+import pytest
+from search_client import SearchClient
+
+
+class FakeService:
+    """Custom Search service returning one item per query, slowly"""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def cse(self):
+        return self
+
+    def list(self, q, cx, num):
+        service = self
+
+        class Request:
+            def execute(self, http=None):
+                with service.lock:
+                    service.calls.append(q)
+                time.sleep(0.05)
+                if service.fail:
+                    raise RuntimeError("quota exceeded")
+                return {'items': [{'title': q, 'link': f"https://{q.replace(' ', '-')}.com", 'snippet': 'x'}]}
+
+        return Request()
+
+
+def make_client(tmp_path, **kwargs):
+    service = FakeService(**kwargs)
+    return SearchClient("key", "cx", cache_path=str(tmp_path / "search.sqlite"), service=service), service
+
+
+class TestSearchClient:
+    def test_results_are_cached(self, tmp_path):
+        """Test that a repeated query, even spelled differently, is served from the cache"""
+        client, service = make_client(tmp_path)
+
+        first = client.search("MadKudu", 5)
+        assert client.search("  madkudu ", 5) == first == [
+            {'title': 'MadKudu', 'link': 'https://MadKudu.com', 'description': 'x'}]
+        assert service.calls == ["MadKudu"]
+        assert client.get_stats()['hits'] == 1
+
+        # The cache persists across clients
+        other = SearchClient("key", "cx", cache_path=str(tmp_path / "search.sqlite"), service=service)
+        assert other.search("MadKudu", 5) == first
+        assert len(service.calls) == 1
+
+    def test_expired_results_are_fetched_again(self, tmp_path):
+        """Test the cache TTL"""
+        client, service = make_client(tmp_path)
+        client.ttl_seconds = 0
+
+        client.search("MadKudu")
+        client.search("MadKudu")
+        assert len(service.calls) == 2
+
+    def test_concurrent_identical_queries_are_coalesced(self, tmp_path):
+        """Test that identical queries in flight share one API call"""
+        client, service = make_client(tmp_path)
+
+        results = client.search_many(["MadKudu linkedin"] * 4 + ["MadKudu"])
+        assert results[0] == results[3]
+        assert sorted(service.calls) == ["MadKudu", "MadKudu linkedin"]
+
+    def test_failures_are_not_cached(self, tmp_path):
+        """Test that errors are raised to every waiter and retried later"""
+        client, service = make_client(tmp_path, fail=True)
+
+        with pytest.raises(RuntimeError):
+            client.search("MadKudu")
+        service.fail = False
+        assert client.search("MadKudu")
+        assert len(service.calls) == 2
+        assert client.get_stats()['errors'] == 1
+
+    def test_search_many_isolates_failures(self, tmp_path):
+        """Test that a failed query gives no results without failing the other queries"""
+        client, service = make_client(tmp_path)
+        client.search("MadKudu")
+        service.fail = True
+
+        assert client.search_many(["MadKudu", "MadKudu linkedin"]) == [
+            [{'title': 'MadKudu', 'link': 'https://MadKudu.com', 'description': 'x'}], []]
+        assert client.get_stats()['errors'] == 1
+
+    def test_search_many_raises_when_every_query_fails(self, tmp_path):
+        """Test that a search where no query succeeded is an error, not an empty result"""
+        client, _ = make_client(tmp_path, fail=True)
+
+        with pytest.raises(RuntimeError, match="quota exceeded"):
+            client.search_many(["MadKudu", "MadKudu linkedin"])
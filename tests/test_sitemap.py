@@ -0,0 +1,49 @@
+from http_client import HttpClient
+from sitemap import fetch_sitemap_urls, parse_sitemap
+
+XML = {"Content-Type": "application/xml"}
+
+
+def urlset(*urls):
+    entries = "".join(f"<url><loc>{url}</loc><lastmod>2024-01-01</lastmod></url>" for url in urls)
+    return f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'
+
+
+def sitemap_index(*urls):
+    entries = "".join(f"<sitemap><loc>{url}</loc></sitemap>" for url in urls)
+    return f'<?xml version="1.0"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>'
+
+
+class TestParseSitemap:
+    def test_urlset_and_index(self):
+        """Test that page URLs and nested sitemaps are told apart, namespaces ignored"""
+        assert parse_sitemap(urlset("https://a.com/", "https://a.com/pricing")) == (
+            ["https://a.com/", "https://a.com/pricing"], [])
+        assert parse_sitemap(sitemap_index("https://a.com/pages.xml")) == ([], ["https://a.com/pages.xml"])
+
+    def test_invalid_xml(self):
+        assert parse_sitemap("<html>Not a sitemap") == ([], [])
+
+
+class TestFetchSitemapUrls:
+    def test_robots_sitemap_index(self, site):
+        """Test that the sitemaps declared in robots.txt are followed through sitemap indexes"""
+        site.pages.update({
+            "/robots.txt": (200, {"Content-Type": "text/plain"},
+                            f"User-agent: *\nDisallow: /admin\nSitemap: {site.url}/sitemap_index.xml\n"),
+            "/sitemap_index.xml": (200, XML, sitemap_index(f"{site.url}/pages.xml", f"{site.url}/products.xml")),
+            "/pages.xml": (200, XML, urlset(f"{site.url}/", f"{site.url}/about")),
+            "/products.xml": (200, XML, urlset(f"{site.url}/product", f"{site.url}/about")),
+        })
+
+        urls = fetch_sitemap_urls(site.url, HttpClient(cache=None))
+
+        assert urls == [f"{site.url}/", f"{site.url}/about", f"{site.url}/product"]
+        assert "/sitemap.xml" not in [path for path, _ in site.requests]
+
+    def test_default_sitemap_location_and_limit(self, site):
+        """Test that /sitemap.xml is used without robots.txt entries and max_urls is respected"""
+        site.pages["/sitemap.xml"] = (200, XML, urlset(*(f"{site.url}/page-{i}" for i in range(10))))
+
+        assert fetch_sitemap_urls(site.url, HttpClient(cache=None), max_urls=3) == [
+            f"{site.url}/page-0", f"{site.url}/page-1", f"{site.url}/page-2"]
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+from typing import List
+import pytest
+from pydantic import BaseModel, Field
+from langchain.output_parsers import PydanticOutputParser
+from structured_output import (IncrementalJSONParser, RepairingOutputParser, count_parser_stats, get_parser_stats,
+                               repair_json)
+
+
+class Overview(BaseModel):
+    company_overview: dict
+
+
+class Pages(BaseModel):
+    pages: List[dict] = Field(default_factory=list)
+
+
+def local_parser(model):
+    return RepairingOutputParser(base_parser=PydanticOutputParser(pydantic_object=model))
+
+
+class TestRepairJson:
+    def test_escaped_underscores_and_trailing_commas(self):
+        """Test the formatting mistakes the prompts warn about"""
+        assert repair_json('{"company\\_overview": {"name": "MadKudu",},}') == {"company_overview": {"name": "MadKudu"}}
+
+    def test_surrounding_text_and_fences(self):
+        """Test that prose and markdown fences around the JSON are ignored"""
+        text = 'Here is the analysis:\n```json\n{"name": "MadKudu"}\n```\nLet me know if you need more.'
+        assert repair_json(text) == {"name": "MadKudu"}
+
+    def test_truncated_answer(self):
+        """Test that an answer cut mid-string is closed"""
+        assert repair_json('{"products": ["Lead scoring", "API') == {"products": ["Lead scoring", "API"]}
+
+    def test_unrepairable(self):
+        """Test that text without JSON raises ValueError"""
+        with pytest.raises(ValueError):
+            repair_json("I could not find any information.")
+
+
+class TestRepairingOutputParser:
+    def test_list_wrapping(self):
+        """Test that a single object wrapped in a list is unwrapped"""
+        result = local_parser(Overview).parse('[{"company_overview": {"name": "MadKudu"}}]')
+        assert result.company_overview == {"name": "MadKudu"}
+
+    def test_schema_name_wrapping(self):
+        """Test that an answer nested under the schema name is unwrapped"""
+        result = local_parser(Overview).parse('{"Overview": {"company_overview": {"name": "MadKudu"}}}')
+        assert result.company_overview == {"name": "MadKudu"}
+
+    def test_bare_list_for_list_field(self):
+        """Test that a bare list is wrapped in the schema's only list field"""
+        result = local_parser(Pages).parse('[{"url": "/"}, {"url": "/pricing"}]')
+        assert result.pages == [{"url": "/"}, {"url": "/pricing"}]
+
+    def test_counts_outcomes(self):
+        """Test that direct parses and local repairs are counted"""
+        before = get_parser_stats()
+        parser = local_parser(Overview)
+        parser.parse('{"company_overview": {}}')
+        parser.parse('{"company\\_overview": {}}')
+        after = get_parser_stats()
+
+        assert after['parsed'] - before['parsed'] == 1
+        assert after['repaired'] - before['repaired'] == 1
+        assert after['llm_fixes'] == before['llm_fixes']
+
+    def test_counts_per_context(self):
+        """Test that a count_parser_stats block leaves out outputs parsed by other threads"""
+        parser = local_parser(Overview)
+        with count_parser_stats() as counts:
+            parser.parse('{"company_overview": {}}')
+            other = threading.Thread(target=parser.parse, args=('{"company_overview": {}}',))
+            other.start()
+            other.join()
+            asyncio.run(asyncio.to_thread(parser.parse, '{"company\\_overview": {}}'))
+
+        assert counts == {'parsed': 1, 'repaired': 1, 'llm_fixes': 0}
+
+
+class TestIncrementalJSONParser:
+    def test_fields_complete_before_closing_brace(self):
+        """Test that each field is emitted as soon as the next one starts"""
+        parser = IncrementalJSONParser()
+        assert parser.feed('{"overview": "Lead sc') == []
+        assert parser.feed('oring, \\"B2B\\"", "pri') == [("overview", 'Lead scoring, "B2B"')]
+        assert parser.feed('cing": "Free"}') == [("pricing", "Free")]
+
+    def test_nested_values_and_escaped_keys(self):
+        """Test objects, lists, numbers and escaped underscores in keys"""
+        parser = IncrementalJSONParser()
+        chunks = ['{"company\\_overview": {"a": [1, ', '{"b": "}"}]}, ', '"count": 3', ', "ok": true}']
+        fields = [field for chunk in chunks for field in parser.feed(chunk)]
+        assert fields == [("company_overview", {"a": [1, {"b": "}"}]}), ("count", 3), ("ok", True)]
+        assert parser.fields == dict(fields)
@@ -0,0 +1,26 @@
+from token_counting import estimate_tokens, split_into_chunks
+
+
+class TestSplitIntoChunks:
+    def test_short_text_is_one_chunk(self):
+        """Test that text under the limit is not split"""
+        assert split_into_chunks("Pricing\nStarter plan", 100) == ["Pricing\nStarter plan"]
+        assert split_into_chunks("", 100) == []
+
+    def test_chunks_fit_and_keep_order(self):
+        """Test that chunks respect the limit, split on lines and keep all the text"""
+        lines = [f"Block {i}. " + "word " * 30 for i in range(20)]
+        chunks = split_into_chunks("\n".join(lines), 100)
+
+        assert len(chunks) > 1
+        assert all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+        assert "\n".join(chunks).split("\n") == lines
+
+    def test_oversized_line_is_split_on_sentences(self):
+        """Test that a single long block is cut between sentences"""
+        text = " ".join(f"Sentence number {i} is here." for i in range(100))
+        chunks = split_into_chunks(text, 50)
+
+        assert all(estimate_tokens(chunk) <= 50 for chunk in chunks)
+        assert all(chunk.endswith(".") for chunk in chunks)
+        assert " ".join(chunks) == text
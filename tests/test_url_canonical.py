@@ -0,0 +1,100 @@
+import pytest
+from url_canonical import VisitedIndex, canonicalize_url, same_site, site_key
+
+# Pairs of URLs pointing to the same page
+EQUIVALENT_URLS = [
+    ("http://madkudu.com/pricing", "https://madkudu.com/pricing"),
+    ("https://www.madkudu.com/pricing", "https://madkudu.com/pricing"),
+    ("https://WWW.MadKudu.com/Pricing", "https://madkudu.com/pricing"),
+    ("https://madkudu.com/pricing/", "https://madkudu.com/pricing"),
+    ("https://madkudu.com/", "https://madkudu.com"),
+    ("https://madkudu.com/index.html", "https://madkudu.com/"),
+    ("https://madkudu.com/about/index.php", "https://madkudu.com/about"),
+    ("https://madkudu.com/about/Default.aspx", "https://madkudu.com/about/"),
+    ("https://madkudu.com:443/pricing", "https://madkudu.com/pricing"),
+    ("http://madkudu.com:80/pricing", "https://madkudu.com/pricing"),
+    ("https://madkudu.com/pricing#enterprise", "https://madkudu.com/pricing"),
+    ("https://madkudu.com/pricing?utm_source=google", "https://madkudu.com/pricing"),
+    ("https://madkudu.com//product//scoring", "https://madkudu.com/product/scoring"),
+    ("https://madkudu.com/product/../pricing", "https://madkudu.com/pricing"),
+    ("https://madkudu.com/./pricing", "https://madkudu.com/pricing"),
+    ("https://madkudu.com/%7Euser", "https://madkudu.com/~user"),
+    ("https://madkudu.com/a%2db", "https://madkudu.com/a-b"),
+    ("  https://madkudu.com/pricing  ", "https://madkudu.com/pricing"),
+    ("https://madkudu.com./pricing", "https://madkudu.com/pricing"),
+]
+
+# Pairs of URLs pointing to different pages
+DIFFERENT_URLS = [
+    ("https://madkudu.com/pricing", "https://madkudu.com/pricing-old"),
+    ("https://madkudu.com/pricing", "https://app.madkudu.com/pricing"),
+    ("https://madkudu.com:8443/pricing", "https://madkudu.com/pricing"),
+    ("https://madkudu.com/index.html/pricing", "https://madkudu.com/indexhtml/pricing"),
+    ("https://madkudu.com/wwwpricing", "https://madkudu.com/pricing"),
+]
+
+
+class TestCanonicalizeUrl:
+    @pytest.mark.parametrize("url,other", EQUIVALENT_URLS)
+    def test_equivalent_urls(self, url, other):
+        """Test that equivalent URLs share one canonical form"""
+        assert canonicalize_url(url) == canonicalize_url(other)
+
+    @pytest.mark.parametrize("url,other", DIFFERENT_URLS)
+    def test_different_urls(self, url, other):
+        """Test that different pages keep different canonical forms"""
+        assert canonicalize_url(url) != canonicalize_url(other)
+
+    def test_canonical_form(self):
+        """Test the exact canonical form of a messy URL"""
+        assert canonicalize_url("HTTP://www.MadKudu.com:80/Product//Scoring/index.html?q=1#top") == \
+            "https://madkudu.com/product/scoring"
+
+    def test_keep_query(self):
+        """Test that queries can be kept, sorted and without tracking parameters"""
+        assert canonicalize_url("https://madkudu.com/blog?page=2&utm_medium=email&lang=en", keep_query=True) == \
+            "https://madkudu.com/blog?lang=en&page=2"
+        assert canonicalize_url("https://madkudu.com/blog?page=2", keep_query=True) != \
+            canonicalize_url("https://madkudu.com/blog?page=3", keep_query=True)
+
+
+class TestSameSite:
+    def test_www_and_apex(self):
+        """Test that www. and apex domains belong to the same site"""
+        assert same_site("https://www.madkudu.com/pricing", "https://madkudu.com")
+        assert same_site("http://MADKUDU.com", "https://www.madkudu.com/")
+        assert site_key("https://www.madkudu.com:443/") == "madkudu.com"
+
+    def test_other_hosts(self):
+        """Test that subdomains and other domains are different sites"""
+        assert not same_site("https://blog.madkudu.com/", "https://madkudu.com")
+        assert not same_site("https://madkudu.com.evil.io/", "https://madkudu.com")
+
+
+class TestVisitedIndex:
+    def test_add(self):
+        """Test that equivalent URLs are only visited once"""
+        index = VisitedIndex()
+        assert index.add("https://www.madkudu.com/pricing/")
+        assert not index.add("http://madkudu.com/Pricing")
+        assert "https://madkudu.com/pricing#tiers" in index
+        assert index.original("https://madkudu.com/pricing") == "https://www.madkudu.com/pricing/"
+        assert len(index) == 1
+
+    def test_add_alias(self):
+        """Test rel=canonical handling"""
+        index = VisitedIndex()
+        index.add("https://madkudu.com/pricing")
+        index.add("https://madkudu.com/fr/pricing")
+
+        # A page declaring itself as canonical is not a duplicate
+        assert index.add_alias("https://madkudu.com/pricing/", "https://madkudu.com/pricing") is None
+        # A page declaring a visited page as canonical is a duplicate of it
+        assert index.add_alias("https://madkudu.com/pricing", "https://madkudu.com/fr/pricing") == \
+            "https://madkudu.com/pricing"
+        # A page declaring an unvisited page as canonical marks it as visited
+        index.add("https://madkudu.com/plans")
+        assert index.add_alias("https://madkudu.com/offers", "https://madkudu.com/plans") is None
+        assert "https://madkudu.com/offers" in index
+        assert list(index) == ["https://madkudu.com/pricing", "https://madkudu.com/fr/pricing",
+                               "https://madkudu.com/plans"]
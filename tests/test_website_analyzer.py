@@ -0,0 +1,124 @@
+import json
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from llm_cache import LLMCache
+from llm_executor import LLMExecutor, RateLimiter
+from llm_runtime import DEFAULT_MODEL, LLMRuntime
+from website_analyzer import ALL_SECTIONS, WebsiteAnalyzer, merge_analyses
+
+
+class FakeLLM(FakeListChatModel):
+    model: str = "fake-model"
+
+
+def make_analyzer(tmp_path, responses, **kwargs):
+    llm = FakeLLM(responses=[json.dumps(response) for response in responses])
+    return WebsiteAnalyzer("test-key", llm_cache=LLMCache(str(tmp_path / "llm.sqlite")),
+                           executor=LLMExecutor(RateLimiter(6000, 10 ** 8)),
+                           runtime=LLMRuntime("test-key", models={DEFAULT_MODEL: llm}), **kwargs)
+
+
+def full_analysis(name):
+    return {"company_overview": {"name": name}, "sales_intelligence": {}, "pricing": {},
+            "firmographic": {}, "gtm_strategy": {}}
+
+
+def analysis(**overrides):
+    base = {
+        "company_overview": {"name": "Not specified", "products_services": []},
+        "pricing": {"tiers": [], "has_enterprise_pricing": False},
+    }
+    for section, values in overrides.items():
+        base[section] = {**base[section], **values}
+    return base
+
+
+class TestMergeAnalyses:
+    def test_first_specified_value_wins(self):
+        """Test that 'Not specified' never overrides a value found in another chunk"""
+        merged = merge_analyses([
+            analysis(),
+            analysis(company_overview={"name": "MadKudu"}),
+            analysis(company_overview={"name": "MadKudu Inc."}),
+        ])
+        assert merged["company_overview"]["name"] == "MadKudu"
+
+    def test_lists_are_unioned_without_duplicates(self):
+        """Test that list items are merged case-insensitively in document order"""
+        merged = merge_analyses([
+            analysis(company_overview={"products_services": ["Lead scoring", "API"]}),
+            analysis(company_overview={"products_services": ["api", "Not specified", "Data enrichment"]}),
+        ])
+        assert merged["company_overview"]["products_services"] == ["Lead scoring", "API", "Data enrichment"]
+
+    def test_tiers_with_same_name_are_merged(self):
+        """Test that a pricing tier split across chunks is merged into one"""
+        merged = merge_analyses([
+            analysis(pricing={"tiers": [{"name": "Pro", "price": "Not specified", "features": ["CRM sync"]}]}),
+            analysis(pricing={"tiers": [{"name": "pro", "price": "$99/month", "features": ["API"]}],
+                              "has_enterprise_pricing": True}),
+        ])
+        assert merged["pricing"]["tiers"] == [{"name": "Pro", "price": "$99/month", "features": ["CRM sync", "API"]}]
+        assert merged["pricing"]["has_enterprise_pricing"] is True
+
+    def test_unnamed_tiers_are_kept(self):
+        """Test that tiers without a name keep their price and features, and empty tiers are dropped"""
+        unnamed = {"name": "Not specified", "price": "$49/month", "features": ["Scoring"]}
+        merged = merge_analyses([
+            analysis(pricing={"tiers": [unnamed, {"name": "Not specified", "price": "Not specified", "features": []}]}),
+            analysis(pricing={"tiers": [{"name": "Not specified", "price": "$99/month", "features": []}, dict(unnamed)]}),
+        ])
+        assert merged["pricing"]["tiers"] == [unnamed, {"name": "Not specified", "price": "$99/month", "features": []}]
+
+    def test_merge_is_deterministic(self):
+        """Test that merging the same chunks gives the same result"""
+        chunks = [analysis(company_overview={"name": "A"}), analysis(company_overview={"name": "B"})]
+        assert merge_analyses(chunks) == merge_analyses(chunks)
+
+
+class TestBatchAnalysis:
+    def test_pack_batches(self, tmp_path):
+        """Test that short pages share batches and long pages get their own"""
+        analyzer = make_analyzer(tmp_path, [], max_batch_tokens=1000)
+        pages = {"/long": "x" * 2400, "/a": "a" * 1600, "/b": "b" * 1600, "/c": "c" * 1600}
+
+        assert [list(batch) for batch in analyzer.pack_batches(pages)] == [["/long"], ["/a", "/b"], ["/c"]]
+
+    def test_batch_results_keyed_by_url(self, tmp_path):
+        """Test that one call analyzes several pages and missing pages are analyzed separately"""
+        batch = {"pages": [{"url": "/", "analysis": full_analysis("Home")},
+                           {"url": "/pricing", "analysis": full_analysis("Pricing")}]}
+        analyzer = make_analyzer(tmp_path, [batch, full_analysis("About")])
+
+        results = analyzer.analyze_batch({"/": "Home page", "/pricing": "Pricing page", "/about": "About page"})
+
+        assert list(results) == ["/", "/pricing", "/about"]
+        assert [result["company_overview"]["name"] for result in results.values()] == ["Home", "Pricing", "About"]
+
+
+class TestSectionRouting:
+    def test_partial_analysis_is_completed(self, tmp_path):
+        """Test that a page routed to some sections still returns the full WebsiteAnalysis shape"""
+        analyzer = make_analyzer(tmp_path, [{"pricing": {"models": ["Per seat"], "tiers": []}}])
+
+        result = analyzer.analyze_text("Starter $99 per seat", sections=["pricing"])
+
+        assert list(result) == ["company_overview", "sales_intelligence", "pricing", "firmographic", "gtm_strategy"]
+        assert result["pricing"]["models"] == ["Per seat"]
+        assert result["company_overview"]["name"] == "Not specified"
+
+    def test_routed_prompt_is_smaller(self, tmp_path):
+        """Test that restricting the sections shrinks the estimated request"""
+        analyzer = make_analyzer(tmp_path, [])
+        assert analyzer.estimate_request_tokens("text", sections=["pricing"]) < analyzer.estimate_request_tokens("text")
+
+
+class TestAnalyzerVersion:
+    def test_version_depends_on_model_and_sections(self, tmp_path):
+        """Test that stored analyses of another model or of fewer sections are not reused as full ones"""
+        analyzer = make_analyzer(tmp_path, [])
+        other_llm = FakeLLM(responses=[], model="other-model")
+        other_model = WebsiteAnalyzer("test-key", runtime=LLMRuntime("test-key", models={DEFAULT_MODEL: other_llm}))
+
+        assert analyzer.version != other_model.version
+        assert analyzer.sections_version() == analyzer.sections_version(list(ALL_SECTIONS)) == analyzer.version
+        assert analyzer.sections_version(["pricing"]) != analyzer.version
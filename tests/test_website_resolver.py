@@ -0,0 +1,92 @@
+import json
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from get_websites_links import WebsiteFinder
+from llm_cache import LLMCache
+from llm_executor import LLMExecutor, RateLimiter
+from llm_runtime import DEFAULT_MODEL, LLMRuntime
+from website_resolver import get_resolver_stats, resolve_search
+
+
+class FakeLLM(FakeListChatModel):
+    model: str = "fake-model"
+
+
+def results(*links):
+    return [{'title': '', 'link': link, 'description': ''} for link in links]
+
+
+class TestResolveSearch:
+    def test_unambiguous_results(self):
+        """Test that a home page and a company page named after the company are confident picks"""
+        resolution = resolve_search("Alter Watt", results(
+            "https://www.crunchbase.com/organization/alter-watt",
+            "https://www.alter-watt.com/fr/",
+            "https://www.alter-watt.com/blog/solar",
+            "https://fr.linkedin.com/company/alter-watt/about",
+            "https://www.linkedin.com/in/john-doe",
+        ))
+
+        assert resolution.website == "https://www.alter-watt.com/"
+        assert resolution.linkedin == "https://www.linkedin.com/company/alter-watt"
+        assert resolution.confidence >= 0.75
+
+    def test_legal_form_and_country_domains(self):
+        """Test that legal forms are ignored and country second-level domains handled"""
+        resolution = resolve_search("MadKudu Inc.", results("https://madkudu.co.uk/", "https://linkedin.com/company/madkudu"))
+
+        assert resolution.website == "https://madkudu.co.uk/"
+        assert resolution.website_confidence == 1.0
+
+    def test_ambiguous_or_unmatched_results(self):
+        """Test that competing domains, directories and individual profiles are not trusted"""
+        competing = resolve_search("MadKudu", results("https://madkudu.com/", "https://madkudu.io/",
+                                                      "https://linkedin.com/company/madkudu"))
+        unmatched = resolve_search("International Business Machines",
+                                   results("https://www.ibm.com/", "https://www.linkedin.com/in/ibm-ceo"))
+
+        assert competing.website_confidence < 0.75
+        assert unmatched.website == unmatched.linkedin == "None"
+        assert unmatched.confidence == 0.0
+
+    def test_short_names_inside_other_names(self):
+        """Test that a name merely contained in another company's domain is not a confident pick"""
+        box = resolve_search("Box", results("https://www.dropbox.com/", "https://www.linkedin.com/company/dropbox"))
+        ring = resolve_search("Ring", results("https://www.ringcentral.com/"))
+        apple = resolve_search("Apple", results("https://www.pineapple.com/"))
+
+        assert box.confidence < 0.75
+        assert ring.website_confidence < 0.75
+        assert apple.website_confidence < 0.75
+
+    def test_known_affixes_and_hyphens(self):
+        """Test that names with a known affix or a hyphenated suffix stay confident"""
+        resolution = resolve_search("MadKudu", results("https://www.getmadkudu.com/",
+                                                       "https://www.linkedin.com/company/madkudu-analytics"))
+        hq = resolve_search("MadKudu", results("https://madkuduhq.com/"))
+
+        assert resolution.website == "https://www.getmadkudu.com/"
+        assert resolution.confidence >= 0.75
+        assert hq.website_confidence >= 0.75
+
+
+class TestWebsiteFinderResolution:
+    def test_llm_only_for_ambiguous_results(self, tmp_path):
+        """Test that the LLM is skipped when the resolver is confident"""
+        llm = FakeLLM(responses=[json.dumps({"company": "IBM", "website": "https://www.ibm.com/", "linkedin": "None"})])
+        executor = LLMExecutor(RateLimiter(6000, 10 ** 8))
+        finder = WebsiteFinder("test-key", llm_cache=LLMCache(str(tmp_path / "llm.sqlite")), executor=executor,
+                               runtime=LLMRuntime("test-key", models={DEFAULT_MODEL: llm}))
+        before = get_resolver_stats()
+
+        resolved = finder.analyze_search("MadKudu", results("https://www.madkudu.com/",
+                                                            "https://www.linkedin.com/company/madkudu/"))
+        assert resolved == {"company": "MadKudu", "website": "https://www.madkudu.com/",
+                            "linkedin": "https://www.linkedin.com/company/madkudu"}
+        assert executor.get_stats()['calls'] == 0
+
+        assert finder.analyze_search("IBM", results("https://www.ibm.com/"))["website"] == "https://www.ibm.com/"
+        assert executor.get_stats()['calls'] == 1
+
+        after = get_resolver_stats()
+        assert after['resolved'] - before['resolved'] == 1
+        assert after['llm_fallbacks'] - before['llm_fallbacks'] == 1
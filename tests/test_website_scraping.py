@@ -0,0 +1,306 @@
+import json
+import threading
+import time
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from analysis_store import AnalysisStore
+from html_document import parse_html
+from http_cache import HttpCache
+from http_client import HttpClient
+from llm_cache import LLMCache
+from llm_executor import LLMExecutor, RateLimiter
+from llm_runtime import DEFAULT_MODEL, LLMRuntime
+from pipeline import CRAWL_SETTINGS
+from website_analyzer import WebsiteAnalyzer
+from website_scraping import WebsiteScraper
+
+SECTIONS = ("company_overview", "sales_intelligence", "pricing", "firmographic", "gtm_strategy")
+
+
+class FakeLLM(FakeListChatModel):
+    model: str = "fake-model"
+
+
+def full_analysis(name="Acme"):
+    return {"company_overview": {"name": name}, "sales_intelligence": {}, "pricing": {},
+            "firmographic": {}, "gtm_strategy": {}}
+
+
+def page(name, *links, words=60):
+    """HTML page with distinct text (so pages are not near-duplicates) and links to other paths"""
+    text = " ".join(f"{name}{i}x{i * 7 % 13}" for i in range(words))
+    anchors = "".join(f'<a href="{link}">{link}</a>' for link in links)
+    return f"<html><head><title>{name}</title></head><body><h1>{name}</h1><p>{text}</p>{anchors}</body></html>"
+
+
+def make_scraper(tmp_path, responses=None, **kwargs):
+    llm = FakeLLM(responses=[json.dumps(response) for response in responses or [full_analysis()]])
+    analyzer = WebsiteAnalyzer("test-key", llm_cache=LLMCache(str(tmp_path / "llm.sqlite")),
+                               executor=LLMExecutor(RateLimiter(6000, 10 ** 8)),
+                               runtime=LLMRuntime("test-key", models={DEFAULT_MODEL: llm}))
+    kwargs.setdefault("analysis_store", AnalysisStore(str(tmp_path / "analyses.sqlite")))
+    kwargs.setdefault("batch_analysis", False)
+    kwargs.setdefault("section_routing", False)
+    kwargs.setdefault("http_client", HttpClient(cache=None))
+    return WebsiteScraper("test-key", analyzer=analyzer, **kwargs)
+
+
+def fetched_paths(site):
+    return [path for path, _ in site.requests if path not in ("/robots.txt", "/sitemap.xml", "/sitemap_index.xml")]
+
+
+class TestCrawl:
+    def test_breadth_first_with_visited_set(self, tmp_path, site):
+        """Test that each level is fetched before the next one and every page only once"""
+        site.pages.update({
+            "/": page("home", "/a", "/b", "/"),
+            "/a": page("a", "/", "/b", "/a/deep"),
+            "/b": page("b", "/a", "/b/deep"),
+            "/a/deep": page("adeep", "/b/deep", "/"),
+            "/b/deep": page("bdeep", "/a/deep"),
+        })
+        scraper = make_scraper(tmp_path)
+
+        budget = scraper.crawl_website(site.url, depth=3, max_links_per_depth=5, use_sitemap=False)
+
+        paths = fetched_paths(site)
+        assert sorted(paths) == ["/", "/a", "/a/deep", "/b", "/b/deep"]
+        assert paths[0] == "/"
+        assert set(paths[1:3]) == {"/a", "/b"}
+        assert set(paths[3:]) == {"/a/deep", "/b/deep"}
+        assert budget["exhausted"] is None
+
+    def test_results_shape(self, tmp_path, site):
+        """Test that get_results maps each crawled page URL to a complete analysis"""
+        site.pages.update({"/": page("home", "/pricing"), "/pricing": page("pricing")})
+        scraper = make_scraper(tmp_path)
+
+        scraper.crawl_website(site.url, depth=2, max_links_per_depth=5, use_sitemap=False)
+
+        results = scraper.get_results()
+        assert set(results) == {site.url, site.url + "/pricing"}
+        for analysis in results.values():
+            assert set(SECTIONS) <= set(analysis)
+            assert analysis["company_overview"]["name"] == "Acme"
+        assert sorted(scraper.get_stats()["incremental"]["recomputed"]) == sorted(results)
+
+    @pytest.mark.parametrize("max_concurrency, max_concurrency_per_host, expected", [(8, 2, 2), (3, 8, 3)])
+    def test_concurrency_is_bounded(self, tmp_path, site, max_concurrency, max_concurrency_per_host, expected):
+        """Test that fetches run concurrently within the global and per-host limits"""
+        lock = threading.Lock()
+        state = {"in_flight": 0, "max_in_flight": 0}
+
+        def slow(name):
+            def respond(handler):
+                with lock:
+                    state["in_flight"] += 1
+                    state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+                time.sleep(0.1)
+                with lock:
+                    state["in_flight"] -= 1
+                return page(name)
+            return respond
+
+        links = [f"/product-{i}" for i in range(6)]
+        site.pages["/"] = page("home", *links)
+        site.pages.update({link: slow(f"p{i}") for i, link in enumerate(links)})
+        scraper = make_scraper(tmp_path, max_concurrency=max_concurrency, max_concurrency_per_host=max_concurrency_per_host)
+
+        scraper.crawl_website(site.url, depth=2, max_links_per_depth=10, use_sitemap=False)
+
+        assert state["max_in_flight"] == expected
+        assert len(scraper.get_results()) == 7
+
+    def test_quick_crawl_reads_the_best_page(self, tmp_path, site):
+        """Test that the quick analysis follows the highest ranked link, including sitemap pages"""
+        site.pages.update({
+            "/": page("home", "/about-us/careers/senior-engineer", "/blog/2023/launch"),
+            "/sitemap.xml": (200, {"Content-Type": "application/xml"},
+                             '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                             f'<url><loc>{site.url}/pricing</loc></url></urlset>'),
+            "/pricing": page("pricing"),
+        })
+        scraper = make_scraper(tmp_path)
+
+        budget = scraper.crawl_website(site.url, **CRAWL_SETTINGS["quick"])
+
+        assert fetched_paths(site) == ["/", "/pricing"]
+        assert set(scraper.get_results()) == {site.url, site.url + "/pricing"}
+        assert budget["pages_used"] == 2
+
+    @pytest.mark.parametrize("ttl_seconds, outcome", [(3600, "hits"), (0, "revalidated")])
+    def test_http_cache_stats(self, tmp_path, site, ttl_seconds, outcome):
+        """Test that a re-crawl is served by the HTTP cache and get_stats reports it"""
+        def versioned(name):
+            def respond(handler):
+                if handler.headers.get("If-None-Match") == f'"{name}"':
+                    return 304, {"ETag": f'"{name}"'}, ""
+                return 200, {"Content-Type": "text/html; charset=utf-8", "ETag": f'"{name}"'}, page(name, "/a")
+            return respond
+
+        site.pages.update({"/": versioned("home"), "/a": versioned("a")})
+        cache = HttpCache(str(tmp_path / "http.sqlite"), ttl_seconds=ttl_seconds)
+
+        first = make_scraper(tmp_path, http_client=HttpClient(cache=cache))
+        first.crawl_website(site.url, depth=2, max_links_per_depth=5, use_sitemap=False)
+        assert first.get_stats()["http_cache"]["misses"] == 2
+
+        second = make_scraper(tmp_path, http_client=HttpClient(cache=cache))
+        second.crawl_website(site.url, depth=2, max_links_per_depth=5, use_sitemap=False)
+
+        stats = second.get_stats()["http_cache"]
+        assert (stats[outcome], stats["misses"]) == (2, 0)
+        assert len(fetched_paths(site)) == (2 if outcome == "hits" else 4)
+        assert set(second.get_results()) == {site.url, site.url + "/a"}
+
+    def test_concurrent_crawls_count_their_own_stats(self, tmp_path, site):
+        """Test that crawls sharing an HTTP cache each report only their own fetches and parsed outputs"""
+        def slow(name, *links):
+            def respond(handler):
+                time.sleep(0.2)
+                return page(name, *links)
+            return respond
+
+        site.pages.update({"/": slow("home", "/a"), "/a": slow("a"), "/b": slow("b")})
+        cache = HttpCache(str(tmp_path / "http.sqlite"))
+        home = make_scraper(tmp_path / "home", http_client=HttpClient(cache=cache))
+        other = make_scraper(tmp_path / "other", http_client=HttpClient(cache=cache))
+        threads = [threading.Thread(target=home.crawl_website, args=(site.url,),
+                                    kwargs={"depth": 2, "max_links_per_depth": 5, "use_sitemap": False}),
+                   threading.Thread(target=other.crawl_website, args=(site.url + "/b",),
+                                    kwargs={"depth": 1, "use_sitemap": False})]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert home.get_stats()["http_cache"] == {"hits": 0, "revalidated": 0, "misses": 2}
+        assert other.get_stats()["http_cache"] == {"hits": 0, "revalidated": 0, "misses": 1}
+        assert (home.get_stats()["output_parsing"]["parsed"], other.get_stats()["output_parsing"]["parsed"]) == (2, 1)
+
+
+class SlowLLM(FakeLLM):
+    """Fake model taking a long time to analyze pages containing 'slowanalysis'"""
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        if "slowanalysis" in str(messages):
+            time.sleep(2)
+        return super()._call(messages, stop, run_manager, **kwargs)
+
+
+class TestCrawlBudget:
+    def test_page_budget_truncates_levels(self, tmp_path, site):
+        """Test that no more than max_pages pages are fetched and the crawl reports the page budget"""
+        site.pages.update({"/": page("home", "/a", "/b", "/c"), "/a": page("a"), "/b": page("b"), "/c": page("c")})
+        scraper = make_scraper(tmp_path)
+
+        budget = scraper.crawl_website(site.url, depth=2, max_links_per_depth=5, use_sitemap=False, max_pages=2)
+
+        assert len(fetched_paths(site)) == 2
+        assert len(scraper.get_results()) == 2
+        assert (budget["exhausted"], budget["pages_used"]) == ("pages", 2)
+
+    def test_token_budget_refuses_analyses(self, tmp_path, site):
+        """Test that pages whose analysis does not fit in the token budget are fetched but not analyzed"""
+        site.pages.update({"/": page("home", "/a"), "/a": page("a")})
+        scraper = make_scraper(tmp_path)
+        # Room for the analysis of the homepage only
+        home_tokens = scraper.analyzer.estimate_request_tokens(parse_html(site.pages["/"], site.url).text)
+
+        budget = scraper.crawl_website(site.url, depth=2, max_links_per_depth=5, use_sitemap=False,
+                                       max_tokens=home_tokens)
+
+        assert sorted(fetched_paths(site)) == ["/", "/a"]
+        assert list(scraper.get_results()) == [site.url]
+        assert scraper.analyzer.executor.get_stats()["calls"] == 1
+        assert (budget["exhausted"], budget["tokens_used"]) == ("tokens", home_tokens)
+
+    def test_deadline_cancels_pending_work(self, tmp_path, site):
+        """Test that past the deadline, slow fetches and analyses are abandoned and finished pages kept"""
+        def slow_fetch(handler):
+            time.sleep(2)
+            return page("slowfetch")
+
+        site.pages.update({"/": page("home", "/slow-fetch", "/slow-analysis"), "/slow-fetch": slow_fetch,
+                           "/slow-analysis": page("slowanalysis")})
+        scraper = make_scraper(tmp_path)
+        scraper.analyzer.runtime = LLMRuntime("test-key", models={DEFAULT_MODEL: SlowLLM(
+            responses=[json.dumps(full_analysis())])})
+
+        start = time.perf_counter()
+        budget = scraper.crawl_website(site.url, depth=2, max_links_per_depth=5, use_sitemap=False,
+                                       deadline_seconds=0.5)
+
+        assert time.perf_counter() - start < 1.5
+        assert budget["exhausted"] == "deadline"
+        assert list(scraper.get_results()) == [site.url]
+
+
+class TestIncrementalCrawl:
+    def test_recrawl_analyzes_only_changed_pages(self, tmp_path, site):
+        """Test that a second crawl reuses the stored analyses of unchanged pages"""
+        site.pages.update({"/": page("home", "/a", "/b"), "/a": page("a"), "/b": page("b")})
+        store = AnalysisStore(str(tmp_path / "analyses.sqlite"))
+        first = make_scraper(tmp_path / "first", analysis_store=store)
+        first.crawl_website(site.url, depth=2, max_links_per_depth=5, use_sitemap=False)
+        assert first.analyzer.executor.get_stats()["calls"] == 3
+
+        site.pages["/b"] = page("bchanged")
+        # A separate LLM cache: only the analysis store can avoid the calls
+        second = make_scraper(tmp_path / "second", analysis_store=store)
+        second.crawl_website(site.url, depth=2, max_links_per_depth=5, use_sitemap=False)
+
+        incremental = second.get_stats()["incremental"]
+        assert sorted(incremental["reused"]) == [site.url, site.url + "/a"]
+        assert incremental["recomputed"] == [site.url + "/b"]
+        assert second.analyzer.executor.get_stats()["calls"] == 1
+        assert set(second.get_results()) == {site.url, site.url + "/a", site.url + "/b"}
+
+    def test_routed_analysis_not_reused_as_full(self, tmp_path, site):
+        """Test that an analysis restricted to the sections of its page type is redone without routing"""
+        site.pages.update({"/": page("home", "/pricing"), "/pricing": page("pricing")})
+        store = AnalysisStore(str(tmp_path / "analyses.sqlite"))
+        routed = make_scraper(tmp_path / "routed", analysis_store=store, section_routing=True)
+        routed.crawl_website(site.url, depth=2, max_links_per_depth=5, use_sitemap=False)
+
+        full = make_scraper(tmp_path / "full", analysis_store=store, section_routing=False)
+        full.crawl_website(site.url, depth=2, max_links_per_depth=5, use_sitemap=False)
+
+        assert site.url + "/pricing" in full.get_stats()["incremental"]["recomputed"]
+
+
+class FailingOnceLLM(FakeLLM):
+    """Fake model failing its first call"""
+    failed: bool = False
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        if not self.failed:
+            self.failed = True
+            raise ValueError("model unavailable")
+        return super()._call(messages, stop, run_manager, **kwargs)
+
+
+class TestDuplicatePages:
+    @pytest.mark.parametrize("duplicate, calls", [("/pricing-plans", 2), ("/careers", 3)])
+    def test_duplicates_reuse_analyses_of_the_same_sections(self, tmp_path, site, duplicate, calls):
+        """Test that a duplicate page only reuses an analysis restricted to its own sections"""
+        site.pages.update({"/": page("home", "/pricing", duplicate), "/pricing": page("dup"), duplicate: page("dup")})
+        scraper = make_scraper(tmp_path, section_routing=True)
+
+        scraper.crawl_website(site.url, depth=2, max_links_per_depth=5, use_sitemap=False)
+
+        assert set(scraper.get_results()) == {site.url, site.url + "/pricing", site.url + duplicate}
+        assert scraper.analyzer.executor.get_stats()["calls"] == calls
+        assert scraper.get_stats()["dedup"]["llm_calls_saved"] == 3 - calls
+
+    def test_duplicate_analyzed_when_the_original_fails(self, tmp_path, site):
+        """Test that a duplicate of a page whose analysis failed is analyzed itself"""
+        site.pages.update({"/": page("dup", "/copy"), "/copy": page("dup", "/copy")})
+        scraper = make_scraper(tmp_path)
+        scraper.analyzer.runtime = LLMRuntime("test-key", models={DEFAULT_MODEL: FailingOnceLLM(
+            responses=[json.dumps(full_analysis())])})
+
+        scraper.crawl_website(site.url, depth=2, max_links_per_depth=5, use_sitemap=False)
+
+        assert list(scraper.get_results()) == [site.url + "/copy"]
+        assert scraper.get_stats()["dedup"]["llm_calls_saved"] == 0
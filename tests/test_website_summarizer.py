@@ -0,0 +1,57 @@
+import json
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from llm_cache import LLMCache
+from llm_executor import LLMExecutor, RateLimiter
+from llm_runtime import DEFAULT_MODEL, LLMRuntime
+from website_summarizer import WebsiteSummarizer, WebsiteSummary
+
+SUMMARY = {field: f"{field} text" for field in WebsiteSummary.model_fields}
+
+
+class FakeLLM(FakeListChatModel):
+    model: str = "fake-model"
+
+
+def make_summarizer(tmp_path, website_analysis, **kwargs):
+    llm = FakeLLM(responses=[json.dumps(SUMMARY)])
+    return WebsiteSummarizer(website_analysis, {"name": "MadKudu"}, "test-key",
+                             llm_cache=LLMCache(str(tmp_path / "llm.sqlite")),
+                             executor=LLMExecutor(RateLimiter(6000, 10 ** 8)),
+                             runtime=LLMRuntime("test-key", models={DEFAULT_MODEL: llm}), **kwargs)
+
+
+def pages(count):
+    return {
+        f"https://a.com/page-{i}": {"company_overview": {"products_services": [f"{i}-{j} " + str(i * j * 7919) * 3 for j in range(10)]}}
+        for i in range(count)
+    }
+
+
+class TestWebsiteSummarizer:
+    def test_small_analysis_single_call(self, tmp_path):
+        """Test that analyses under the threshold are summarized in one call"""
+        summarizer = make_summarizer(tmp_path, pages(3))
+
+        assert summarizer.summarize_analysis() == SUMMARY
+        assert summarizer.executor.get_stats()['calls'] == 1
+        assert [level['calls'] for level in summarizer.get_stats()['levels']] == [1]
+
+    def test_large_analysis_tree_reduce(self, tmp_path):
+        """Test that large analyses are summarized by groups, then the summaries reduced"""
+        summarizer = make_summarizer(tmp_path, pages(40), max_prompt_tokens=400)
+
+        assert summarizer.summarize_analysis() == SUMMARY
+
+        levels = summarizer.get_stats()['levels']
+        assert len(levels) >= 2
+        assert levels[0]['calls'] > 1
+        assert levels[-1]['calls'] == 1
+        assert all('seconds' in level for level in levels)
+        assert summarizer.executor.get_stats()['calls'] == sum(level['calls'] for level in levels)
+
+    def test_streaming_uses_reduced_inputs(self, tmp_path):
+        """Test that the streamed summary goes through the same tree reduce"""
+        summarizer = make_summarizer(tmp_path, pages(40), max_prompt_tokens=400)
+
+        assert dict(summarizer.stream_summary()) == SUMMARY
+        assert len(summarizer.get_stats()['levels']) >= 2
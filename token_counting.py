@@ -0,0 +1,70 @@
+import math
+import re
+from typing import List
+
+# Mistral tokenizers average a little under 4 characters per token on English web text
+CHARS_PER_TOKEN = 4.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of LLM tokens of a text without calling the API.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        int: Approximate token count
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _split_oversized(block: str, max_chars: int) -> List[str]:
+    """Split a block longer than max_chars on sentence, then word boundaries"""
+    pieces = re.split(r'(?<=[.!?])\s+', block)
+    if any(len(piece) > max_chars for piece in pieces):
+        pieces = block.split(' ')
+    parts, current = [], ''
+    for piece in pieces:
+        while len(piece) > max_chars:
+            parts.append(piece[:max_chars])
+            piece = piece[max_chars:]
+        if current and len(current) + 1 + len(piece) > max_chars:
+            parts.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        parts.append(current)
+    return parts
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """Split a text into chunks of at most max_tokens estimated tokens.
+
+    Chunks are cut on line boundaries (one block of the page per line), falling
+    back to sentence and word boundaries for blocks that do not fit on their own.
+
+    Args:
+        text: Clean page text, one block per line
+        max_tokens: Maximum estimated tokens per chunk
+
+    Returns:
+        list: Chunks in document order; a single chunk when the text fits
+    """
+    max_chars = int(max_tokens * CHARS_PER_TOKEN)
+    if len(text) <= max_chars:
+        return [text] if text else []
+
+    chunks, current = [], ''
+    for line in text.splitlines():
+        for block in _split_oversized(line, max_chars) if len(line) > max_chars else [line]:
+            if current and len(current) + 1 + len(block) > max_chars:
+                chunks.append(current)
+                current = block
+            else:
+                current = f"{current}\n{block}" if current else block
+    if current:
+        chunks.append(current)
+    return chunks
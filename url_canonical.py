@@ -0,0 +1,135 @@
+import posixpath
+import re
+from typing import Dict, Iterator, Optional
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlparse
+
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+INDEX_PAGES = {'index.html', 'index.htm', 'index.php', 'index.asp', 'index.aspx', 'default.asp', 'default.aspx',
+               'home.html'}
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|gclid|fbclid|msclkid|mc_cid|mc_eid|_hsenc|_hsmi|ref)$', re.IGNORECASE)
+
+
+def site_key(url: str) -> str:
+    """Return the host of a URL without port, trailing dot and www. prefix.
+
+    Args:
+        url: Absolute URL
+
+    Returns:
+        str: Lowercase host used to decide whether two URLs belong to the same site
+    """
+    host = (urlparse(url.strip()).hostname or '').rstrip('.')
+    return host[4:] if host.startswith('www.') else host
+
+
+def same_site(url: str, base_url: str) -> bool:
+    """Whether two URLs belong to the same website, ignoring scheme and www."""
+    return site_key(url) == site_key(base_url)
+
+
+def _normalize_path(path: str) -> str:
+    """Decode safe escapes, resolve dot segments and drop index pages"""
+    path = quote(unquote(path), safe="/:@!$&'()*+,;=-._~")
+    path = re.sub(r'/{2,}', '/', path)
+    if path:
+        trailing = path.endswith('/')
+        path = posixpath.normpath(path)
+        if path == '.':
+            path = ''
+        elif trailing and not path.endswith('/'):
+            path += '/'
+    segments = path.split('/')
+    if segments[-1].lower() in INDEX_PAGES:
+        segments[-1] = ''
+    return '/'.join(segments).rstrip('/')
+
+
+def canonicalize_url(url: str, keep_query: bool = False) -> str:
+    """Reduce a URL to a canonical form identifying the page it points to.
+
+    http/https, www./apex, letter case, default ports, index pages, duplicate
+    slashes, dot segments, trailing slashes and fragments are all normalized
+    away. The result is a deduplication key: its path is lowercased, so it is
+    not meant to be fetched.
+
+    Args:
+        url: Absolute URL
+        keep_query: Keep the query string (sorted, without tracking parameters)
+            instead of dropping it
+
+    Returns:
+        str: The canonical form of the URL
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    if scheme == 'http':
+        scheme = 'https'
+
+    host = site_key(url)
+    port = parsed.port
+    netloc = host
+    if port and str(port) not in DEFAULT_PORTS.values():
+        netloc = f"{host}:{port}"
+
+    canonical = f"{scheme}://{netloc}{_normalize_path(parsed.path).lower()}"
+    if keep_query and parsed.query:
+        params = sorted((key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+                        if not TRACKING_PARAMS.match(key))
+        if params:
+            canonical += f"?{urlencode(params)}"
+    return canonical
+
+
+class VisitedIndex:
+    """Set of visited pages keyed on their canonical URL."""
+
+    def __init__(self):
+        self._seen: Dict[str, str] = {}
+
+    def add(self, url: str) -> bool:
+        """Mark a URL as visited.
+
+        Args:
+            url: URL of the page
+
+        Returns:
+            bool: True if no equivalent URL was visited before
+        """
+        key = canonicalize_url(url)
+        if key in self._seen:
+            return False
+        self._seen[key] = url
+        return True
+
+    def add_alias(self, alias: str, url: str) -> Optional[str]:
+        """Record that a page declares another URL (e.g. its rel=canonical) for itself.
+
+        Args:
+            alias: URL the page declares as its canonical address
+            url: URL the page was fetched from
+
+        Returns:
+            str: The previously visited URL the alias points to when it belongs to a
+                different page, None otherwise
+        """
+        key = canonicalize_url(alias)
+        original = self._seen.get(key)
+        if original is None:
+            self._seen[key] = url
+            return None
+        if canonicalize_url(original) == canonicalize_url(url):
+            return None
+        return original
+
+    def original(self, url: str) -> Optional[str]:
+        """Return the URL under which an equivalent page was first visited"""
+        return self._seen.get(canonicalize_url(url))
+
+    def __contains__(self, url: str) -> bool:
+        return canonicalize_url(url) in self._seen
+
+    def __len__(self) -> int:
+        return len(set(self._seen.values()))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(dict.fromkeys(self._seen.values()))
@@ -1,11 +1,21 @@
-from typing import Dict, List
-from langchain_mistralai import ChatMistralAI
+import asyncio
+import functools
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser,OutputFixingParser
-from bs4 import BeautifulSoup
-from pydantic import BaseModel, Field
+from structured_output import RepairingOutputParser
+from html_document import parse_html
+from token_counting import estimate_tokens, split_into_chunks
+from llm_cache import LLMCache, get_llm_cache
+from llm_executor import LLMExecutor, get_llm_executor, run_sync
+from llm_runtime import LLMRuntime, get_llm_runtime
+from page_classifier import ALL_SECTIONS
+from pydantic import BaseModel, Field, create_model
 from typing import List
 
+NOT_SPECIFIED = "Not specified"
+
 class CompanyOverview(BaseModel):
     name: str = Field(description="Company name",default="Not specified")
     description: str = Field(description="Company description",default="Not specified")
@@ -58,18 +68,125 @@ class WebsiteAnalysis(BaseModel):
     firmographic: Firmographic
     gtm_strategy: GTMStrategy
 
-class WebsiteAnalyzer:
-    def __init__(self, api_key: str):
-        """Initialize the LangChain analyzer with Mistral API key"""
-        self.llm = ChatMistralAI(mistral_api_key=api_key)
-        base_parser = PydanticOutputParser(pydantic_object=WebsiteAnalysis)
-        self.parser = OutputFixingParser.from_llm(parser=base_parser, llm=self.llm)
-        
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert at analyzing B2B company websites and extracting comprehensive business intelligence. 
+class PageAnalysis(BaseModel):
+    url: str = Field(description="URL of the page, exactly as given")
+    analysis: WebsiteAnalysis
+
+class BatchAnalysis(BaseModel):
+    pages: List[PageAnalysis] = Field(description="One analysis per page, in the order of the pages",default_factory=list)
+
+def _section_key(sections: Optional[Sequence[str]]) -> Tuple[str, ...]:
+    """Normalize a selection of sections to a tuple in WebsiteAnalysis order, all of them by default"""
+    return tuple(name for name in ALL_SECTIONS if name in sections) if sections else ALL_SECTIONS
+
+@functools.lru_cache(maxsize=None)
+def section_schemas(sections: Tuple[str, ...]) -> Tuple[type, type]:
+    """
+    Build the page and batch schemas restricted to some WebsiteAnalysis sections
+    
+    Args:
+        sections: Names of the WebsiteAnalysis fields to extract, in WebsiteAnalysis order
+        
+    Returns:
+        Tuple[type, type]: The WebsiteAnalysis and BatchAnalysis equivalents, built once per selection
+    """
+    if sections == ALL_SECTIONS:
+        return WebsiteAnalysis, BatchAnalysis
+    page_model = create_model('WebsiteAnalysis', **{
+        name: (WebsiteAnalysis.model_fields[name].annotation, ...) for name in sections
+    })
+    page_analysis = create_model('PageAnalysis', url=(str, Field(description="URL of the page, exactly as given")),
+                                 analysis=(page_model, ...))
+    batch_model = create_model('BatchAnalysis', pages=(List[page_analysis], Field(
+        description="One analysis per page, in the order of the pages", default_factory=list)))
+    return page_model, batch_model
+
+def complete_analysis(analysis: Dict) -> Dict:
+    """
+    Fill the sections missing from a partial analysis with their empty defaults
+    
+    Args:
+        analysis: WebsiteAnalysis dict restricted to some sections
+        
+    Returns:
+        Dict: A full WebsiteAnalysis dict
+    """
+    return {
+        name: analysis.get(name) or WebsiteAnalysis.model_fields[name].annotation().model_dump()
+        for name in ALL_SECTIONS
+    }
+
+def _merge_values(values: List[Any]) -> Any:
+    """Merge the values of one field across partial analyses, in document order"""
+    present = [value for value in values if value is not None]
+    if not present:
+        return None
+    first = present[0]
+    if isinstance(first, bool):
+        return any(present)
+    if isinstance(first, dict):
+        keys = list(dict.fromkeys(key for value in present for key in value))
+        return {key: _merge_values([value.get(key) for value in present]) for key in keys}
+    if isinstance(first, list):
+        return _merge_lists(present)
+    for value in present:
+        if isinstance(value, str) and value.strip() and value.strip() != NOT_SPECIFIED:
+            return value
+    return first
+
+
+def _is_placeholder(value: Any) -> bool:
+    """Whether a value carries no information: empty, 'Not specified' or made of such values only"""
+    if isinstance(value, dict):
+        return all(_is_placeholder(item) for item in value.values())
+    if isinstance(value, list):
+        return all(_is_placeholder(item) for item in value)
+    if isinstance(value, bool):
+        return False
+    return value is None or str(value).strip().lower() in ('', NOT_SPECIFIED.lower())
+
+
+def _merge_lists(lists: List[List[Any]]) -> List[Any]:
+    """Concatenate lists, dropping duplicates; dict items with the same name are merged"""
+    merged: Dict[str, List[Any]] = {}
+    for items in lists:
+        for item in items:
+            if _is_placeholder(item):
+                continue
+            if isinstance(item, dict):
+                # Unnamed items (e.g. a tier with a price but no name) are only merged with identical ones
+                name = item.get('name')
+                key = str(name) if not _is_placeholder(name) else json.dumps(item, sort_keys=True)
+            else:
+                key = str(item)
+            merged.setdefault(key.strip().lower(), []).append(item)
+    return [group[0] if not isinstance(group[0], dict) else _merge_values(group) for group in merged.values()]
+
+
+def merge_analyses(analyses: List[Dict]) -> Dict:
+    """
+    Merge the partial analyses of the chunks of one page into a single analysis
+    
+    The merge is deterministic: for text fields the first specified value in
+    document order wins, lists are unioned without duplicates (case-insensitive),
+    pricing tiers with the same name are merged and flags are OR-ed.
+    
+    Args:
+        analyses: WebsiteAnalysis dicts, in the order of the chunks they come from
+        
+    Returns:
+        Dict: The merged WebsiteAnalysis dict
+    """
+    if len(analyses) == 1:
+        return analyses[0]
+    return _merge_values(analyses) or {}
+
+
+ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert at analyzing B2B company websites and extracting comprehensive business intelligence. 
 Always return valid JSON data with all specified fields.
 IMPORTANT: Do not escape underscores in the JSON keys. For example, use "company_overview" not "company\_overview"."""),
-            ("user", """Analyze this website content and extract comprehensive business information focusing on B2B sales intelligence.
+    ("user", """Analyze this website content and extract comprehensive business information focusing on B2B sales intelligence.
 
 Extract ALL relevant information that matches these categories, following the exact JSON structure below. Do not escape underscores in field names:
 
@@ -79,23 +196,92 @@ Content to analyze:
 {text}
 
 Extract as much information as possible from the content. If a piece of information is not found, use 'Not specified' for strings and empty lists for lists. Focus on factual information present in the content.""")
-        ])
+])
 
-    def _clean_html(self, html_content: str) -> str:
-        """Clean HTML and return text content"""
-        soup = BeautifulSoup(html_content, 'html.parser')
+BATCH_ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert at analyzing B2B company websites and extracting comprehensive business intelligence. 
+Always return valid JSON data with all specified fields.
+IMPORTANT: Do not escape underscores in the JSON keys. For example, use "company_overview" not "company\_overview"."""),
+    ("user", """Analyze each of the following pages of the same website separately and extract comprehensive business information focusing on B2B sales intelligence.
+
+Return one entry per page with the page URL exactly as given, following the exact JSON structure below. Do not escape underscores in field names:
+
+{format_instructions}
+
+Pages to analyze:
+{pages}
+
+Only use the content of a page for its own analysis. If a piece of information is not found in a page, use 'Not specified' for strings and empty lists for lists. Focus on factual information present in the content.""")
+])
+
+
+class WebsiteAnalyzer:
+    def __init__(self, api_key: str, llm_cache: LLMCache = None, executor: LLMExecutor = None,
+                 max_input_tokens: int = 6000, max_batch_tokens: int = 6000, runtime: LLMRuntime = None):
+        """Initialize the LangChain analyzer with Mistral API key
         
-        # Remove script and style elements
-        for element in soup(["script", "style", "meta", "link"]):
-            element.decompose()
-            
-        # Get clean text
-        text = soup.get_text(separator='\n', strip=True)
+        Args:
+            api_key: Mistral API key for LLM access
+            llm_cache: Cache of LLM responses, defaults to the shared on-disk cache
+            executor: Rate-limited LLM executor, defaults to the shared one
+            max_input_tokens: Pages with more text tokens are split into chunks analyzed separately
+            max_batch_tokens: Maximum text tokens of the pages packed into one batched call
+            runtime: Shared models, parsers and chains, defaults to the runtime of the API key
+        """
+        self.max_input_tokens = max_input_tokens
+        self.max_batch_tokens = max_batch_tokens
+        self.runtime = runtime or get_llm_runtime(api_key)
+        self.llm = self.runtime.chat_model()
+        self.llm_cache = llm_cache or get_llm_cache()
+        self.executor = executor or get_llm_executor()
+        self.prompt = ANALYSIS_PROMPT
+        self.batch_prompt = BATCH_ANALYSIS_PROMPT
+        self._prompt_tokens: Dict[Tuple[str, ...], int] = {}
+
+    @property
+    def version(self) -> str:
+        """Short hash of the model, prompt, output schema and chunk size, changing whenever analyses would differ"""
+        if not hasattr(self, '_version'):
+            prompt = self.prompt.format(text="", format_instructions=self.runtime.format_instructions(WebsiteAnalysis))
+            prompt += f"\0{self.max_input_tokens}\0{getattr(self.llm, 'model', '')}"
+            self._version = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+        return self._version
+
+    def sections_version(self, sections: Optional[Sequence[str]] = None) -> str:
+        """Version of the analyses extracting only some sections: a pricing-only analysis is not a full one"""
+        key = _section_key(sections)
+        return self.version if key == ALL_SECTIONS else f"{self.version}:{'+'.join(key)}"
+
+    @property
+    def parser(self) -> RepairingOutputParser:
+        """Output parser of the full WebsiteAnalysis schema"""
+        return self.runtime.parser(WebsiteAnalysis)
+
+    def estimate_request_tokens(self, clean_content: str, expected_output_tokens: int = 1000,
+                                sections: Optional[Sequence[str]] = None) -> int:
+        """
+        Estimate the total tokens (prompts, page text and answers) of the analysis of a page
         
-        # Clean up text
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        return '\n'.join(chunk for chunk in chunks if chunk)
+        Args:
+            clean_content: Text content extracted from the page
+            expected_output_tokens: Allowance for the generated JSON of each call with the full schema
+            sections: WebsiteAnalysis sections to extract, all of them by default
+            
+        Returns:
+            int: Estimated token count
+        """
+        key = _section_key(sections)
+        if key not in self._prompt_tokens:
+            prompt = self.prompt.format(text="", format_instructions=self.runtime.format_instructions(section_schemas(key)[0]))
+            self._prompt_tokens[key] = estimate_tokens(prompt)
+        output_tokens = expected_output_tokens * len(key) // len(ALL_SECTIONS)
+        text_tokens = estimate_tokens(clean_content)
+        calls = max(1, -(-text_tokens // self.max_input_tokens))
+        return calls * (self._prompt_tokens[key] + output_tokens) + text_tokens
+
+    def _clean_html(self, html_content: str) -> str:
+        """Clean HTML and return text content"""
+        return parse_html(html_content).text
 
     def analyze_content(self, html_content: str) -> Dict:
         """
@@ -107,21 +293,176 @@ Extract as much information as possible from the content. If a piece of informat
         Returns:
             Dict: Dictionary containing the analyzed information
         """
+        return self.analyze_text(self._clean_html(html_content))
+
+    def pack_batches(self, pages: Dict[str, str]) -> List[Dict[str, str]]:
+        """
+        Group pages into batches of at most max_batch_tokens text tokens
+        
+        Pages larger than half the batch limit get a batch of their own.
+        
+        Args:
+            pages: Clean page text by URL
+            
+        Returns:
+            List[Dict[str, str]]: Batches of pages, in the order of the pages
+        """
+        batches, current, current_tokens = [], {}, 0
+        for url, text in pages.items():
+            tokens = estimate_tokens(text)
+            if tokens > self.max_batch_tokens // 2:
+                batches.append({url: text})
+                continue
+            if current and current_tokens + tokens > self.max_batch_tokens:
+                batches.append(current)
+                current, current_tokens = {}, 0
+            current[url] = text
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def analyze_batch(self, pages: Dict[str, str], sections: Optional[Dict[str, Sequence[str]]] = None) -> Dict[str, Dict]:
+        """
+        Analyze several pages with as few LLM calls as possible
+        
+        Args:
+            pages: Clean page text by URL
+            sections: WebsiteAnalysis sections to extract by URL, all of them for missing URLs
+            
+        Returns:
+            Dict[str, Dict]: Analysis of each page by URL
+        """
+        return run_sync(self.aanalyze_batch(pages, sections))
+
+    async def aanalyze_batch(self, pages: Dict[str, str],
+                             sections: Optional[Dict[str, Sequence[str]]] = None) -> Dict[str, Dict]:
+        """
+        Async version of analyze_batch
+        
+        Short pages extracting the same sections are packed into shared calls so
+        the prompt and format instructions are paid once per batch; pages missing
+        from a batched answer, or whose batch failed, are analyzed on their own.
+        
+        Args:
+            pages: Clean page text by URL
+            sections: WebsiteAnalysis sections to extract by URL, all of them for missing URLs
+            
+        Returns:
+            Dict[str, Dict]: Analysis of each page by URL
+        """
+        sections = sections or {}
+        
+        async def analyze(batch: Dict[str, str], batch_sections: Tuple[str, ...]) -> Dict[str, Dict]:
+            if len(batch) == 1:
+                url, text = next(iter(batch.items()))
+                return {url: await self.aanalyze_text(text, batch_sections)}
+            try:
+                results = await self._aanalyze_pages(batch, batch_sections)
+            except Exception:
+                results = {}
+            missing = [url for url in batch if url not in results]
+            if missing:
+                print(f"Batched analysis missed {len(missing)} of {len(batch)} pages, analyzing them separately")
+                analyses = await asyncio.gather(*(self.aanalyze_text(batch[url], batch_sections) for url in missing))
+                results.update(zip(missing, analyses))
+            return results
+        
+        groups: Dict[Tuple[str, ...], Dict[str, str]] = {}
+        for url, text in pages.items():
+            groups.setdefault(_section_key(sections.get(url)), {})[url] = text
+        tasks = [analyze(batch, group_sections)
+                 for group_sections, group in groups.items() for batch in self.pack_batches(group)]
+        
+        results = {}
+        for batch_results in await asyncio.gather(*tasks):
+            results.update(batch_results)
+        return {url: results[url] for url in pages}
+
+    async def _aanalyze_pages(self, pages: Dict[str, str], sections: Sequence[str] = ALL_SECTIONS) -> Dict[str, Dict]:
+        """Analyze several short pages in a single LLM call"""
+        batch_model = section_schemas(_section_key(sections))[1]
         try:
-            # Clean content
-            clean_content = self._clean_html(html_content)
+            # Shared chain of the batch prompt and schema
+            chain = self.runtime.chain(self.batch_prompt, batch_model)
+            
+            inputs = {
+                "pages": "\n\n".join(f"=== Page URL: {url} ===\n{text}" for url, text in pages.items()),
+                "format_instructions": self.runtime.format_instructions(batch_model)
+            }
+            
+            async def invoke_chain():
+                estimated_tokens = self.estimate_request_tokens(inputs["pages"], 1000 * len(pages), sections)
+                response = await self.executor.ainvoke(chain, inputs, estimated_tokens)
+                return response.model_dump()
+            
+            # Invoke chain, unless the same pages were already analyzed together
+            batch = await self.llm_cache.acached(self.llm.model, self.batch_prompt, inputs, invoke_chain)
             
-            # Create chain
-            chain = self.prompt | self.llm | self.parser
+        except Exception as e:
+            print(f"Error analyzing batch of {len(pages)} pages: {e}")
+            raise e
+        
+        return {page["url"]: complete_analysis(page["analysis"]) for page in batch["pages"] if page["url"] in pages}
+
+    def analyze_text(self, clean_content: str, sections: Optional[Sequence[str]] = None) -> Dict:
+        """
+        Analyze already cleaned page text using LangChain and Mistral
+        
+        Args:
+            clean_content: Text content extracted from the page
+            sections: WebsiteAnalysis sections to extract, all of them by default
             
-            # Invoke chain
-            response = chain.invoke({
+        Returns:
+            Dict: Dictionary containing the analyzed information
+        """
+        return run_sync(self.aanalyze_text(clean_content, sections))
+
+    async def aanalyze_text(self, clean_content: str, sections: Optional[Sequence[str]] = None) -> Dict:
+        """
+        Async version of analyze_text, rate limited by the shared LLM executor
+        
+        Pages longer than max_input_tokens are split into chunks that are analyzed
+        concurrently, then merged with merge_analyses. When only some sections
+        are requested, the others are returned empty.
+        
+        Args:
+            clean_content: Text content extracted from the page
+            sections: WebsiteAnalysis sections to extract, all of them by default
+            
+        Returns:
+            Dict: Dictionary containing the analyzed information
+        """
+        chunks = split_into_chunks(clean_content, self.max_input_tokens)
+        if len(chunks) <= 1:
+            return await self._aanalyze_chunk(clean_content, sections)
+        
+        print(f"Splitting {estimate_tokens(clean_content)} tokens of content into {len(chunks)} chunks")
+        analyses = await asyncio.gather(*(self._aanalyze_chunk(chunk, sections) for chunk in chunks))
+        return merge_analyses(list(analyses))
+
+    async def _aanalyze_chunk(self, clean_content: str, sections: Optional[Sequence[str]] = None) -> Dict:
+        """Analyze text fitting in a single LLM call"""
+        page_model = section_schemas(_section_key(sections))[0]
+        try:
+            # Shared chain of the prompt and schema
+            chain = self.runtime.chain(self.prompt, page_model)
+            
+            inputs = {
                 "text": clean_content, 
-                "format_instructions": self.parser.get_format_instructions()
-            })
+                "format_instructions": self.runtime.format_instructions(page_model)
+            }
+            
+            async def invoke_chain():
+                estimated_tokens = self.estimate_request_tokens(clean_content, sections=sections)
+                response = await self.executor.ainvoke(chain, inputs, estimated_tokens)
+                return response.model_dump()
             
-            return response.model_dump()
+            # Invoke chain, unless the same text was already analyzed
+            analysis = await self.llm_cache.acached(self.llm.model, self.prompt, inputs, invoke_chain)
             
         except Exception as e:
             print(f"Error analyzing content: {e}")
             raise e
+        
+        return complete_analysis(analysis)
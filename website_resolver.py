@@ -0,0 +1,185 @@
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+from urllib.parse import urlparse
+
+# Resolutions at least this confident are used without asking the LLM
+DEFAULT_MIN_CONFIDENCE = 0.75
+
+# Social networks, directories and review sites: never the company's own website
+NON_COMPANY_DOMAINS = (
+    'linkedin.com', 'facebook.com', 'twitter.com', 'x.com', 'instagram.com', 'youtube.com', 'tiktok.com',
+    'pinterest.com', 'reddit.com', 'medium.com', 'github.com', 'wikipedia.org', 'crunchbase.com',
+    'glassdoor.com', 'indeed.com', 'welcometothejungle.com', 'g2.com', 'capterra.com', 'getapp.com',
+    'trustpilot.com', 'producthunt.com', 'zoominfo.com', 'pitchbook.com', 'owler.com', 'bloomberg.com',
+    'dnb.com', 'societe.com', 'pappers.fr', 'apollo.io', 'rocketreach.co', 'cbinsights.com',
+    'apps.apple.com', 'play.google.com', 'wellfound.com', 'angel.co', 'ycombinator.com', 'tracxn.com',
+)
+
+# Legal forms dropped from company names before matching them with domains
+LEGAL_SUFFIXES = {'inc', 'incorporated', 'llc', 'ltd', 'limited', 'corp', 'corporation', 'co', 'company',
+                  'gmbh', 'ag', 'sa', 'sas', 'sarl', 'bv', 'nv', 'plc', 'srl', 'spa', 'oy', 'ab', 'as'}
+
+# Words companies add to their name in domains and LinkedIn slugs (getmadkudu, madkuduhq)
+NAME_AFFIXES = {'get', 'try', 'use', 'go', 'join', 'meet', 'hello', 'hey', 'my', 'the', 'hq', 'app', 'apps',
+                'inc', 'io', 'ai', 'co', 'corp', 'labs', 'team', 'software', 'official', 'online', 'group', 'global'}
+
+# Score of a name found inside a longer label without a known affix (dropbox for Box):
+# below DEFAULT_MIN_CONFIDENCE, so the LLM decides
+UNSEPARATED_MATCH_SCORE = 0.5
+
+# Second-level labels of country domains such as example.co.uk
+_SECOND_LEVEL_LABELS = {'co', 'com', 'org', 'net', 'ac', 'gov', 'edu'}
+
+_LINKEDIN_COMPANY = re.compile(r'^https?://(?:[a-z]{2,3}\.)?linkedin\.com/company/([^/?#]+)', re.IGNORECASE)
+
+# A path of one locale segment (/en, /fr-fr/) is still the home page
+_LOCALE_PATH = re.compile(r'^/?([a-z]{2}([-_][a-z]{2})?)?/?$', re.IGNORECASE)
+
+_stats = {'resolved': 0, 'llm_fallbacks': 0}
+_stats_lock = threading.Lock()
+
+
+def count_resolution(resolved: bool):
+    """Record whether a search was resolved without the LLM"""
+    with _stats_lock:
+        _stats['resolved' if resolved else 'llm_fallbacks'] += 1
+
+
+def get_resolver_stats() -> Dict:
+    """Return how many searches were resolved heuristically or needed the LLM, and the hit rate"""
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats['resolved'] + stats['llm_fallbacks']
+    stats['hit_rate'] = stats['resolved'] / total if total else 0.0
+    return stats
+
+
+def _name_tokens(company: str) -> List[str]:
+    """Lowercase alphanumeric words of a company name, without its legal form"""
+    tokens = re.findall(r'[a-z0-9]+', company.lower())
+    return [token for token in tokens if token not in LEGAL_SUFFIXES] or tokens
+
+
+def _name_match(company: str, label: str) -> float:
+    """How well a domain label or LinkedIn slug matches a company name, from 0 to 1"""
+    tokens = _name_tokens(company)
+    name = ''.join(tokens)
+    compact = re.sub(r'[^a-z0-9]', '', label.lower())
+    if not name or not compact:
+        return 0.0
+    if compact == name:
+        return 1.0
+    if compact.startswith(name) or compact.endswith(name):
+        # madkudu-inc, getmadkudu, madkuduhq, but not dropbox for Box or pineapple for Apple
+        leftovers = {compact[len(name):] if compact.startswith(name) else '',
+                     compact[:-len(name)] if compact.endswith(name) else ''}
+        parts = re.findall(r'[a-z0-9]+', label.lower())
+        separated = any(''.join(parts[:i]) == name or ''.join(parts[i:]) == name for i in range(1, len(parts)))
+        return 0.85 if separated or leftovers & NAME_AFFIXES else UNSEPARATED_MATCH_SCORE
+    if len(tokens) > 1 and all(token in compact for token in tokens):
+        return 0.7
+    # Acronym domains (ibm.com for International Business Machines) are left to the LLM
+    return 0.0
+
+
+def _site_label(host: str) -> str:
+    """Registrable label of a host: madkudu for www.madkudu.com or madkudu.co.uk"""
+    labels = host.split('.')
+    if len(labels) >= 3 and labels[-2] in _SECOND_LEVEL_LABELS and len(labels[-1]) == 2:
+        return labels[-3]
+    return labels[-2] if len(labels) >= 2 else labels[0]
+
+
+def _is_non_company(host: str) -> bool:
+    return any(host == domain or host.endswith('.' + domain) for domain in NON_COMPANY_DOMAINS)
+
+
+@dataclass
+class Resolution:
+    """Website and LinkedIn page picked from search results, with the confidence of each pick."""
+    website: str = "None"
+    linkedin: str = "None"
+    website_confidence: float = 0.0
+    linkedin_confidence: float = 0.0
+
+    @property
+    def confidence(self) -> float:
+        """Confidence of the whole resolution: that of its least certain pick"""
+        return min(self.website_confidence, self.linkedin_confidence)
+
+    def to_dict(self, company: str) -> Dict[str, str]:
+        """Format the resolution like the WebsiteResults of the LLM"""
+        return {'company': company, 'website': self.website, 'linkedin': self.linkedin}
+
+
+def _resolve_website(company: str, results: List[Dict]) -> Tuple[str, float]:
+    """Pick the company website: a host named after the company, preferably the first result's home page"""
+    candidates: Dict[str, Tuple[float, str]] = {}
+    for rank, result in enumerate(results):
+        parsed = urlparse(result.get('link', ''))
+        host = parsed.netloc.lower().split(':')[0]
+        if parsed.scheme not in ('http', 'https') or not host or _is_non_company(host):
+            continue
+        score = _name_match(company, _site_label(host.removeprefix('www.')))
+        if not score:
+            continue
+        if not _LOCALE_PATH.match(parsed.path):
+            score *= 0.9
+        score *= 1 - 0.02 * rank
+        site = host.removeprefix('www.')
+        if score > candidates.get(site, (0.0, ''))[0]:
+            candidates[site] = (score, f"{parsed.scheme}://{host}/")
+    if not candidates:
+        return "None", 0.0
+
+    ranked = sorted(candidates.values(), reverse=True)
+    best_score, best_url = ranked[0]
+    # Several equally plausible sites (madkudu.com and madkudu.io): let the LLM decide
+    if len(ranked) > 1 and ranked[1][0] >= best_score - 0.1:
+        best_score /= 2
+    return best_url, best_score
+
+
+def _resolve_linkedin(company: str, results: List[Dict]) -> Tuple[str, float]:
+    """Pick the LinkedIn company page whose slug matches the company name"""
+    candidates: Dict[str, float] = {}
+    for rank, result in enumerate(results):
+        match = _LINKEDIN_COMPANY.match(result.get('link', ''))
+        if not match:
+            continue
+        slug = match.group(1)
+        score = _name_match(company, slug) * (1 - 0.02 * rank)
+        url = f"https://www.linkedin.com/company/{slug.lower()}"
+        candidates[url] = max(score, candidates.get(url, 0.0))
+    candidates = {url: score for url, score in candidates.items() if score}
+    if not candidates:
+        return "None", 0.0
+
+    ranked = sorted(((score, url) for url, score in candidates.items()), reverse=True)
+    best_score, best_url = ranked[0]
+    if len(ranked) > 1 and ranked[1][0] >= best_score - 0.1:
+        best_score /= 2
+    return best_url, best_score
+
+
+def resolve_search(company: str, search_results: List[Dict]) -> Resolution:
+    """
+    Pick the official website and LinkedIn company page from search results, without an LLM
+
+    Websites must have a domain named after the company and not be a social network
+    or a directory; home pages and earlier results are preferred. LinkedIn URLs must
+    be company pages (linkedin.com/company/<slug>) whose slug matches the name.
+    Ambiguous picks get a low confidence.
+
+    Args:
+        company: Name of the company
+        search_results: Search results with 'title', 'link' and 'description'
+
+    Returns:
+        Resolution: The picks and their confidence, from 0 to 1
+    """
+    website, website_confidence = _resolve_website(company, search_results)
+    linkedin, linkedin_confidence = _resolve_linkedin(company, search_results)
+    return Resolution(website, linkedin, round(website_confidence, 3), round(linkedin_confidence, 3))
@@ -1,107 +1,407 @@
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-from typing import List, Dict, Set
+import asyncio
+import copy
+import functools
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from typing import List, Dict, Optional, Set, Tuple
 import os
 from website_analyzer import WebsiteAnalyzer
+from http_client import FetchResult, HttpClient, get_http_client
+from html_document import ParsedDocument, parse_html
+from crawl_frontier import rank_urls
+from sitemap import fetch_sitemap_urls
+from content_fingerprint import DuplicateIndex, content_hash
+from url_canonical import VisitedIndex, canonicalize_url, same_site
+from crawl_budget import CrawlBudget
+from analysis_store import AnalysisStore, get_analysis_store
+from token_counting import estimate_tokens
+from structured_output import count_parser_stats
+from page_classifier import sections_for_page
 
 class WebsiteScraper:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, max_concurrency: int = 8, max_concurrency_per_host: int = 4,
+                 http_client: HttpClient = None, max_page_bytes: int = 2 * 1024 * 1024,
+                 max_text_chars: Optional[int] = 100_000, near_duplicate_distance: int = 3,
+                 analysis_store: AnalysisStore = None, incremental: bool = True, batch_analysis: bool = True,
+                 section_routing: bool = True, analyzer: WebsiteAnalyzer = None):
         """
-        Initialize the WebsiteScraper with a base URL
+        Initialize the WebsiteScraper with a Mistral API key
         
         Args:
-            base_url: The starting URL to analyze
+            api_key: The Mistral API key used by the page analyzer
+            max_concurrency: Maximum number of pages fetched or analyzed at the same time
+            max_concurrency_per_host: Maximum number of concurrent fetches against a single host
+            http_client: HTTP client used for page fetches, defaults to the shared pooled client
+            max_page_bytes: Maximum number of body bytes read per page
+            max_text_chars: Stop reading a page once this much visible text was received (None for no limit)
+            near_duplicate_distance: Maximum SimHash distance for two pages to share one analysis
+            analysis_store: Store of previous page analyses, defaults to the shared on-disk store
+            incremental: Whether to reuse stored analyses of pages whose text did not change
+            batch_analysis: Whether to pack short pages into shared LLM calls
+            section_routing: Whether to extract from each page only the sections its page type can fill
+            analyzer: Page analyzer to use, defaults to a WebsiteAnalyzer of the API key
         """
         self.base_url = None
-        self.analyzer = WebsiteAnalyzer(api_key)
-        self.visited_urls: Set[str] = set()
+        self.analyzer = analyzer or WebsiteAnalyzer(api_key)
+        self.visited_urls = VisitedIndex()
         self.results: Dict[str, Dict] = {}
+        self.stats: Dict[str, Dict] = {}
+        self._stats_lock = threading.Lock()
+        self.max_concurrency = max_concurrency
+        self.max_concurrency_per_host = max_concurrency_per_host
+        self.http_client = http_client or get_http_client()
+        self.max_page_bytes = max_page_bytes
+        self.max_text_chars = max_text_chars
+        self.duplicate_index = DuplicateIndex(max_distance=near_duplicate_distance)
+        self.analysis_store = (analysis_store or get_analysis_store()) if incremental else None
+        self.batch_analysis = batch_analysis
+        self.section_routing = section_routing
         
-    def get_page_content(self, url: str) -> tuple[str, BeautifulSoup]:
-        """Fetch and parse webpage content"""
+    def get_page_content(self, url: str) -> Optional[ParsedDocument]:
+        """Fetch a webpage and parse it once into links and clean text"""
         try:
-            response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
-            html = response.text
-            soup = BeautifulSoup(html, 'html.parser')
-            return html, soup
+            page = self.http_client.fetch_page(url, max_bytes=self.max_page_bytes, max_text_chars=self.max_text_chars)
+            self._count_cache_outcome(page)
+            if page.skipped_reason:
+                print(f"Skipping {url}: {page.skipped_reason}")
+                return None
+            if page.status_code >= 400:
+                print(f"Error fetching {url}: HTTP {page.status_code}")
+                return None
+            return parse_html(page.text, url)
         except Exception as e:
             print(f"Error fetching {url}: {str(e)}")
-            return "", None
+            return None
 
-    def extract_links(self, soup: BeautifulSoup, current_url: str) -> List[str]:
-        """Extract and normalize all links from the page"""
+    def extract_links(self, document: ParsedDocument, current_url: str) -> List[str]:
+        """Filter and normalize all links from the page"""
         links = []
-        if soup:
-            base_domain = urlparse(self.base_url).netloc
-            base_path = urlparse(self.base_url).path.rstrip('/')
-            
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                absolute_url = urljoin(current_url, href)
-                parsed_url = urlparse(absolute_url)
-                
-                # Only include links from the same domain and that are extensions of base path
-                if (parsed_url.netloc == base_domain and 
-                    parsed_url.path.startswith(base_path) and
-                    not any(ext in parsed_url.path.lower() for ext in ['.pdf', '.jpg', '.png', '.gif', '.svg']) and
-                    '#' not in parsed_url.path and
-                    not parsed_url.path.endswith('//')):
-                    
-                    # Clean the URL by removing query parameters and fragments
-                    clean_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}"
-                    # Remove trailing slashes for consistency
-                    clean_url = clean_url.rstrip('/')
+        if document:
+            for absolute_url in document.links:
+                clean_url = self._clean_link(absolute_url)
+                if clean_url:
                     links.append(clean_url)
                     
-        return list(set(links))
+        # Keep the first URL seen for each canonical page
+        unique_links = {}
+        for link in links:
+            unique_links.setdefault(canonicalize_url(link), link)
+        return list(unique_links.values())
+
+    def _clean_link(self, absolute_url: str) -> Optional[str]:
+        """Return the cleaned URL if it belongs to the crawled site, None otherwise"""
+        base_path = urlparse(self.base_url).path.rstrip('/').lower()
+        parsed_url = urlparse(absolute_url)
 
-    def analyze_page(self, url: str, html_content: str):
-        """Analyze a single page using LangChain"""
-        page_info = self.analyzer.analyze_content(html_content)
+        # Only include links from the same site (www. and scheme ignored) that are extensions of base path
+        if (parsed_url.scheme in ('http', 'https') and
+            same_site(absolute_url, self.base_url) and
+            parsed_url.path.lower().startswith(base_path) and
+            not any(ext in parsed_url.path.lower() for ext in ['.pdf', '.jpg', '.png', '.gif', '.svg']) and
+            '#' not in parsed_url.path and
+            not parsed_url.path.endswith('//')):
+            
+            # Clean the URL by removing query parameters and fragments
+            clean_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}"
+            # Remove trailing slashes for consistency
+            return clean_url.rstrip('/')
+        return None
+
+    def analyze_page(self, url: str, text: str):
+        """Analyze the clean text of a single page using LangChain"""
+        page_info = self.analyzer.analyze_text(text)
         if page_info:
             self.results[url] = page_info
 
-    def crawl_website(self, url: str, depth: int = 2, max_links_per_depth: int = 10):
+    def crawl_website(self, url: str, depth: int = 2, max_links_per_depth: int = 10, use_sitemap: bool = True,
+                      max_pages: Optional[int] = None, max_tokens: Optional[int] = None,
+                      deadline_seconds: Optional[float] = None) -> Dict:
         """
-        Recursively crawl the website up to specified depth
+        Crawl the website breadth-first up to specified depth
+        
+        Pages of the same depth level are fetched concurrently and each page is
+        analyzed in the background while the crawl moves on to the next level.
+        Links are followed by decreasing value (pricing, product, customers,
+        about pages first) rather than alphabetically.
+        
+        When a budget runs out no new work is scheduled and the pages analyzed
+        so far are kept in the results.
         
         Args:
             url: Current URL to process
             depth: Maximum depth to crawl
-            max_links_per_depth: Maximum number of links to follow at each depth level
+            max_links_per_depth: Maximum number of links to follow from each page
+            use_sitemap: Whether to add the pages listed in the sitemap to the homepage links
+            max_pages: Maximum number of pages fetched
+            max_tokens: Maximum number of estimated LLM tokens spent on page analyses
+            deadline_seconds: Wall-clock limit of the crawl, pending work is abandoned past it
+            
+        Returns:
+            Dict: Budget usage summary, including which budget ran out (None if the crawl completed)
         """
         self.base_url = url
-        self._crawl_recursive(url, depth, max_links_per_depth)
+        self.stats['dedup'] = {'exact_duplicates': 0, 'near_duplicates': 0, 'canonical_duplicates': 0,
+                               'llm_calls_saved': 0, 'duplicate_of': {}}
+        self.stats['incremental'] = {'reused': [], 'recomputed': []}
+        budget = CrawlBudget(max_pages=max_pages, max_tokens=max_tokens, deadline_seconds=deadline_seconds)
+        # Counted per crawl rather than from the shared cache and parser counters,
+        # which concurrent crawls also increase
+        has_cache = getattr(self.http_client, 'cache', None) is not None
+        self.stats['http_cache'] = {'hits': 0, 'revalidated': 0, 'misses': 0} if has_cache else {}
+        with count_parser_stats() as parsing:
+            asyncio.run(self._crawl_async(url, depth, max_links_per_depth, use_sitemap, budget))
+        self.stats['output_parsing'] = dict(parsing)
+        self.stats['budget'] = budget.summary()
+        return self.stats['budget']
+
+    async def _crawl_async(self, url: str, depth: int, max_links_per_depth: int, use_sitemap: bool,
+                           budget: CrawlBudget):
+        """Breadth-first crawl with bounded global and per-host concurrency"""
+        # Blocking fetches and LLM calls run in a crawl-owned pool so an expired
+        # deadline does not wait for them on shutdown
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency + 1)
+        self._global_limit = asyncio.Semaphore(self.max_concurrency)
+        self._budget = budget
+        self._page_tasks: Dict[str, asyncio.Task] = {}
+        self._pending_batch: Dict[str, str] = {}
+        self._page_sections: Dict[str, Tuple[str, ...]] = {}
+        host_limits = defaultdict(lambda: asyncio.Semaphore(self.max_concurrency_per_host))
+        budget.start()
+
+        # Discover the sitemap while the homepage is being fetched
+        sitemap_task = None
+        if use_sitemap and depth > 1:
+            sitemap_task = asyncio.ensure_future(self._run_blocking(fetch_sitemap_urls, url, self.http_client))
+
+        try:
+            level = [url]
+            while depth > 0 and level and not budget.is_exhausted and budget.check_deadline():
+                level = [link for link in dict.fromkeys(level) if self.visited_urls.add(link)]
+                level = level[:budget.reserve_pages(len(level))]
 
-    def _crawl_recursive(self, url: str, depth: int, max_links_per_depth: int):
-        """Helper method for recursive crawling"""
-        if depth == 0 or url in self.visited_urls:
+                fetch_tasks = [
+                    asyncio.ensure_future(self._fetch_page(link, depth, host_limits[urlparse(link).netloc]))
+                    for link in level
+                ]
+                if not await self._wait_within_deadline(fetch_tasks):
+                    break
+
+                next_level = []
+                for link, fetch_task in zip(level, fetch_tasks):
+                    document = fetch_task.result()
+                    if not document:
+                        continue
+
+                    self._schedule_analysis(link, document)
+
+                    if depth > 1:
+                        links = self.extract_links(document, link)
+                        if link == url and sitemap_task:
+                            links = list(set(links) | await self._get_sitemap_links(sitemap_task))
+                        scheduled = {canonicalize_url(candidate) for candidate in next_level}
+                        candidates = [candidate for candidate in links
+                                      if candidate not in self.visited_urls and canonicalize_url(candidate) not in scheduled]
+                        ranked_links = rank_urls(candidates)[:max_links_per_depth]
+                        print(f"Found {len(links)} links, processing {len(ranked_links)} at depth {depth}")
+                        next_level.extend(ranked_links)
+
+                # Send the pages of this level still waiting for a batch while the next level is fetched
+                self._flush_analysis_batch()
+                level = next_level
+                depth -= 1
+
+            self._flush_analysis_batch()
+            await self._wait_within_deadline(list(set(self._page_tasks.values())))
+        finally:
+            if sitemap_task and not sitemap_task.done():
+                sitemap_task.cancel()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _wait_within_deadline(self, tasks: List[asyncio.Future]) -> bool:
+        """Wait for tasks until the deadline, cancelling the unfinished ones past it
+
+        Returns:
+            bool: True if every task finished in time
+        """
+        if not tasks:
+            return True
+        done, pending = await asyncio.wait(tasks, timeout=self._budget.time_left())
+        if pending:
+            self._budget.check_deadline()
+            for task in pending:
+                task.cancel()
+            await asyncio.wait(pending)
+            return False
+        return True
+
+    def _schedule_analysis(self, url: str, document: ParsedDocument):
+        """Analyze the page in the background while the crawl continues, unless an
+        identical or near-identical page was already sent to the LLM"""
+        if self.section_routing:
+            self._page_sections[url] = sections_for_page(url, document.headings)
+        original, match = self._find_canonical_original(url, document), 'canonical'
+        if original is None:
+            original, match = self.duplicate_index.find(document.text)
+        if original is not None:
+            self._record_duplicate(url, original, match)
+            self._page_tasks[url] = asyncio.ensure_future(self._reuse_analysis(url, document.text, original))
+        elif self._reuse_stored_analysis(url, document.text):
+            self.duplicate_index.add(url, document.text)
+        elif self._reserve_analysis_tokens(url, document.text):
+            self.duplicate_index.add(url, document.text)
+            if self.batch_analysis:
+                self._queue_analysis(url, document.text)
+            else:
+                self._page_tasks[url] = asyncio.ensure_future(self._analyze_page_async(url, document.text))
+
+    def _queue_analysis(self, url: str, text: str):
+        """Add a page to the next batched analysis, sending the batch once it is full"""
+        pending_tokens = sum(estimate_tokens(pending) for pending in self._pending_batch.values())
+        if self._pending_batch and pending_tokens + estimate_tokens(text) > self.analyzer.max_batch_tokens:
+            self._flush_analysis_batch()
+        self._pending_batch[url] = text
+
+    def _flush_analysis_batch(self):
+        """Start the analysis of the pages waiting for a batch"""
+        if not self._pending_batch:
             return
-            
-        print(f"Crawling {url} (depth {depth})")
-        self.visited_urls.add(url)
-        
-        html_content, soup = self.get_page_content(url)
-        if not soup:
+        pages, self._pending_batch = self._pending_batch, {}
+        if len(pages) == 1:
+            url, text = next(iter(pages.items()))
+            self._page_tasks[url] = asyncio.ensure_future(self._analyze_page_async(url, text))
+            return
+        task = asyncio.ensure_future(self._analyze_batch_async(pages))
+        for url in pages:
+            self._page_tasks[url] = task
+
+    def _reuse_stored_analysis(self, url: str, text: str) -> bool:
+        """Reuse the analysis stored by a previous crawl if the page text did not change"""
+        if self.analysis_store is None:
+            return False
+        stored = self.analysis_store.lookup(url, content_hash(text),
+                                            self.analyzer.sections_version(self._page_sections.get(url)))
+        if stored is None:
+            return False
+        self.results[url] = stored
+        self.stats['incremental']['reused'].append(url)
+        print(f"Reusing stored analysis of {url}: content unchanged")
+        return True
+
+    def _reserve_analysis_tokens(self, url: str, text: str) -> bool:
+        """Charge the estimated cost of a page analysis to the token budget"""
+        estimated_tokens = self.analyzer.estimate_request_tokens(text, sections=self._page_sections.get(url))
+        if self._budget.reserve_tokens(estimated_tokens):
+            return True
+        print(f"Skipping analysis of {url}: token budget exhausted")
+        return False
+
+    def _find_canonical_original(self, url: str, document: ParsedDocument) -> Optional[str]:
+        """Return the visited page this page declares as canonical, if it is a different one"""
+        canonical = document.canonical_url
+        if not canonical or not same_site(canonical, self.base_url):
+            return None
+        # Many sites point every page's rel=canonical at the homepage, do not trust it
+        if canonicalize_url(canonical) == canonicalize_url(self.base_url) and \
+                canonicalize_url(url) != canonicalize_url(self.base_url):
+            return None
+        return self.visited_urls.add_alias(canonical, url)
+
+    def _record_duplicate(self, url: str, original: str, match: str):
+        """Count a page whose analysis is reused from an earlier page"""
+        dedup = self.stats['dedup']
+        dedup[f'{match}_duplicates'] += 1
+        dedup['llm_calls_saved'] += 1
+        dedup['duplicate_of'][url] = original
+        print(f"Skipping analysis of {url}: {match} duplicate of {original}")
+
+    async def _reuse_analysis(self, url: str, text: str, original: str):
+        """Copy the analysis of the original page once it is available, if it covers the same sections"""
+        # Looked up when the task runs: the original may be scheduled later in the same level
+        if original in self._pending_batch:
+            self._flush_analysis_batch()
+        original_task = self._page_tasks.get(original)
+        if original_task:
+            await asyncio.wait([original_task])
+        if original in self.results and self._page_sections.get(original) == self._page_sections.get(url):
+            self.results[url] = copy.deepcopy(self.results[original])
             return
+        # The original page could not be fetched or analyzed, or its analysis is restricted
+        # to the sections of another page type: analyze this one instead
+        self.stats['dedup']['llm_calls_saved'] -= 1
+        if not self._reuse_stored_analysis(url, text) and self._reserve_analysis_tokens(url, text):
+            await self._analyze_page_async(url, text)
 
-        # Analyze the current page
-        self.analyze_page(url, html_content)
+    async def _get_sitemap_links(self, sitemap_task: asyncio.Future) -> Set[str]:
+        """Wait for the sitemap discovery and keep the URLs that belong to the crawled site"""
+        try:
+            sitemap_urls = await asyncio.wait_for(sitemap_task, timeout=self._budget.time_left())
+        except Exception as e:
+            print(f"Error reading sitemap: {str(e)}")
+            return set()
+        links = {self._clean_link(sitemap_url) for sitemap_url in sitemap_urls}
+        links.discard(None)
+        print(f"Found {len(links)} links in the sitemap")
+        return links
 
-        # Extract and process links
-        links = self.extract_links(soup, url)
-        sorted_links = sorted(links)[:max_links_per_depth]
-        print(f"Found {len(links)} links, processing {len(sorted_links)} at depth {depth}")
+    async def _run_blocking(self, func, *args):
+        """Run a blocking function in the crawl's thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(func, *args))
 
-        # Process all links recursively
-        for link in sorted_links:
-            self._crawl_recursive(link, depth - 1, max_links_per_depth)
+    async def _fetch_page(self, url: str, depth: int, host_limit: asyncio.Semaphore) -> Optional[ParsedDocument]:
+        """Fetch a page in a worker thread once a global and a per-host slot are free"""
+        async with self._global_limit, host_limit:
+            print(f"Crawling {url} (depth {depth})")
+            return await self._run_blocking(self.get_page_content, url)
+
+    async def _analyze_page_async(self, url: str, text: str):
+        """Analyze a page; LLM concurrency and rate limits are enforced by the analyzer's executor"""
+        try:
+            page_info = await self.analyzer.aanalyze_text(text, self._page_sections.get(url))
+        except Exception as e:
+            print(f"Error analyzing {url}: {str(e)}")
+            return
+        # Stored here rather than in the analysis call so abandoned analyses never land in the results
+        self._store_analysis(url, text, page_info)
+
+    async def _analyze_batch_async(self, pages: Dict[str, str]):
+        """Analyze several short pages with as few LLM calls as possible"""
+        try:
+            analyses = await self.analyzer.aanalyze_batch(pages, {url: self._page_sections.get(url) for url in pages})
+        except Exception as e:
+            print(f"Error analyzing {', '.join(pages)}: {str(e)}")
+            return
+        print(f"Analyzed {len(pages)} pages in a batch")
+        for url, page_info in analyses.items():
+            self._store_analysis(url, pages[url], page_info)
+
+    def _store_analysis(self, url: str, text: str, page_info: Optional[Dict]):
+        """Record a fresh page analysis in the results and the analysis store"""
+        if page_info:
+            self.results[url] = page_info
+            self.stats['incremental']['recomputed'].append(url)
+            if self.analysis_store is not None:
+                self.analysis_store.save(url, content_hash(text), page_info,
+                                         self.analyzer.sections_version(self._page_sections.get(url)))
+
+    def _count_cache_outcome(self, page: FetchResult):
+        """Count a page fetch in the HTTP cache statistics of the crawl, if the client has a cache"""
+        counts = self.stats.get('http_cache')
+        if not counts:
+            return
+        outcome = 'revalidated' if page.revalidated else 'hits' if page.from_cache else 'misses'
+        with self._stats_lock:
+            counts[outcome] += 1
 
     def get_results(self) -> Dict:
         """Return the final extracted information"""
         return self.results
 
+    def get_stats(self) -> Dict[str, Dict]:
+        """Return statistics about the last crawl (HTTP cache hits and misses, duplicate pages, ...)"""
+        return self.stats
+
 if __name__ == "__main__":
     base_url = "https://www.madkudu.com/"
     scraper = WebsiteScraper()
@@ -1,11 +1,15 @@
-from typing import Dict, List
-from langchain_mistralai import ChatMistralAI
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Tuple
 from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser, OutputFixingParser
 from pydantic import BaseModel, Field
 import json
-import httpx
-import time
+from analysis_aggregation import aggregate_analyses, format_aggregate
+from llm_cache import LLMCache, get_llm_cache
+from llm_executor import LLMExecutor, get_llm_executor, iterate_sync, run_sync
+from llm_runtime import LLMRuntime, get_llm_runtime
+from token_counting import estimate_tokens
+from structured_output import IncrementalJSONParser
 
 
 class WebsiteSummary(BaseModel):
@@ -17,22 +21,9 @@ class WebsiteSummary(BaseModel):
     overall_summary: str = Field(description="Overall website summary")
 
 
-class WebsiteSummarizer:
-    def __init__(self, website_analysis: Dict[str, Dict], linkedin_analysis: Dict, api_key: str):
-        """Initialize the Website Summarizer with Mistral API key
-        
-        Args:
-            website_analysis: Dictionary with URLs as keys and analysis sections as values
-            linkedin_analysis: LinkedIn profile analysis data
-            api_key: Mistral API key for LLM access
-        """
-        self.llm = ChatMistralAI(mistral_api_key=api_key)
-        base_parser = PydanticOutputParser(pydantic_object=WebsiteSummary)
-        self.parser = OutputFixingParser.from_llm(parser=base_parser, llm=self.llm)
-        
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are an expert at summarizing B2B company website analysis. Create concise yet comprehensive summaries."),
-            ("user", """Create a summary of the analyzed website data, focusing on key insights and patterns.
+SUMMARY_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You are an expert at summarizing B2B company website analysis. Create concise yet comprehensive summaries."),
+    ("user", """Create a summary of the analyzed website data, focusing on key insights and patterns.
             
             Create summaries for each section and an overall summary following this structure:
             
@@ -42,20 +33,76 @@ class WebsiteSummarizer:
             LinkedIn Data: {linkedin}
             
             Focus on the most important insights and patterns across all analyzed pages.""")
-        ])
+])
+
+SUMMARY_REDUCE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You are an expert at summarizing B2B company website analysis. Create concise yet comprehensive summaries."),
+    ("user", """Combine these partial summaries, each covering a group of pages of the same website, into one summary.
+            
+            Create summaries for each section and an overall summary following this structure:
+            
+            {format_instructions}
+            
+            Partial Summaries: {website}
+            LinkedIn Data: {linkedin}
+            
+            Keep the insights confirmed by several groups and the distinctive facts of each group, without repeating them.""")
+])
+
+# Website analysis size above which the pages are summarized by groups first
+DEFAULT_MAX_PROMPT_TOKENS = 8000
+
+
+def _pack(items: List[Tuple[Any, int]], max_tokens: int) -> List[List[Any]]:
+    """Group (item, tokens) pairs in order so that each group fits max_tokens, with at least two items per group"""
+    groups, current, current_tokens = [], [], 0
+    for item, tokens in items:
+        if current and len(current) >= 2 and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _format_summaries(summaries: List[Tuple[Dict, int]]) -> str:
+    """Render (summary, page count) pairs as text for the reduce prompt"""
+    return "\n\n".join(
+        f"Group {i} ({pages} pages):\n" + "\n".join(f"{field}: {value}" for field, value in summary.items())
+        for i, (summary, pages) in enumerate(summaries, 1)
+    )
+
+
+class WebsiteSummarizer:
+    def __init__(self, website_analysis: Dict[str, Dict], linkedin_analysis: Dict, api_key: str,
+                 llm_cache: LLMCache = None, executor: LLMExecutor = None, runtime: LLMRuntime = None,
+                 max_prompt_tokens: int = DEFAULT_MAX_PROMPT_TOKENS):
+        """Initialize the Website Summarizer with Mistral API key
+        
+        Args:
+            website_analysis: Dictionary with URLs as keys and analysis sections as values
+            linkedin_analysis: LinkedIn profile analysis data
+            api_key: Mistral API key for LLM access
+            llm_cache: Cache of LLM responses, defaults to the shared on-disk cache
+            executor: Rate-limited LLM executor, defaults to the shared one
+            runtime: Shared models, parsers and chains, defaults to the runtime of the API key
+            max_prompt_tokens: Website analysis tokens above which pages are summarized by
+                groups concurrently, then the group summaries summarized (tree reduce)
+        """
+        self.runtime = runtime or get_llm_runtime(api_key)
+        self.llm = self.runtime.chat_model()
+        self.llm_cache = llm_cache or get_llm_cache()
+        self.executor = executor or get_llm_executor()
+        self.parser = self.runtime.parser(WebsiteSummary)
+        
+        self.prompt = SUMMARY_PROMPT
         
         self.website_analysis = website_analysis
         self.linkedin_analysis = linkedin_analysis
-
-    def _create_section_text(self, data: Dict) -> str:
-        """Convert a dictionary section into a readable text format"""
-        text = []
-        for key, value in data.items():
-            if isinstance(value, (list, dict)):
-                text.append(f"{key}: {json.dumps(value, indent=2)}")
-            else:
-                text.append(f"{key}: {value}")
-        return "\n".join(text)
+        self.max_prompt_tokens = max_prompt_tokens
+        self.stats = {'levels': []}
 
     def summarize_analysis(self) -> WebsiteSummary:
         """
@@ -64,55 +111,152 @@ class WebsiteSummarizer:
         Returns:
             WebsiteSummary: Summarized website information
         """
-        # Combine analysis from all URLs
-        combined_analysis = {
-            "company_overview": {},
-            "sales_intelligence": {},
-            "pricing": {},
-            "firmographic": {},
-            "gtm_strategy": {}
-        }
+        return run_sync(self.asummarize_analysis())
+
+    async def asummarize_analysis(self) -> WebsiteSummary:
+        """
+        Async version of summarize_analysis, rate limited and retried by the shared LLM executor
+        
+        Returns:
+            WebsiteSummary: Summarized website information
+        """
+        try:
+            prompt, inputs, estimated_tokens = await self._aprepare_inputs()
+            start = time.perf_counter()
+            summary = await self._asummarize(prompt, inputs, estimated_tokens)
+            self._record_level(1, start)
+            return summary
+        except Exception as e:
+            print(f"Error creating summary: {str(e)}")
+            raise e
+
+    def stream_summary(self) -> Iterator[Tuple[str, str]]:
+        """
+        Create the summary, yielding each section as soon as it is generated
         
-        # Merge analysis from all URLs
-        for url, sections in self.website_analysis.items():
-            for section_name, section_data in sections.items():
-                if section_name in combined_analysis:
-                    combined_analysis[section_name].update(section_data)
+        Returns:
+            Iterator[Tuple[str, str]]: (WebsiteSummary field, section summary) pairs
+        """
+        return iterate_sync(self.astream_summary())
+
+    async def astream_summary(self) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Async version of stream_summary
         
-        # Convert the analysis data to a format suitable for the LLM
-        analysis_text = {
-            section: self._create_section_text(data)
-            for section, data in combined_analysis.items()
-        }
+        The model output is streamed and parsed incrementally: a section is
+        yielded as soon as its JSON field is complete. Sections the incremental
+        parser could not read are yielded from the full parse at the end.
         
-        # Create chain
-        chain = self.prompt | self.llm | self.parser
+        Returns:
+            AsyncIterator[Tuple[str, str]]: (WebsiteSummary field, section summary) pairs
+        """
+        prompt, inputs, estimated_tokens = await self._aprepare_inputs()
+        start = time.perf_counter()
+        cached = self.llm_cache.get(self.llm.model, prompt, inputs)
+        if cached is not None:
+            self._record_level(1, start)
+            for field, value in cached.items():
+                yield field, value
+            return
         
+        emitted = set()
+        incremental_parser = IncrementalJSONParser()
         try:
-            # Get response
-            response = chain.invoke({
-                "format_instructions": self.parser.get_format_instructions(),
-                "website": analysis_text,
-                "linkedin": self.linkedin_analysis
-            })
+            # Shared chain returning the raw model messages
+            chain = self.runtime.chain(prompt, None)
+            async for chunk in self.executor.astream(chain, inputs, estimated_tokens):
+                for field, value in incremental_parser.feed(chunk.content):
+                    if field in WebsiteSummary.model_fields and isinstance(value, str) and field not in emitted:
+                        emitted.add(field)
+                        yield field, value
             
-            return response.model_dump()
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 429:  # Rate limit error
-                print("Rate limit exceeded, waiting 5 seconds before retry...")
-                time.sleep(10)  # Wait 2 seconds before retrying
-                try:
-                    # Retry once
-                    response = chain.invoke({
-                        "format_instructions": self.parser.get_format_instructions(),
-                        "website": analysis_text,
-                        "linkedin": self.linkedin_analysis
-                    })
-                    return response.model_dump()
-                except Exception as retry_error:
-                    print(f"Retry failed: {str(retry_error)}")
-                    raise retry_error
-            raise e
+            summary = (await self.executor.aparse(self.parser, incremental_parser.buffer)).model_dump()
         except Exception as e:
             print(f"Error creating summary: {str(e)}")
             raise e
+        
+        self.llm_cache.set(self.llm.model, prompt, inputs, summary)
+        self._record_level(1, start)
+        for field, value in summary.items():
+            if field not in emitted:
+                yield field, value
+
+    async def _asummarize(self, prompt: ChatPromptTemplate, inputs: Dict, estimated_tokens: int) -> Dict:
+        """Run one summary call, unless the same inputs were already summarized"""
+        # Shared chain of the prompt and schema
+        chain = self.runtime.chain(prompt, WebsiteSummary)
+        
+        async def invoke_chain():
+            response = await self.executor.ainvoke(chain, inputs, estimated_tokens)
+            return response.model_dump()
+        
+        return await self.llm_cache.acached(self.llm.model, prompt, inputs, invoke_chain)
+
+    def _inputs(self, website: Any, linkedin: Any) -> Tuple[Dict, int]:
+        """Build the prompt inputs of a summary call and estimate its tokens"""
+        inputs = {
+            "format_instructions": self.runtime.format_instructions(WebsiteSummary),
+            "website": website,
+            "linkedin": linkedin
+        }
+        prompt_tokens = estimate_tokens(json.dumps(website)) + estimate_tokens(json.dumps(linkedin))
+        return inputs, prompt_tokens + 2000
+
+    def _record_level(self, calls: int, start: float):
+        """Record the number of calls and the latency of a summarization level"""
+        level = {'level': len(self.stats['levels']), 'calls': calls, 'seconds': round(time.perf_counter() - start, 2)}
+        self.stats['levels'].append(level)
+        print(f"Summary level {level['level']}: {calls} call(s) in {level['seconds']:.2f}s")
+
+    async def _aprepare_inputs(self) -> Tuple[ChatPromptTemplate, Dict, int]:
+        """
+        Build the prompt and inputs of the final summary call
+        
+        Small analyses are summarized in one call. Above max_prompt_tokens the pages
+        are summarized by groups concurrently, then the group summaries by groups,
+        until they fit one reduce call.
+        
+        Returns:
+            Tuple: The prompt, its inputs and the estimated tokens of the call
+        """
+        self.stats = {'levels': []}
+        # Deduplicated facts of all the pages, with how many pages support each of them
+        analysis_text = format_aggregate(aggregate_analyses(self.website_analysis))
+        if estimate_tokens(json.dumps(analysis_text)) <= self.max_prompt_tokens or len(self.website_analysis) < 2:
+            return (self.prompt, *self._inputs(analysis_text, self.linkedin_analysis))
+        
+        # Level 0: groups of pages, without the LinkedIn data kept for the final call
+        pages = [
+            ((url, analysis), estimate_tokens(json.dumps(format_aggregate(aggregate_analyses({url: analysis})))))
+            for url, analysis in self.website_analysis.items()
+        ]
+        groups = [dict(group) for group in _pack(pages, self.max_prompt_tokens)]
+        summaries = await self._asummarize_level([
+            (self.prompt, *self._inputs(format_aggregate(aggregate_analyses(group)), {}), len(group))
+            for group in groups
+        ])
+        
+        # Upper levels: groups of summaries, until they fit one call
+        while True:
+            summaries_text = _format_summaries(summaries)
+            if estimate_tokens(summaries_text) <= self.max_prompt_tokens or len(summaries) < 2:
+                return (SUMMARY_REDUCE_PROMPT, *self._inputs(summaries_text, self.linkedin_analysis))
+            groups = _pack([(summary, estimate_tokens(_format_summaries([summary]))) for summary in summaries],
+                           self.max_prompt_tokens)
+            summaries = await self._asummarize_level([
+                (SUMMARY_REDUCE_PROMPT, *self._inputs(_format_summaries(group), {}), sum(pages for _, pages in group))
+                for group in groups
+            ])
+
+    async def _asummarize_level(self, calls: List[Tuple[ChatPromptTemplate, Dict, int, int]]) -> List[Tuple[Dict, int]]:
+        """Run the (prompt, inputs, estimated tokens, page count) calls of one level concurrently"""
+        start = time.perf_counter()
+        summaries = await asyncio.gather(*(
+            self._asummarize(prompt, inputs, estimated_tokens) for prompt, inputs, estimated_tokens, _ in calls
+        ))
+        self._record_level(len(calls), start)
+        return [(summary, pages) for summary, (_, _, _, pages) in zip(summaries, calls)]
+
+    def get_stats(self) -> Dict[str, List[Dict]]:
+        """Return the calls and latency of each summarization level of the last summary"""
+        return self.stats